@@ -0,0 +1,111 @@
+"""DataFrame helpers for raw API data. Imports pandas, so it is only loaded on demand."""
+
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from .client import ITEM_TYPE
+
+
+def process_hierarchy_to_dataframe(hierarchy_data: List[Dict]) -> pd.DataFrame:
+    """Converts raw hierarchy data into a structured Pandas DataFrame."""
+    if not hierarchy_data:
+        return pd.DataFrame()
+
+    id_to_name_map = {asset['_id']: asset['name'] for asset in hierarchy_data}
+    processed_records = []
+    for asset in hierarchy_data:
+        record = {
+            '_id': asset['_id'],
+            'name': asset['name'],
+            'type': ITEM_TYPE.get(str(asset.get('t'))),
+            'path_ids': asset.get('path', [])
+        }
+        path_names = [id_to_name_map.get(node_id, 'Unknown') for node_id in record['path_ids']]
+        for i, level_name in enumerate(path_names):
+            record[f'level{i+1}'] = level_name
+        processed_records.append(record)
+    
+    df = pd.DataFrame(processed_records)
+    level_cols = sorted([col for col in df.columns if col.startswith('level')])
+    other_cols = ['name', '_id', 'type', 'path_ids']
+    df = df[level_cols + other_cols]
+    return df
+
+def process_network_status_to_dataframe(network_data: List[Dict], hierarchy_df: pd.DataFrame) -> pd.DataFrame:
+    """Processes raw network status, flattens it, and merges it with hierarchy info."""
+    if not network_data:
+        return pd.DataFrame()
+    
+    flat_network_list = []
+    def flatten_recursive(node: Dict, coordinator_mac: Optional[str] = None):
+        for mac, details in node.items():
+            record = {
+                'mac': mac,
+                'coordinator': coordinator_mac,
+                'type': details.get('type'),
+                'last_com': pd.to_datetime(details.get('last_com')),
+                'batt': details.get('batt'),
+                'child_count': len(details.get('children', {}))
+            }
+            flat_network_list.append(record)
+            current_coordinator = mac if details.get('type') == 'C' else coordinator_mac
+            if 'children' in details and details['children']:
+                flatten_recursive(details['children'], current_coordinator)
+
+    for gateway in network_data:
+        flatten_recursive(gateway)
+    return pd.DataFrame(flat_network_list)
+
+def process_trends_to_dataframe(trends_data: List[Dict]) -> pd.DataFrame:
+    """Converts raw trend data into a structured Pandas DataFrame."""
+    if not trends_data:
+        return pd.DataFrame()
+    results_list = []
+    for result in trends_data:
+        for statistic in result.get('statistics', []):
+            results_list.append({
+                "meas_id": result['_id'],
+                "asset_id": result['asset'],
+                "status": statistic.get('status'),
+                "type": statistic.get('global_type'),
+                "value": statistic.get("value"),
+                "time": pd.to_datetime(result.get('acqend'))
+            })
+    return pd.DataFrame(results_list)
+
+def process_thresholds_to_dataframe(thresholds_by_mp: Dict[str, Dict]) -> pd.DataFrame:
+    """
+    Converts {measure_point_id: thresholds} (from get_thresholds_bulk) into one row
+    per measure point, metric and level, e.g. (mp, 'velocity', 'alert', 4.5).
+    """
+    records = []
+    for mp_id, thresholds in thresholds_by_mp.items():
+        for metric, levels in (thresholds or {}).items():
+            if not isinstance(levels, dict):
+                continue
+            for level, value in levels.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    records.append({"mp_id": mp_id, "metric": metric, "level": level, "value": value})
+    df = pd.DataFrame(records, columns=["mp_id", "metric", "level", "value"])
+    return df.astype({"mp_id": "string", "metric": "category", "level": "category", "value": "float64"})
+
+def process_latest_results_to_dataframe(results_by_asset: Dict[str, List[Dict]]) -> pd.DataFrame:
+    """Converts {asset_id: latest results} (from get_latest_results_bulk) into one row per statistic."""
+    records = []
+    for asset_id, results in results_by_asset.items():
+        for result in results or []:
+            for statistic in result.get('statistics', []):
+                records.append({
+                    "asset_id": asset_id,
+                    "meas_id": result.get('_id'),
+                    "type": statistic.get('global_type'),
+                    "value": statistic.get('value'),
+                    "status": statistic.get('status'),
+                    "time": result.get('acqend'),
+                })
+    df = pd.DataFrame(records, columns=["asset_id", "meas_id", "type", "value", "status", "time"])
+    df = df.astype({"asset_id": "string", "meas_id": "string", "type": "category",
+                    "value": "float64", "status": "Int64"})
+    df["time"] = pd.to_datetime(df["time"], utc=True)
+    return df
@@ -0,0 +1,100 @@
+import base64
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+DEFAULT_TOKEN_CACHE_FILE = "config/.token_cache.json"
+
+
+def token_expiry(token: str, default_ttl: float) -> float:
+    """
+    Returns the expiry time (epoch seconds) of a token.
+    JWTs carry it in their 'exp' claim; any other token gets now + default_ttl.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims["exp"])
+    except (IndexError, ValueError, KeyError, TypeError):
+        return time.time() + default_ttl
+
+
+@dataclass(frozen=True)
+class AuthState:
+    """
+    Token and database of a logged-in client. It is never mutated: a login
+    builds a new one and swaps the client's reference, so a request always
+    reads a consistent token and database, whatever other threads do.
+    """
+    token: Optional[str] = None
+    customer_db: Optional[str] = None
+
+    @property
+    def authorization(self) -> Optional[str]:
+        return f"Bearer {self.token}" if self.token else None
+
+
+class TokenCache:
+    """
+    Persists database tokens in a local JSON file so that consecutive scripts
+    can skip the two login round-trips while the token is still valid.
+    Entries are keyed by server URL, username and customer database.
+    """
+
+    def __init__(self, path: str = DEFAULT_TOKEN_CACHE_FILE, default_ttl: float = 3600, safety_margin: float = 60):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.safety_margin = safety_margin
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(base_url: str, username: str, customer_db: str) -> str:
+        return f"{base_url}|{username}|{customer_db}"
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self, entries: Dict[str, Dict]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.remove(tmp_path)  # Left over by a crashed process that had the same pid
+        except FileNotFoundError:
+            pass
+        # Created owner-only: the tokens are never readable by other users, not even briefly.
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Returns the cached entry {'token', 'expires_at', 'dbs'} if it is still valid."""
+        with self._lock:
+            entry = self._load().get(key)
+        if entry and entry.get("expires_at", 0) - self.safety_margin > time.time():
+            return entry
+        return None
+
+    def put(self, key: str, token: str, dbs: List[str]) -> None:
+        with self._lock:
+            entries = self._load()
+            now = time.time()
+            entries = {k: v for k, v in entries.items() if v.get("expires_at", 0) > now}
+            entries[key] = {"token": token, "expires_at": token_expiry(token, self.default_ttl), "dbs": dbs}
+            self._save(entries)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            entries = self._load()
+            if entries.pop(key, None) is not None:
+                self._save(entries)
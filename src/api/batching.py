@@ -0,0 +1,285 @@
+"""
+Chunked submission of large create_asset_batch uploads.
+
+Elements reference each other by upload_id ('upload_path' entries and
+'transmitter_upload_id'). They are sent parents first in chunks whose size
+follows the server: chunks grow while they are answered quickly and shrink when
+they are slow, too large or throttled. A rejected chunk is bisected until the bad
+elements are isolated, and everything else goes through; a throttled one is
+sent again whole once the server allows it.
+"""
+import collections
+import email.utils
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import requests
+
+# Statuses that reject the content of a chunk (bad field, unknown parent, ...), as
+# opposed to the server being unavailable, throttling (429) or the body too large (413).
+_CONTENT_ERRORS = {400, 404, 409, 422}
+
+
+def retry_after(response: Optional[requests.Response], default: float) -> float:
+    """Seconds to wait as asked by a response's Retry-After header (seconds or HTTP date), else default."""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+def batch_items(response: Any) -> List[Dict]:
+    """
+    The per-element items of a create_asset_batch answer: the list itself, or the
+    '_items' of a {'_status', '_items'} dict (a dict without '_items' is one item).
+    """
+    if isinstance(response, dict):
+        response = response.get("_items", [response])
+    if not isinstance(response, list):
+        return []
+    return [item if isinstance(item, dict) else {} for item in response]
+
+
+def match_items(upload_ids: List[Any], response: Any) -> List[Optional[Dict]]:
+    """
+    Pairs each sent upload_id with its item of a create_asset_batch answer: by
+    the upload_id the item echoes, or by position when the items carry none.
+    """
+    items = batch_items(response)
+    by_upload_id = {item["upload_id"]: item for item in items if "upload_id" in item}
+    if by_upload_id:
+        return [by_upload_id.get(upload_id) for upload_id in upload_ids]
+    return [items[position] if position < len(items) else None for position in range(len(upload_ids))]
+
+
+@dataclass
+class BatchReport:
+    """Outcome of a BatchSubmitter run, keyed by upload_id."""
+    created: Dict[Any, str] = field(default_factory=dict)      # upload_id -> server _id
+    failed: Dict[Any, str] = field(default_factory=dict)       # upload_id -> error
+    skipped: Dict[Any, str] = field(default_factory=dict)      # upload_id -> the failed element it depends on
+    requests: int = 0
+    seconds: float = 0.0
+
+    def merge(self, other: "BatchReport") -> None:
+        """Adds the outcome of another run (e.g. one shard of an upload) to this report."""
+        self.created.update(other.created)
+        self.failed.update(other.failed)
+        self.skipped.update(other.skipped)
+        self.requests += other.requests
+
+    def summary(self) -> str:
+        lines = [f"\n--- Batch upload: {len(self.created)} created, {len(self.failed)} failed, "
+                 f"{len(self.skipped)} skipped, {self.requests} request(s) in {self.seconds:.1f}s ---"]
+        lines += [f"  upload_id {upload_id}: FAILED {error}" for upload_id, error in self.failed.items()]
+        lines += [f"  upload_id {upload_id}: skipped ({reason})" for upload_id, reason in self.skipped.items()]
+        text = "\n".join(lines)
+        print(text)
+        return text
+
+
+def upload_refs(element: Dict) -> List[int]:
+    """The upload_ids of this batch an element depends on."""
+    refs = [ref for ref in element.get("upload_path") or [] if isinstance(ref, int)]
+    if isinstance(element.get("transmitter_upload_id"), int):
+        refs.append(element["transmitter_upload_id"])
+    return refs
+
+
+def resolve_refs(element: Dict, created: Dict[Any, str]) -> Dict:
+    """
+    Returns the element with its references to already created upload_ids replaced
+    by their server ids: in 'upload_path', and 'transmitter_upload_id' as a
+    'transmitter' field. The element itself is not modified.
+    """
+    if not any(ref in created for ref in upload_refs(element)):
+        return element
+    resolved = dict(element)
+    if "upload_path" in resolved:
+        resolved["upload_path"] = [created.get(ref, ref) if isinstance(ref, int) else ref
+                                   for ref in resolved["upload_path"]]
+    if resolved.get("transmitter_upload_id") in created:
+        resolved["transmitter"] = created[resolved.pop("transmitter_upload_id")]
+    return resolved
+
+
+class BatchSubmitter:
+    """
+    Sends a list of create_asset_batch elements in auto-sized chunks.
+
+        report = BatchSubmitter(client).submit(elements)
+        report.summary()
+
+    Chunks hold at most `size` elements and max_bytes of JSON. The size doubles
+    while a chunk is answered in less than half of target_seconds, and is scaled
+    down when it takes longer, on a 429 or a 5xx, and on a 413 (max_bytes is
+    halved too). A chunk rejected for its content (400/404/409/422) or its size
+    (413) is split in two and both halves are sent again, down to single
+    elements, whose error is reported. Elements depending on a failed one are
+    skipped. A throttled chunk (429) goes back whole to the front of the queue
+    after the Retry-After delay (or an exponential backoff); after max_throttles
+    429s in a row, it is reported as failed.
+
+    References to elements created by earlier chunks are rewritten to their
+    server ids: 'upload_path' entries become the ids, and 'transmitter_upload_id'
+    becomes a 'transmitter' field. With an IdempotentWriter, each chunk goes
+    through its journal, so ambiguous failures are reconciled rather than lost.
+    The answer of a chunk is matched to its elements with match_items().
+    """
+
+    def __init__(self, client, initial_size: int = 50, min_size: int = 1, max_size: int = 1000,
+                 max_bytes: int = 1_000_000, target_seconds: float = 5.0, writer=None, max_throttles: int = 10):
+        self.client = client
+        self.size = initial_size
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.target_seconds = target_seconds
+        self.max_throttles = max_throttles
+        self._throttles = 0
+        self.send: Callable[[List[Dict]], Any] = (writer.create_asset_batch if writer is not None
+                                                  else client.create_asset_batch)
+
+    def submit(self, elements: List[Dict]) -> BatchReport:
+        """Creates every element it can and reports, per upload_id, what was created, failed or skipped."""
+        report = BatchReport()
+        start = time.perf_counter()
+        queue: Deque[Dict] = collections.deque(self._parents_first(elements))
+        while queue:
+            chunk = self._next_chunk(queue, report)
+            if chunk:
+                # Throttled elements go back in front, in order, to be sent once the server allows it.
+                queue.extendleft(reversed(self._send_chunk(chunk, report)))
+        report.seconds = time.perf_counter() - start
+        return report
+
+    @staticmethod
+    def _parents_first(elements: List[Dict]) -> List[Dict]:
+        """Orders elements so that each comes after the ones it references (stable otherwise)."""
+        by_id = {element["upload_id"]: element for element in elements if "upload_id" in element}
+        ordered, placed = [], set()
+
+        def place(element: Dict, visiting: frozenset) -> None:
+            upload_id = element.get("upload_id")
+            if upload_id in placed and upload_id is not None:
+                return
+            for ref in upload_refs(element):
+                if ref in by_id and ref not in visiting and ref not in placed:
+                    place(by_id[ref], visiting | {upload_id})
+            placed.add(upload_id)
+            ordered.append(element)
+
+        for element in elements:
+            if element.get("upload_id") is None or element["upload_id"] not in placed:
+                place(element, frozenset())
+        return ordered
+
+    def _ready(self, element: Dict, chunk_ids: set, report: BatchReport) -> Optional[Dict]:
+        """
+        Returns the element with its references to created elements rewritten,
+        or None (recorded as skipped) if something it references was not created.
+        """
+        blocked = next((ref for ref in upload_refs(element) if ref not in report.created and ref not in chunk_ids),
+                       None)
+        if blocked is not None:
+            report.skipped[element.get("upload_id")] = f"depends on upload_id {blocked}"
+            return None
+        return resolve_refs(element, report.created)
+
+    def _next_chunk(self, queue: Deque[Dict], report: BatchReport) -> List[Dict]:
+        chunk, chunk_ids, chunk_bytes = [], set(), 0
+        while queue and len(chunk) < self.size:
+            element = self._ready(queue[0], chunk_ids, report)
+            if element is None:
+                queue.popleft()
+                continue
+            size = len(self.client.codec.dumps(element))
+            if chunk and chunk_bytes + size > self.max_bytes:
+                break
+            queue.popleft()
+            chunk.append(element)
+            chunk_ids.add(element.get("upload_id"))
+            chunk_bytes += size
+        return chunk
+
+    def _send_chunk(self, chunk: List[Dict], report: BatchReport) -> List[Dict]:
+        """Sends a chunk and records its outcome; returns the elements left unsent because of throttling."""
+        report.requests += 1
+        start = time.perf_counter()
+        try:
+            response = self.send(chunk)
+        except requests.exceptions.RequestException as e:
+            return self._on_error(e, chunk, report)
+        elapsed = time.perf_counter() - start
+        self._throttles = 0
+
+        upload_ids = [element.get("upload_id") for element in chunk]
+        for upload_id, item in zip(upload_ids, match_items(upload_ids, response)):
+            if item and item.get("_status") == "ERR":
+                report.failed[upload_id] = f"rejected: {item.get('_issues') or item.get('_error')}"
+            elif item and item.get("_id"):
+                report.created[upload_id] = item["_id"]
+            else:
+                report.failed[upload_id] = "missing from the server response"
+
+        if elapsed < self.target_seconds / 2 and len(chunk) >= self.size:
+            self.size = min(self.max_size, self.size * 2)
+        elif elapsed > self.target_seconds:
+            self.size = max(self.min_size, int(self.size * self.target_seconds / elapsed))
+        return []
+
+    def _fail(self, chunk: List[Dict], report: BatchReport, error: str) -> List[Dict]:
+        for element in chunk:
+            report.failed[element.get("upload_id")] = error
+        return []
+
+    def _on_error(self, error: requests.exceptions.RequestException, chunk: List[Dict],
+                  report: BatchReport) -> List[Dict]:
+        response = getattr(error, "response", None)
+        status = response.status_code if response is not None else None
+        if status == 429:
+            # Throttled: nothing was applied, the whole chunk is sent again once the server allows it.
+            self._throttles += 1
+            if self._throttles > self.max_throttles:
+                return self._fail(chunk, report, f"429: still throttled after {self.max_throttles} retries")
+            self.size = max(self.min_size, min(self.size, len(chunk)) // 2)
+            delay = retry_after(response, default=min(2 ** (self._throttles - 1), 60))
+            print(f"Chunk of {len(chunk)} throttled (429), sending it again in {delay:.1f}s.")
+            time.sleep(delay)
+            return chunk
+        self._throttles = 0
+        if status not in _CONTENT_ERRORS and status != 413:
+            # Unavailable or timed out: the chunk may have been applied, so it is not sent blindly again.
+            self.size = max(self.min_size, self.size // 2)
+            return self._fail(chunk, report, f"{type(error).__name__}: {error}")
+        if status == 413:
+            self.max_bytes = max(1, self.max_bytes // 2)
+            self.size = max(self.min_size, min(self.size, len(chunk)) // 2)
+        if len(chunk) == 1:
+            detail = response.text[:200] if response is not None else ""
+            return self._fail(chunk, report, f"{status}: {detail}".strip())
+
+        # Bisect: the halves are sent in order, the second one seeing what the first created.
+        middle = len(chunk) // 2
+        print(f"Chunk of {len(chunk)} rejected ({status}), retrying as {middle} + {len(chunk) - middle}.")
+        halves = [chunk[:middle], chunk[middle:]]
+        for position, half in enumerate(halves):
+            ready, half_ids = [], set()
+            for element in half:
+                element = self._ready(element, half_ids, report)
+                if element is not None:
+                    ready.append(element)
+                    half_ids.add(element.get("upload_id"))
+            unsent = self._send_chunk(ready, report) if ready else []
+            if unsent:
+                # Throttled midway: what is left of the chunk goes back behind the throttled half.
+                return unsent + [element for later in halves[position + 1:] for element in later]
+        return []
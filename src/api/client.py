@@ -1,14 +1,26 @@
 import concurrent.futures
+import contextlib
 import datetime
-import json
+import gzip
+import math
+import os
+import threading
+import time
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-import numpy as np
-import pandas as pd
 import requests
 import configparser
-from typing import Optional
+
+from .auth import AuthState, TokenCache
+from .batching import batch_items
+from .cache import MISSING, TTLCache
+from .codec import JsonCodec, get_codec
+from .concurrency import AdaptiveLimiter, Lane, SingleFlight
+from .hierarchy import HierarchyIndex
+from .metrics import RequestMetrics, endpoint_template
+from .spool import IncompleteListingError, PageSpool
+from .transport import SessionPool, TransportConfig
 
 # --- Configuration and Constants ---
 
@@ -38,76 +50,331 @@ TASKS_TEMPLATE_ID = [
 
 # --- Part 1: Refactored API Client ---
 
+def _freeze(value: Any) -> Any:
+    """Hashable form of request params or headers, used to recognise identical requests."""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
 class IcareApiClient:
     """A client for interacting with the iSee/iCare Web API."""
 
     BASE_URL_TEMPLATE = "https://isee{server_suffix}.icareweb.com"
 
-    def __init__(self, username: str, password: str, server: Server = Server.EU):
+    LOGIN_ENDPOINT = "/apilogin/login"
+
+    # Seconds a bulk-fetched threshold or latest result is reused without asking the API again,
+    # and how many of them are kept at most (least recently used evicted first).
+    MEMO_TTL = 60
+    MEMO_SIZE = 50000
+    # Read-through cache of get_asset(): entries are revalidated with If-None-Match,
+    # dropped after ASSET_CACHE_TTL seconds and evicted LRU beyond ASSET_CACHE_SIZE assets.
+    ASSET_CACHE_SIZE = 10000
+    ASSET_CACHE_TTL = 300
+    # Extra rounds for the pages of a paginated listing that failed.
+    PAGE_RETRIES = 2
+
+    def __init__(self, username: str, password: str, server: Server = Server.EU,
+                 token_cache: Optional[TokenCache] = None, transport: Optional[TransportConfig] = None,
+                 codec: Optional[JsonCodec] = None, base_url: Optional[str] = None,
+                 metrics: Optional[RequestMetrics] = None, spool_dir: Optional[str] = None):
 
         self.username = username
         self.password = password
         self.server_suffix = server.value
-        self.base_url = self.BASE_URL_TEMPLATE.format(server_suffix=self.server_suffix)
+        # base_url overrides the server URL (e.g. a local mock server for tests and benchmarks).
+        self.base_url = base_url or self.BASE_URL_TEMPLATE.format(server_suffix=self.server_suffix)
         
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.transport = transport or TransportConfig()
+        self.codec = codec or get_codec()
+        self.metrics = metrics or RequestMetrics()
+        # Where paginated listings checkpoint their pages (None: kept in memory only).
+        self.spool_dir = spool_dir
+        # One session per concurrent worker; their default headers never change after creation.
+        self.sessions = SessionPool(self.transport, headers={
             "Accept-Language": "en",
             "Accept": "application/json"
         })
         self.task_templates_cache = {}
+        self.token_cache = token_cache
+        # Replaced as a whole by login(), read once per request: never mutated in place.
+        self._auth = AuthState()
+        self._login_lock = threading.Lock()
+        self._in_flight = SingleFlight()
+        # Caps the requests in flight across all fan-out paths, adapting to the server's response
+        # (fixed at max_workers without adaptive_concurrency), and schedules them by lane.
+        adaptive = self.transport.adaptive_concurrency
+        self.limiter = AdaptiveLimiter(
+            initial=self.transport.max_workers,
+            min_limit=self.transport.min_concurrency if adaptive else self.transport.max_workers,
+            max_limit=self.transport.max_concurrency if adaptive else self.transport.max_workers,
+            on_change=lambda limit: self.metrics.set_gauge("concurrency_limit", limit),
+            lanes=(Lane("write", 0), Lane("read", 1), Lane("bulk", 2, share=self.transport.bulk_share)))
+        self._lane = threading.local()
+        # Callbacks told about every asset this client creates, updates or deletes.
+        self._mutation_listeners: List[Callable[[str, str, Optional[Dict]], None]] = []
+        # Short-lived memo of per-asset reads (thresholds, latest results) used by the bulk getters.
+        self.memo = TTLCache(ttl=self.MEMO_TTL, maxsize=self.MEMO_SIZE)
+        self.asset_cache = TTLCache(ttl=self.ASSET_CACHE_TTL, maxsize=self.ASSET_CACHE_SIZE)
+        self.add_mutation_listener(self._invalidate_caches)
+
+    @property
+    def customer_db(self) -> Optional[str]:
+        return self._auth.customer_db
 
     def _request(self, method: str, endpoint: str, **kwargs) -> Any:
         """Centralized method for making API requests."""
-        url = f"{self.base_url}{endpoint}"
-        try:
-            response = self.session.request(method, url, **kwargs)
-            response.raise_for_status()  # Raises HTTPError for bad responses (4xx or 5xx)
-            if response.content:
-                return response.json()
+        if method == "GET" and self.transport.coalesce_gets:
+            # Identical GETs already in flight (e.g. the same parent asset asked by
+            # several workers) share one network call; each caller decodes its own copy.
+            key = (endpoint, _freeze(kwargs.get("params")), _freeze(kwargs.get("headers")))
+            response = self._in_flight.do(key, lambda: self._send(method, endpoint, **kwargs))
+        else:
+            response = self._send(method, endpoint, **kwargs)
+        if not response.content:
             return None
-        except requests.exceptions.JSONDecodeError:
+        try:
+            return self.codec.loads(response.content)
+        except ValueError:
             # Handle cases where the response is not valid JSON
             return response.text
+
+    def _send(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        """Sends one request (re-logging in once on a 401) and records its metrics."""
+        url = f"{self.base_url}{endpoint}"
+        kwargs.setdefault("timeout", self.transport.timeout)
+        if kwargs.get("json") is not None:
+            self._encode_json_body(kwargs)
+        extra_headers = kwargs.pop("headers", None)
+        response = None
+        retries = 0
+        start = time.perf_counter()
+        try:
+            auth = self._auth
+            response = self._send_with(auth, method, endpoint, extra_headers, kwargs)
+            if response.status_code == 401 and auth.customer_db and not endpoint.startswith(self.LOGIN_ENDPOINT):
+                # The token expired (or was revoked) during a long job: log in again and retry once.
+                self._relogin(auth)
+                retries += 1
+                response = self._send_with(self._auth, method, endpoint, extra_headers, kwargs)
+            response.raise_for_status()  # Raises HTTPError for bad responses (4xx or 5xx)
+            return response
         except requests.exceptions.RequestException as e:
             print(f"An error occurred during the API request to {url}: {e}")
             raise
+        finally:
+            body = kwargs.get("data")
+            self.metrics.record(
+                method, endpoint,
+                status=response.status_code if response is not None else 0,
+                elapsed=time.perf_counter() - start,
+                bytes_in=len(response.content) if response is not None else 0,
+                bytes_out=len(body) if isinstance(body, (bytes, str)) else 0,
+                retries=retries,
+            )
+
+    @contextlib.contextmanager
+    def lane(self, name: str) -> Iterator[None]:
+        """
+        Sends the requests made by this thread inside the block in the given lane:
+        'write' (first served), 'read' or 'bulk' (at most bulk_share of the limit).
+        Without it, GETs go to 'read' and every other method to 'write'.
+
+            with client.lane("bulk"):
+                trends = client.get_trends(...)
+        """
+        previous = getattr(self._lane, "name", None)
+        self._lane.name = name
+        try:
+            yield
+        finally:
+            self._lane.name = previous
+
+    def _in_lane(self, name: str, function: Callable[..., Any]) -> Callable[..., Any]:
+        """Wraps function so that it runs in the lane on whichever worker thread calls it."""
+        def wrapper(*args, **kwargs):
+            with self.lane(name):
+                return function(*args, **kwargs)
+        return wrapper
+
+    def _send_with(self, auth: AuthState, method: str, endpoint: str, extra_headers: Optional[Dict],
+                   kwargs: Dict) -> requests.Response:
+        """
+        Sends one request on a pooled session, authorized with the given auth state,
+        within a slot of its lane of the concurrency limit.
+        """
+        url = f"{self.base_url}{endpoint}"
+        headers = {"Authorization": auth.authorization} if auth.authorization else {}
+        if extra_headers:
+            headers.update(extra_headers)
+        lane = getattr(self._lane, "name", None) or ("read" if method == "GET" else "write")
+        epoch = self.limiter.acquire(lane)
+        overloaded = True  # Connection errors and timeouts count as overload too.
+        start = time.perf_counter()
+        try:
+            with self.sessions.session() as session:
+                response = session.request(method, url, headers=headers, **kwargs)
+            overloaded = response.status_code == 429 or response.status_code >= 500
+            return response
+        finally:
+            self.limiter.release(epoch, f"{method} {endpoint_template(endpoint)}",
+                                 time.perf_counter() - start, overloaded, lane)
+
+    def add_mutation_listener(self, listener: Callable[[str, str, Optional[Dict]], None]) -> None:
+        """
+        Registers listener(kind, asset_id, asset) to be called after every successful
+        asset write of this client: kind is 'created', 'updated' or 'deleted', and
+        asset is the server's response body (None for deletions).
+        """
+        self._mutation_listeners.append(listener)
+
+    def remove_mutation_listener(self, listener: Callable[[str, str, Optional[Dict]], None]) -> None:
+        if listener in self._mutation_listeners:
+            self._mutation_listeners.remove(listener)
+
+    def _notify_mutation(self, kind: str, asset_id: str, asset: Optional[Dict] = None) -> None:
+        for listener in list(self._mutation_listeners):
+            try:
+                listener(kind, asset_id, asset)
+            except Exception as e:
+                # A failing observer must never fail the write that already succeeded.
+                print(f"Mutation listener error on {kind} '{asset_id}': {e}")
+
+    def _invalidate_caches(self, kind: str, asset_id: str, asset: Optional[Dict]) -> None:
+        self.memo.invalidate_where(lambda key: key[1] == asset_id)
+        self.asset_cache.invalidate(asset_id)
+
+    def _encode_json_body(self, kwargs: Dict) -> None:
+        """
+        Replaces a 'json' request argument by a body serialized with the client's codec,
+        gzip-compressed when the transport asks for it and the body is large enough.
+        """
+        body = self.codec.dumps(kwargs.pop("json"))
+        headers = dict(kwargs.get("headers") or {})
+        headers["Content-Type"] = "application/json"
+        if self.transport.gzip_requests and len(body) >= self.transport.gzip_min_size:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        kwargs["data"] = body
+        kwargs["headers"] = headers
 
     def _fetch_all_paginated_data(self, endpoint: str, params: Optional[Dict] = None, page_size: int=1000 ) -> List[Dict]:
-        """Fetches all items from a paginated API endpoint."""
+        """
+        Fetches all items from a paginated API endpoint, pages 2..n concurrently.
+
+        Failed pages are retried (PAGE_RETRIES rounds, with a growing pause) without
+        refetching the completed ones; page 1, which gives the total, is retried the
+        same way before the others are started. With a spool_dir, every completed
+        page is also checkpointed to disk: if pages still fail, the error keeps them,
+        and the same listing started again (even from a new process) only fetches
+        what is missing.
+
+        Raises:
+            IncompleteListingError: If some pages still failed after the retries.
+            requests.exceptions.RequestException: If page 1 still failed after the retries,
+                or was refused (4xx).
+        """
         if params is None:
             params = {}
         
         params.update({"p": 1, "count": page_size})
         
-        first_page = self._request("GET", endpoint, params=params)
+        # Listings run in the bulk lane, so they never hold back single reads and writes.
+        for attempt in range(self.PAGE_RETRIES + 1):
+            if attempt:
+                print(f"Retrying page 1 of {endpoint} (attempt {attempt + 1})...")
+                time.sleep(min(2 ** (attempt - 1), 30))
+            try:
+                with self.lane("bulk"):
+                    first_page = self._request("GET", endpoint, params=params)
+                break
+            except requests.exceptions.RequestException as e:
+                response = getattr(e, "response", None)
+                refused = response is not None and response.status_code < 500 and response.status_code != 429
+                if attempt == self.PAGE_RETRIES or refused:
+                    raise
         if not first_page or "_embedded" not in first_page:
             return []
 
-        all_items = first_page["_embedded"]
         total_items = first_page["_meta"]["total"]
-        
-        # Use ThreadPoolExecutor for concurrent fetching of remaining pages
-        pages_to_fetch = range(2, (total_items // page_size) + 2)
+        page_count = max(math.ceil(total_items / page_size), 1)
+        pages: Dict[int, List[Dict]] = {1: first_page["_embedded"]}
+
+        spool = None
+        if self.spool_dir and page_count > 1:
+            identity = {"base_url": self.base_url, "db": str(self.customer_db), "endpoint": endpoint,
+                        **{f"param.{k}": str(v) for k, v in params.items() if k != "p"}}
+            spool = PageSpool(self.spool_dir, identity, codec=self.codec)
+            if spool.resume(total_items):
+                done = [page for page in spool.done_pages() if 1 < page <= page_count]
+                print(f"Resuming {endpoint}: {len(done)}/{page_count - 1} page(s) already spooled.")
+                pages.update({page: spool.load(page) for page in done})
+            spool.save(1, pages[1])
         
         def fetch_page(page_num):
             page_params = params.copy()
             page_params["p"] = page_num
             page_data = self._request("GET", endpoint, params=page_params)
-            return page_data["_embedded"] if page_data and "_embedded" in page_data else []
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_page = {executor.submit(fetch_page, page): page for page in pages_to_fetch}
-            for future in concurrent.futures.as_completed(future_to_page):
-                all_items.extend(future.result())
+            items = page_data["_embedded"] if page_data and "_embedded" in page_data else []
+            if spool is not None:
+                spool.save(page_num, items)
+            return items
 
-        return all_items
+        # Use ThreadPoolExecutor for concurrent fetching of remaining pages
+        failed: Dict[int, str] = {}
+        for attempt in range(self.PAGE_RETRIES + 1):
+            missing = [page for page in range(2, page_count + 1) if page not in pages]
+            if not missing:
+                break
+            if attempt:
+                print(f"Retrying {len(missing)} failed page(s) of {endpoint} (attempt {attempt + 1})...")
+                time.sleep(min(2 ** (attempt - 1), 30))
+            failed = {}
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.transport.fanout_workers) as executor:
+                future_to_page = {executor.submit(self._in_lane("bulk", fetch_page), page): page for page in missing}
+                for future in concurrent.futures.as_completed(future_to_page):
+                    try:
+                        pages[future_to_page[future]] = future.result()
+                    except requests.exceptions.RequestException as e:
+                        failed[future_to_page[future]] = str(e)
+
+        if failed:
+            raise IncompleteListingError(endpoint, failed, spool.path if spool is not None else None)
+        if spool is not None:
+            spool.clear()
+        return [item for page in sorted(pages) for item in pages[page]]
+
+
+    def _relogin(self, rejected_auth: AuthState) -> None:
+        """Logs in again after a 401, unless another thread already refreshed the token."""
+        with self._login_lock:
+            if self._auth is not rejected_auth:
+                return
+            print(f"Token rejected by the server, logging in again to '{self.customer_db}'...")
+            self.login(self.customer_db, use_cache=False)
+
+    def _token_cache_key(self, customer_db: str) -> str:
+        return TokenCache.make_key(self.base_url, self.username, customer_db)
+
+    def login(self, customer_db: str, use_cache: bool = True) -> List[str]:
+        """
+        Authenticates the user and selects a customer database.
+        When a token cache is configured and holds a valid token for this
+        database, it is reused and no request is sent.
+        """
+        login_endpoint = self.LOGIN_ENDPOINT
 
+        if self.token_cache is not None:
+            cache_key = self._token_cache_key(customer_db)
+            cached = self.token_cache.get(cache_key) if use_cache else None
+            if cached:
+                self._auth = AuthState(cached["token"], customer_db)
+                print(f"Reusing cached token for database '{customer_db}'.")
+                return cached["dbs"]
+            self.token_cache.invalidate(cache_key)
 
-    def login(self, customer_db: str) -> List[str]:
-        """Authenticates the user and selects a customer database."""
-        login_endpoint = "/apilogin/login"
-        
         # Step 1: Initial Login to get token and available DBs
         credentials = {"username": self.username, "password": self.password}
         user_data = self._request("POST", login_endpoint, json=credentials)
@@ -116,16 +383,26 @@ class IcareApiClient:
         if customer_db not in available_dbs:
             raise ValueError(f"Database '{customer_db}' not available for this user.")
 
-        self.session.headers["Authorization"] = f"Bearer {user_data['token']}"
-        
-        # Step 2: Select the database to get a specific token
+        # Step 2: Select the database to get a specific token. The intermediate user
+        # token is only sent with this request, never seen by other threads.
         db_selection_endpoint = f"{login_endpoint}/{customer_db}"
-        final_user_data = self._request("GET", db_selection_endpoint)
-        self.session.headers["Authorization"] = f"Bearer {final_user_data['token']}"
+        user_auth = AuthState(user_data['token'])
+        final_user_data = self._request("GET", db_selection_endpoint,
+                                        headers={"Authorization": user_auth.authorization})
+        self._auth = AuthState(final_user_data['token'], customer_db)
+
+        if self.token_cache is not None:
+            self.token_cache.put(self._token_cache_key(customer_db), final_user_data['token'], available_dbs)
         
         print(f"Successfully logged in to database '{customer_db}'.")
         return available_dbs
 
+    def list_databases(self) -> List[str]:
+        """Returns the customer databases this account can access (first login step only, no db selected)."""
+        credentials = {"username": self.username, "password": self.password}
+        user_data = self._request("POST", self.LOGIN_ENDPOINT, json=credentials)
+        return [db['db'] for db in user_data['dbs']]
+
     def get_full_hierarchy(self, exclude_recycle_bin: bool = True) -> List[Dict]:
         """
         Gets the full asset hierarchy for the database.
@@ -133,7 +410,7 @@ class IcareApiClient:
         """
         if exclude_recycle_bin:
             # Get the root node ID to fetch only assets under it
-            toplevels = self._request("GET", "/apiv4/assets/toplevels")
+            toplevels = self.get_toplevels()
             if not toplevels:
                 return []
             root_id = toplevels[0]["_id"]
@@ -141,9 +418,82 @@ class IcareApiClient:
         else:
             return self._fetch_all_paginated_data("/api/assets/v0/", params={"extra": "path"})
 
-    def get_asset(self, asset_id: str) -> Dict:
-        """Retrieves details for a single asset."""
-        return self._request("GET", f"/apiv4/assets/{asset_id}")
+    def iter_assets(self, types: Optional[Iterable[int]] = None, fields: Optional[Iterable[str]] = None,
+                    under: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Lists assets below a root, filtered by type and projected to some fields.
+
+        The type filter ('t') and the projection ('fields') are sent to /api/assets/v0/
+        so that the server only returns what is needed; they are applied again
+        on the client, so the result is the same on a server that ignores them.
+        '_id', 't' and 'path' are always part of the projection.
+
+        Args:
+            types (Optional[Iterable[int]]): Asset types to keep (e.g. [33554435] for transmitters).
+            fields (Optional[Iterable[str]]): Fields to return; all fields when omitted.
+            under (Optional[str]): Root of the listing (defaults to the database root, recycle bin excluded).
+
+        Yields:
+            Dict: One asset per matching item.
+        """
+        if under is None:
+            toplevels = self.get_toplevels()
+            if not toplevels:
+                return
+            under = toplevels[0]["_id"]
+        params = {"parent": under, "extra": "path"}
+        wanted_types = {int(t) for t in types} if types is not None else None
+        if wanted_types is not None:
+            params["t"] = ",".join(str(t) for t in sorted(wanted_types))
+        wanted_fields = None
+        if fields is not None:
+            wanted_fields = list(dict.fromkeys(["_id", "t", "path", *fields]))
+            params["fields"] = ",".join(wanted_fields)
+
+        for asset in self._fetch_all_paginated_data("/api/assets/v0/", params=params):
+            if wanted_types is not None and asset.get("t") not in wanted_types:
+                continue
+            if wanted_fields is not None:
+                asset = {key: asset[key] for key in wanted_fields if key in asset}
+            yield asset
+
+    def get_toplevels(self) -> List[Dict]:
+        """Returns the top-level assets of the database (memoized for MEMO_TTL seconds)."""
+        toplevels = self.memo.get(("toplevels", None))
+        if toplevels is MISSING:
+            toplevels = self._request("GET", "/apiv4/assets/toplevels")
+            self.memo.put(("toplevels", None), toplevels)
+        return toplevels
+
+    def get_asset(self, asset_id: str, max_age: Optional[float] = None) -> Dict:
+        """
+        Retrieves details for a single asset, through the client's asset cache.
+
+        A cached asset is revalidated with If-None-Match: a 304 answer reuses the
+        cached body, so a repeated read costs a round trip but no download.
+        With max_age, a copy cached less than max_age seconds ago is returned
+        without any request; max_age is capped at ASSET_CACHE_TTL, so an older
+        copy is always revalidated. The cache is cleared for an asset whenever this
+        client updates, replaces or deletes it. Each call returns a new dict.
+        """
+        endpoint = f"/apiv4/assets/{asset_id}"
+        if max_age is not None:
+            fresh = self.asset_cache.get(asset_id, max_age)
+            if fresh is not MISSING:
+                return self.codec.loads(fresh[1])
+
+        cached = self.asset_cache.get(asset_id)
+        if cached is not MISSING:
+            asset = self._request("GET", endpoint, headers={"If-None-Match": cached[0]})
+            if asset is None:  # 304 Not Modified
+                self.asset_cache.put(asset_id, cached)
+                return self.codec.loads(cached[1])
+        else:
+            asset = self._request("GET", endpoint)
+
+        if isinstance(asset, dict) and asset.get("_etag"):
+            self.asset_cache.put(asset_id, (asset["_etag"], self.codec.dumps(asset)))
+        return asset
 
     def get_network_status(self) -> List[Dict]:
         """Retrieves the raw Net-Wi-Care network status."""
@@ -153,6 +503,10 @@ class IcareApiClient:
         """Retrieves the raw Preselections."""
         return self._request("GET", f"/apiv4/tasks/{asset_id}/task/{task_id}")
 
+    def get_asset_tasks(self, asset_id: str) -> List[Dict]:
+        """Lists the tasks of an asset: the 'task list' that every task body links to as its '_links.parent'."""
+        return self._fetch_all_paginated_data(f"/apiv4/tasks/{asset_id}")
+
     def get_preselections(self, tach: Optional[bool] = None) -> List[Dict]:
         """
         Fetches all available task preselections, handling pagination automatically.
@@ -194,6 +548,60 @@ class IcareApiClient:
         """Retrieves thresholds for a single measure point."""
         return self._request("GET", f"/apiv4/assets/{measure_point_id}/thresholds")
 
+    def _fetch_bulk(self, kind: str, asset_ids: List[str], fetch: Callable[[str], Any],
+                    max_workers: Optional[int], max_age: Optional[float]) -> Dict[str, Any]:
+        """Fetches one resource per asset concurrently, reusing memoized values younger than max_age."""
+        unique_ids = list(dict.fromkeys(asset_ids))
+        results, to_fetch, failed = {}, [], {}
+        for asset_id in unique_ids:
+            cached = self.memo.get((kind, asset_id), max_age)
+            if cached is MISSING:
+                to_fetch.append(asset_id)
+            else:
+                results[asset_id] = cached
+
+        def fetch_one(asset_id: str) -> Any:
+            value = fetch(asset_id)
+            self.memo.put((kind, asset_id), value)
+            return value
+
+        if to_fetch:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or self.transport.fanout_workers) as executor:
+                future_to_id = {executor.submit(self._in_lane("bulk", fetch_one), asset_id): asset_id
+                                for asset_id in to_fetch}
+                for future in concurrent.futures.as_completed(future_to_id):
+                    try:
+                        results[future_to_id[future]] = future.result()
+                    except requests.exceptions.RequestException as e:
+                        failed[future_to_id[future]] = str(e)
+
+        print(f"{kind}: {len(unique_ids) - len(to_fetch)} from cache, {len(to_fetch) - len(failed)} fetched, "
+              f"{len(failed)} failed.")
+        return {asset_id: results[asset_id] for asset_id in unique_ids if asset_id in results}
+
+    def get_thresholds_bulk(self, measure_point_ids: List[str], max_workers: Optional[int] = None,
+                            max_age: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        Retrieves the thresholds of many measure points concurrently.
+
+        Thresholds fetched less than max_age seconds ago (default MEMO_TTL) are
+        reused; assets this client updated or deleted since are always fetched again.
+
+        Args:
+            measure_point_ids (List[str]): The measure points to read.
+            max_workers (Optional[int]): Concurrent requests (defaults to the transport's fanout_workers).
+            max_age (Optional[float]): Oldest memoized value accepted, in seconds (0 forces a refresh).
+
+        Returns:
+            Dict: {measure_point_id: thresholds}. Measure points whose request failed are left out.
+        """
+        return self._fetch_bulk("thresholds", measure_point_ids, self.get_thresholds, max_workers, max_age)
+
+    def get_latest_results_bulk(self, asset_ids: List[str], max_workers: Optional[int] = None,
+                                max_age: Optional[float] = None) -> Dict[str, List[Dict]]:
+        """Retrieves the latest results of many assets concurrently (see get_thresholds_bulk)."""
+        return self._fetch_bulk("latest results", asset_ids, self.get_latest_results, max_workers, max_age)
+
     def get_diagnoses(self, asset_id: str, start: datetime.datetime, end: datetime.datetime) -> List[Dict]:
         """Fetches all diagnoses for an asset within a date range."""
         endpoint = f"/apiv4/diagnoses/{asset_id}"
@@ -205,7 +613,10 @@ class IcareApiClient:
     
     def create_asset(self, asset_payload: Dict) -> Dict:
         """Creates a new asset."""
-        return self._request("POST", "/apiv4/assets/", json=asset_payload)
+        created = self._request("POST", "/apiv4/assets/", json=asset_payload)
+        if isinstance(created, dict) and created.get("_id"):
+            self._notify_mutation("created", created["_id"], created)
+        return created
 
     def create_asset_batch(self, batch_payload: List[Dict]) -> Dict:
         """
@@ -214,28 +625,101 @@ class IcareApiClient:
         """
         # L'endpoint est le même que pour créer un seul asset,
         # mais le payload est une liste.
-        return self._request("POST", "/apiv4/assets/", json=batch_payload)
+        created = self._request("POST", "/apiv4/assets/", json=batch_payload)
+        for asset in batch_items(created):
+            if asset.get("_id"):
+                self._notify_mutation("created", asset["_id"], asset)
+        return created
 
     def delete_asset(self, asset_id: str, etag: str) -> None:
         # The endpoint is the specific resource URL for the asset.
         endpoint = f"/apiv4/assets/{asset_id}"
 
         # The 'If-Match' header is crucial for safe, conditional deletion.
-        headers = self.session.headers.copy()
-        headers['If-Match'] = etag
-        
-        # Use the session's 'delete' method with the specific headers.
-        response = self.session.delete(
-            f"{self.base_url}{endpoint}",
-            headers=headers
-        )
-        
-        # Raise an exception for any non-2xx status code.
-        response.raise_for_status()
+        # Per-request headers are merged with the session ones (Authorization, etc.).
+        self._request("DELETE", endpoint, headers={'If-Match': etag})
+        self._notify_mutation("deleted", asset_id)
         
         # A successful DELETE returns no content, so we return None.
         return None
 
+    def get_subtree(self, root_id: str) -> List[Dict]:
+        """Gets an asset together with every asset below it (with their 'path')."""
+        root_asset = self.get_asset(root_id)
+        descendants = self._fetch_all_paginated_data("/api/assets/v0/", params={"parent": root_id, "extra": "path"})
+        return [root_asset] + [asset for asset in descendants if asset.get("_id") != root_id]
+
+    def delete_subtree(self, root_id: str, dry_run: bool = False, include_root: bool = True,
+                       hierarchy: Optional[HierarchyIndex] = None, max_workers: Optional[int] = None) -> Dict:
+        """
+        Deletes an asset and everything below it, children before parents.
+
+        The subtree is ordered leaf-first by depth; each depth level is deleted
+        concurrently and the next level only starts once the previous one is done.
+        A 412 (stale ETag) triggers a single re-fetch and retry, and a 404 counts
+        as already deleted. If any deletion of a level fails, the parents above it
+        are left untouched.
+
+        Args:
+            root_id (str): The ID of the top asset of the branch.
+            dry_run (bool): If True, only lists what would be deleted.
+            include_root (bool): If False, only the descendants of root_id are deleted.
+            hierarchy (Optional[HierarchyIndex]): An index already containing the
+                subtree (with '_etag's). Fetched from the API when omitted.
+            max_workers (Optional[int]): Number of concurrent DELETE requests per level
+                (defaults to the transport's fanout_workers).
+
+        Returns:
+            Dict: {'levels': [[ids], ...], 'deleted': [ids], 'failed': {id: error}}
+        """
+        if hierarchy is None or root_id not in hierarchy:
+            hierarchy = HierarchyIndex(self.get_subtree(root_id), keep_raw=False)
+        levels = hierarchy.leaf_first_levels(root_id, include_root=include_root)
+        summary = {"levels": levels, "deleted": [], "failed": {}}
+
+        if dry_run:
+            print(f"[DRY RUN] {sum(len(level) for level in levels)} asset(s) would be deleted under '{root_id}':")
+            for depth, level in enumerate(levels, start=1):
+                print(f"  Level {depth}/{len(levels)} ({len(level)} asset(s)):")
+                for asset_id in level:
+                    asset = hierarchy.get(asset_id) or {}
+                    print(f"    - {asset.get('name', 'N/A')} ({asset_id}, t={asset.get('t')})")
+            return summary
+
+        def delete_one(asset_id: str) -> None:
+            etag = (hierarchy.get(asset_id) or {}).get("_etag")
+            try:
+                if not etag:
+                    etag = self.get_asset(asset_id).get("_etag")
+                self.delete_asset(asset_id, etag)
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status == 404:
+                    return
+                if status != 412:
+                    raise
+                # The asset changed since the listing: retry once with a fresh ETag.
+                self.metrics.note_retry("DELETE", f"/apiv4/assets/{asset_id}")
+                self.delete_asset(asset_id, self.get_asset(asset_id).get("_etag"))
+
+        for depth, level in enumerate(levels, start=1):
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or self.transport.fanout_workers) as executor:
+                future_to_id = {executor.submit(delete_one, asset_id): asset_id for asset_id in level}
+                for future in concurrent.futures.as_completed(future_to_id):
+                    asset_id = future_to_id[future]
+                    try:
+                        future.result()
+                        summary["deleted"].append(asset_id)
+                        hierarchy.remove(asset_id)
+                    except Exception as e:
+                        summary["failed"][asset_id] = str(e)
+            print(f"Level {depth}/{len(levels)}: deleted {len(level) - len(summary['failed'])}/{len(level)} asset(s).")
+            if summary["failed"]:
+                print(f"Stopping: {len(summary['failed'])} deletion(s) failed, parent levels were not touched.")
+                break
+
+        return summary
+
     
     # In IseeApiClient.py
     def create_task(self, task_payload: dict) -> dict:
@@ -260,31 +744,17 @@ class IcareApiClient:
             requests.exceptions.HTTPError: If the server returns an error (e.g., 412
             Precondition Failed if the ETag is outdated, 404 Not Found, etc.).
         """
-        # We call the session directly to easily add the custom 'If-Match' header
-        # while preserving the other session headers like Authorization.
-        headers = self.session.headers.copy()
-        headers['If-Match'] = etag
-        
-        response = self.session.patch(
-            f"{self.base_url}/apiv4/assets/{asset_id}",
-            headers=headers,
-            json=payload
-        )
-        
-        # Raise an exception for non-2xx status codes
-        response.raise_for_status()
-        
-        # Return the JSON body of the successful response
-        return response.json() if response.content else None
+        # The custom 'If-Match' header is merged with the session headers like Authorization.
+        updated = self._request("PATCH", f"/apiv4/assets/{asset_id}", headers={'If-Match': etag}, json=payload)
+        self._notify_mutation("updated", asset_id, updated if isinstance(updated, dict) else None)
+        return updated
 
     def upload_image(self, file_path: str) -> Dict:
         """Uploads an image file and returns its metadata (including the iSee filename)."""
         with open(file_path, 'rb') as f:
             files = {'file': (file_path, f)}
-            # File uploads are special and don't always use the JSON helper
-            response = self.session.post(f"{self.base_url}/apiv4/image/", files=files)
-            response.raise_for_status()
-            return response.json()
+            # File uploads are sent as multipart, never as a JSON body
+            return self._request("POST", "/apiv4/image/", files=files)
             
     def create_fault(self, fault_payload: Dict) -> Dict:
         """Creates a new fault associated with an asset."""
@@ -297,116 +767,99 @@ class IcareApiClient:
         Replaces an entire asset with a new payload using a PUT request.
         The ETag is required for optimistic locking.
         """
-        headers = self.session.headers.copy()
-        headers['If-Match'] = etag
-        
         # Use PUT to replace the entire resource
-        response = self.session.put(
-            f"{self.base_url}/apiv4/assets/{asset_id}",
-            headers=headers,
-            json=full_payload
-        )
-        
-        response.raise_for_status()
-        return response.json() if response.content else None
+        replaced = self._request("PUT", f"/apiv4/assets/{asset_id}", headers={'If-Match': etag}, json=full_payload)
+        self._notify_mutation("updated", asset_id, replaced if isinstance(replaced, dict) else None)
+        return replaced
 
 
 # --- Part 2: Data Processing Functions ---
-
-def process_hierarchy_to_dataframe(hierarchy_data: List[Dict]) -> pd.DataFrame:
-    """Converts raw hierarchy data into a structured Pandas DataFrame."""
-    if not hierarchy_data:
-        return pd.DataFrame()
-
-    id_to_name_map = {asset['_id']: asset['name'] for asset in hierarchy_data}
-    processed_records = []
-    for asset in hierarchy_data:
-        record = {
-            '_id': asset['_id'],
-            'name': asset['name'],
-            'type': ITEM_TYPE.get(str(asset.get('t'))),
-            'path_ids': asset.get('path', [])
-        }
-        path_names = [id_to_name_map.get(node_id, 'Unknown') for node_id in record['path_ids']]
-        for i, level_name in enumerate(path_names):
-            record[f'level{i+1}'] = level_name
-        processed_records.append(record)
-    
-    df = pd.DataFrame(processed_records)
-    level_cols = sorted([col for col in df.columns if col.startswith('level')])
-    other_cols = ['name', '_id', 'type', 'path_ids']
-    df = df[level_cols + other_cols]
-    return df
-
-def process_network_status_to_dataframe(network_data: List[Dict], hierarchy_df: pd.DataFrame) -> pd.DataFrame:
-    """Processes raw network status, flattens it, and merges it with hierarchy info."""
-    if not network_data:
-        return pd.DataFrame()
-    
-    flat_network_list = []
-    def flatten_recursive(node: Dict, coordinator_mac: Optional[str] = None):
-        for mac, details in node.items():
-            record = {
-                'mac': mac,
-                'coordinator': coordinator_mac,
-                'type': details.get('type'),
-                'last_com': pd.to_datetime(details.get('last_com')),
-                'batt': details.get('batt'),
-                'child_count': len(details.get('children', {}))
-            }
-            flat_network_list.append(record)
-            current_coordinator = mac if details.get('type') == 'C' else coordinator_mac
-            if 'children' in details and details['children']:
-                flatten_recursive(details['children'], current_coordinator)
-
-    for gateway in network_data:
-        flatten_recursive(gateway)
-    return pd.DataFrame(flat_network_list)
-
-def process_trends_to_dataframe(trends_data: List[Dict]) -> pd.DataFrame:
-    """Converts raw trend data into a structured Pandas DataFrame."""
-    if not trends_data:
-        return pd.DataFrame()
-    results_list = []
-    for result in trends_data:
-        for statistic in result.get('statistics', []):
-            results_list.append({
-                "meas_id": result['_id'],
-                "asset_id": result['asset'],
-                "status": statistic.get('status'),
-                "type": statistic.get('global_type'),
-                "value": statistic.get("value"),
-                "time": pd.to_datetime(result.get('acqend'))
-            })
-    return pd.DataFrame(results_list)
-
-def initializer(customer_db: str, 
-                              server_region: Server = Server.EU, 
-                              config_file: str = 'config/config.ini') -> Optional[IcareApiClient]:
-    """
-    Reads credentials from a config file, initializes, and returns an authenticated IcareApiClient.
-    """
+# The DataFrame helpers live in api.analytics so that importing the client does
+# not pay for pandas. They are still importable from here and loaded on first use.
+
+_ANALYTICS_EXPORTS = (
+    "process_hierarchy_to_dataframe",
+    "process_network_status_to_dataframe",
+    "process_trends_to_dataframe",
+    "process_thresholds_to_dataframe",
+    "process_latest_results_to_dataframe",
+)
+
+def __getattr__(name: str) -> Any:
+    if name in _ANALYTICS_EXPORTS:
+        from . import analytics
+        return getattr(analytics, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Process-wide registry of authenticated clients, keyed by (server, customer database).
+_CLIENT_REGISTRY: Dict[Tuple[Server, str], IcareApiClient] = {}
+_CLIENT_REGISTRY_LOCK = threading.Lock()
+
+def read_credentials(config_file: str = 'config/config.ini') -> Optional[Tuple[str, str]]:
+    """Reads (USERNAME, PASSWORD) from the DEFAULT section of the config file, None if missing."""
     config = configparser.ConfigParser()
     files_read = config.read(config_file)
     if not files_read:
         print(f"Error: The configuration file '{config_file}' was not found or is empty.")
         return None
     try:
-        username = config.get('DEFAULT', 'USERNAME')
-        password = config.get('DEFAULT', 'PASSWORD')
+        return config.get('DEFAULT', 'USERNAME'), config.get('DEFAULT', 'PASSWORD')
     except configparser.NoOptionError as e:
         print(f"Error: A required setting is missing from '{config_file}': {e}")
         return None
 
+def _reusable(client: Optional[IcareApiClient], transport: Optional[TransportConfig]) -> bool:
+    return client is not None and (transport is None or client.transport == transport)
+
+def initializer(customer_db: str, 
+                              server_region: Server = Server.EU, 
+                              config_file: str = 'config/config.ini',
+                              reuse: bool = True,
+                              transport: Optional[TransportConfig] = None) -> Optional[IcareApiClient]:
+    """
+    Reads credentials from a config file, initializes, and returns an authenticated IcareApiClient.
+
+    With reuse=True, a client already created in this process for the same
+    server and database (and transport, when one is given) is returned as is,
+    and the login token is cached in '.token_cache.json' next to the config
+    file so that later processes can skip the login while it is valid.
+    """
+    registry_key = (server_region, customer_db)
+    if reuse:
+        with _CLIENT_REGISTRY_LOCK:
+            if _reusable(_CLIENT_REGISTRY.get(registry_key), transport):
+                return _CLIENT_REGISTRY[registry_key]
+
+    credentials = read_credentials(config_file)
+    if credentials is None:
+        return None
+    username, password = credentials
+
     try:
         print("Initializing and logging into iCare API client...")
+        token_cache = None
+        if reuse:
+            token_cache = TokenCache(os.path.join(os.path.dirname(config_file), '.token_cache.json'))
         client = IcareApiClient(
             username=username,
             password=password,
-            server=server_region
+            server=server_region,
+            token_cache=token_cache,
+            transport=transport,
+            # ICARE_SPOOL_DIR makes large listings resumable after a failure or a restart.
+            spool_dir=os.environ.get("ICARE_SPOOL_DIR")
         )
         client.login(customer_db=customer_db)
         print("Client initialized and logged in successfully.")
+        # ICARE_METRICS=table|jsonl|prometheus prints (or writes to ICARE_METRICS_FILE) request metrics at exit.
+        if os.environ.get("ICARE_METRICS"):
+            client.metrics.report_at_exit(os.environ["ICARE_METRICS"], os.environ.get("ICARE_METRICS_FILE"))
+        if reuse:
+            with _CLIENT_REGISTRY_LOCK:
+                if _reusable(_CLIENT_REGISTRY.get(registry_key), transport):
+                    client = _CLIENT_REGISTRY[registry_key]
+                else:
+                    _CLIENT_REGISTRY[registry_key] = client
         return client
     except Exception as e:
         print(f"Failed to initialize API client: {e}")
@@ -427,6 +880,10 @@ if __name__ == '__main__':
     BQ_json_path = "sql-cloud-for-cargill-260414-d27681b597d8.json"
     CUSTOMER = "valtris"
     
+    # Run as a module (python -m api.client) so the relative imports resolve.
+    from .analytics import (process_hierarchy_to_dataframe, process_latest_results_to_dataframe,
+                            process_network_status_to_dataframe, process_thresholds_to_dataframe)
+
     print("Initializing API Client...")
     try:
         # 1. Initialize the client
@@ -445,15 +902,16 @@ if __name__ == '__main__':
         print("Hierarchy DataFrame:")
         print(df_hierarchy.head())
 
-        # Example: Get thresholds for the first measure point found
-        mp_df = df_hierarchy[df_hierarchy['type'] == 'MP']
-        if not mp_df.empty:
-            first_mp_id = mp_df.iloc[0]['_id']
-            first_mp_name = mp_df.iloc[0]['name']
-            print(f"\nFetching thresholds for Measure Point: '{first_mp_name}' ({first_mp_id})")
-            thresholds = client.get_thresholds(first_mp_id)
-            print("Thresholds data:")
-            print(json.dumps(thresholds, indent=2))
+        # Example: Get thresholds and latest results for every measure point
+        mp_ids = df_hierarchy.loc[df_hierarchy['type'] == 'MP', '_id'].tolist()
+        if mp_ids:
+            print(f"\nFetching thresholds and latest results for {len(mp_ids)} measure points...")
+            df_thresholds = process_thresholds_to_dataframe(client.get_thresholds_bulk(mp_ids))
+            df_latest = process_latest_results_to_dataframe(client.get_latest_results_bulk(mp_ids))
+            print("Thresholds DataFrame:")
+            print(df_thresholds.head())
+            print("Latest results DataFrame:")
+            print(df_latest.head())
         
         # Example: Get network status
         print("\nFetching network status...")
@@ -0,0 +1,161 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Merges concurrent calls that share a key: the first caller runs the function,
+    the others wait for it and receive the same result (or exception). Nothing is
+    cached once the call has returned.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+@dataclass(frozen=True)
+class Lane:
+    """
+    A class of requests with its own wait queue. Free slots go to the waiting
+    lane with the lowest priority number first, and a lane never holds more
+    than `share` of the limit (at least one slot).
+    """
+    name: str
+    priority: int
+    share: float = 1.0
+
+
+# Writes sit on the critical path of rollouts (create MP -> create task -> delete
+# old MP); single reads are interactive; listings and bulk getters can wait.
+DEFAULT_LANES = (Lane("write", 0), Lane("read", 1), Lane("bulk", 2, share=0.5))
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on the number of requests in flight, shared by every fan-out path
+    of a client (pagination, bulk getters, subtree deletes, ...) and split into
+    priority lanes (see Lane), so that a write never queues behind a 300-page listing.
+
+    While the limit is fully used and requests succeed at their usual latency,
+    it grows by one per window of `limit` completions (additive increase). A
+    429/5xx, a connection error or a latency above latency_tolerance times the
+    endpoint's running average cuts it by `backoff` (multiplicative decrease),
+    at most once per window: requests that were already in flight when the
+    limit was cut cannot cut it again.
+
+        epoch = limiter.acquire("read")    # blocks until the lane gets a slot
+        ... send ...
+        limiter.release(epoch, "GET /apiv4/assets/{id}", elapsed, overloaded=status == 429, lane="read")
+
+    With min_limit == max_limit the limit is fixed and only the lanes apply.
+    """
+
+    def __init__(self, initial: int = 10, min_limit: int = 1, max_limit: int = 64, backoff: float = 0.7,
+                 latency_tolerance: float = 2.0, on_change: Optional[Callable[[int], None]] = None,
+                 lanes: Sequence[Lane] = DEFAULT_LANES):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.on_change = on_change
+        self.in_flight = 0
+        self.decreases = 0
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._epoch = 0
+        self._baselines: Dict[str, float] = {}
+        self.lanes = {lane.name: lane for lane in lanes}
+        self.lane_in_flight = {name: 0 for name in self.lanes}
+        self.waiting = {name: 0 for name in self.lanes}
+        self._cond = threading.Condition()
+        if on_change is not None:
+            on_change(self.limit)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _has_room(self, lane: Lane) -> bool:
+        return (self.in_flight < int(self._limit)
+                and self.lane_in_flight[lane.name] < max(1, int(self._limit * lane.share)))
+
+    def _can_start(self, lane: Lane) -> bool:
+        if not self._has_room(lane):
+            return False
+        # A waiting lane of higher priority that could start right now goes first.
+        return not any(self.waiting[other.name] and other.priority < lane.priority and self._has_room(other)
+                       for other in self.lanes.values())
+
+    def acquire(self, lane: str = "read") -> int:
+        """Waits for a free slot in the lane and returns the epoch to hand back to release()."""
+        request_lane = self.lanes[lane]
+        with self._cond:
+            self.waiting[lane] += 1
+            try:
+                while not self._can_start(request_lane):
+                    self._cond.wait()
+            finally:
+                self.waiting[lane] -= 1
+            self.in_flight += 1
+            self.lane_in_flight[lane] += 1
+            # Lower-priority waiters held back by this one may now fit.
+            self._cond.notify_all()
+            return self._epoch
+
+    def release(self, epoch: int, key: str, latency: float, overloaded: bool = False, lane: str = "read") -> None:
+        """Frees the lane's slot and adapts the limit to the outcome of the request."""
+        with self._cond:
+            saturated = self.in_flight >= int(self._limit)
+            self.in_flight -= 1
+            self.lane_in_flight[lane] -= 1
+            before = int(self._limit)
+            baseline = self._baselines.get(key)
+            if not overloaded:
+                # The average follows lasting latency changes (e.g. a slower time of day).
+                self._baselines[key] = latency if baseline is None else baseline + 0.1 * (latency - baseline)
+            if overloaded or (baseline is not None and latency > self.latency_tolerance * baseline):
+                if epoch == self._epoch:
+                    self._limit = max(self.min_limit, self._limit * self.backoff)
+                    self._epoch += 1
+                    self.decreases += 1
+            elif saturated:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._cond.notify_all()
+            changed = int(self._limit) != before
+        if changed and self.on_change is not None:
+            self.on_change(self.limit)
@@ -0,0 +1,169 @@
+import concurrent.futures
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+from .client import IcareApiClient, Server, initializer, read_credentials
+from .transport import TransportConfig
+
+
+@dataclass(frozen=True)
+class FleetTarget:
+    """One customer database on one server."""
+    db: str
+    server: Server = Server.EU
+
+    def __str__(self) -> str:
+        return f"{self.server.name}/{self.db}"
+
+
+@dataclass
+class FleetContext:
+    """What an operation receives for one database: its own client and a capped worker pool."""
+    target: FleetTarget
+    client: IcareApiClient
+    max_workers: int
+
+    def map(self, function: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        """Runs function over items with at most max_workers concurrent calls on this database."""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(function, items))
+
+
+@dataclass
+class FleetResult:
+    target: FleetTarget
+    ok: bool
+    value: Any = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+
+@dataclass
+class FleetReport:
+    """Aggregated results of one operation over the fleet."""
+    results: List[FleetResult] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> List[FleetResult]:
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self) -> List[FleetResult]:
+        return [r for r in self.results if not r.ok]
+
+    def rows(self) -> List[Dict]:
+        """
+        Flattens the successful results into one list of dicts tagged with 'server'
+        and 'db' (a result that is a list contributes one row per item), ready
+        for a DataFrame or a CSV.
+        """
+        rows = []
+        for result in self.succeeded:
+            values = result.value if isinstance(result.value, list) else [result.value]
+            for value in values:
+                row = {"server": result.target.server.name, "db": result.target.db}
+                row.update(value if isinstance(value, dict) else {"value": value})
+                rows.append(row)
+        return rows
+
+    def summary(self) -> str:
+        lines = [f"\n--- Fleet summary: {len(self.succeeded)} ok, {len(self.failed)} failed ---"]
+        for result in sorted(self.results, key=lambda r: (r.ok, str(r.target))):
+            status = "ok" if result.ok else f"FAILED: {result.error}"
+            lines.append(f"  {str(result.target):<30} {result.seconds:7.1f}s  {status}")
+        text = "\n".join(lines)
+        print(text)
+        return text
+
+
+class FleetRunner:
+    """
+    Runs one bot operation over many customer databases, on one or more servers, in parallel.
+
+    Each database gets its own authenticated client (and so its own session and
+    connection pool). At most max_databases databases are processed at the same
+    time. per_db_workers caps the requests in flight on each database, so that
+    a large database cannot starve the others: it sizes ctx.map(), and the
+    default client_factory builds each client with transport_for(target), which
+    caps the client's own fan-out (bulk reads, paginated listings) the same way.
+    A failure on one database is recorded in the report and never stops the others.
+
+        runner = FleetRunner(FleetRunner.discover_targets([Server.EU, Server.US]))
+        report = runner.run(lambda ctx: ctx.client.get_network_status())
+    """
+
+    def __init__(self, targets: Sequence[FleetTarget], max_databases: int = 4,
+                 per_db_workers: Union[int, Dict[str, int]] = 4,
+                 client_factory: Optional[Callable[[FleetTarget], Optional[IcareApiClient]]] = None,
+                 config_file: str = 'config/config.ini'):
+        """
+        Args:
+            targets (Sequence[FleetTarget]): The databases to run on.
+            max_databases (int): Databases processed concurrently.
+            per_db_workers (Union[int, Dict[str, int]]): Concurrent calls allowed per database,
+                either for all of them or per db name (unlisted dbs get 4).
+            client_factory (Optional[Callable]): Returns a logged-in client for a target
+                (defaults to initializer() with the config file and transport_for(target)).
+            config_file (str): Credentials file used by the default client factory.
+        """
+        self.targets = list(dict.fromkeys(targets))
+        self.max_databases = max_databases
+        self.per_db_workers = per_db_workers
+        self.client_factory = client_factory or (
+            lambda target: initializer(target.db, server_region=target.server, config_file=config_file,
+                                       transport=self.transport_for(target)))
+
+    @staticmethod
+    def discover_targets(servers: Iterable[Server] = (Server.EU,), config_file: str = 'config/config.ini',
+                         include: Optional[Callable[[str], bool]] = None,
+                         base_url: Optional[str] = None) -> List[FleetTarget]:
+        """Lists every database the account can access on each server, optionally filtered by name."""
+        credentials = read_credentials(config_file)
+        if credentials is None:
+            return []
+        targets = []
+        for server in servers:
+            client = IcareApiClient(*credentials, server=server, base_url=base_url)
+            try:
+                dbs = client.list_databases()
+            except Exception as e:
+                print(f"Could not list the databases of {server.name}: {e}")
+                continue
+            targets += [FleetTarget(db, server) for db in dbs if include is None or include(db)]
+        print(f"Discovered {len(targets)} database(s) on {', '.join(s.name for s in servers)}.")
+        return targets
+
+    def _workers_for(self, target: FleetTarget) -> int:
+        if isinstance(self.per_db_workers, dict):
+            return self.per_db_workers.get(target.db, 4)
+        return self.per_db_workers
+
+    def transport_for(self, target: FleetTarget) -> TransportConfig:
+        """Transport of a database's client: at most per_db_workers requests in flight, fan-outs included."""
+        workers = self._workers_for(target)
+        return TransportConfig(max_workers=workers, min_concurrency=min(2, workers), max_concurrency=workers)
+
+    def _run_one(self, operation: Callable[[FleetContext], Any], target: FleetTarget) -> FleetResult:
+        start = time.perf_counter()
+        try:
+            client = self.client_factory(target)
+            if client is None:
+                return FleetResult(target, ok=False, error="login failed", seconds=time.perf_counter() - start)
+            value = operation(FleetContext(target, client, self._workers_for(target)))
+            return FleetResult(target, ok=True, value=value, seconds=time.perf_counter() - start)
+        except Exception as e:
+            return FleetResult(target, ok=False, error=f"{type(e).__name__}: {e}",
+                               seconds=time.perf_counter() - start)
+
+    def run(self, operation: Callable[[FleetContext], Any]) -> FleetReport:
+        """Runs operation(ctx) on every target and returns the aggregated report."""
+        report = FleetReport()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_databases) as executor:
+            futures = [executor.submit(self._run_one, operation, target) for target in self.targets]
+            for done, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+                result = future.result()
+                report.results.append(result)
+                status = "ok" if result.ok else f"failed ({result.error})"
+                print(f"[{done}/{len(self.targets)}] {result.target}: {status} in {result.seconds:.1f}s")
+        return report
@@ -0,0 +1,404 @@
+"""
+Idempotent creates: every logical create gets a deterministic key, recorded in a
+local journal before the POST is sent and completed with the server's answer.
+
+A create whose key is already done is answered from the journal; one whose
+outcome is unknown (a timeout, a dropped connection, a 5xx, or a process that
+died mid-request) is first looked up in the hierarchy index and on the server,
+and only sent again if nothing was created. Creates can then be retried and
+parallelized without producing duplicate MPs or transmitters.
+
+The ids that already match a create when it is sent (e.g. the old MP of a
+replacement, with the same parent, type and name) are journaled with it and
+never taken for its result. A done create is only replayed while its assets
+still exist, and a key covers the whole payload, so a create with other
+settings is never answered with the result of an earlier one.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import requests
+
+from .batching import batch_items, match_items
+from .concurrency import SingleFlight
+from .hierarchy import HierarchyIndex
+
+PENDING, DONE, DISCARDED = "pending", "done", "discarded"
+
+# (parent reference, type, name): the parent is a server id, an upload id of the
+# same batch (int), or None for the database root.
+Signature = Tuple[Any, int, str]
+
+# The parent is part of the signature; these only spell it differently.
+_PARENT_FIELDS = frozenset(("path", "upload_path", "parent"))
+
+# Fields that identify a task of an asset. The server adds others (_id, _etag,
+# _links, _created...) and may normalize the rest (e.g. rule.freq "3" -> 3).
+TASK_IDENTITY_FIELDS = ("asset", "presid", "params")
+
+
+class AmbiguousCreateError(requests.exceptions.RequestException):
+    """Part of a create was found on the server, so it can neither be trusted nor sent again."""
+
+
+def parent_ref(payload: Dict) -> Any:
+    """Returns the parent an asset payload points to: a server id, a batch upload id (int) or None (root)."""
+    for field in ("upload_path", "path"):
+        if field in payload:
+            return payload[field][-1] if payload[field] else None
+    return payload.get("parent")
+
+
+def asset_signature(payload: Dict) -> Signature:
+    return parent_ref(payload), int(payload["t"]), payload["name"]
+
+
+def create_key(kind: str, *parts: Any) -> str:
+    return hashlib.sha1(json.dumps([kind, *parts], sort_keys=True, default=str).encode()).hexdigest()
+
+
+def normalized_payload(payload: Dict) -> Dict:
+    """The payload without its parent fields: the same create written with 'path' or 'upload_path' gets one key."""
+    return {k: v for k, v in payload.items() if k not in _PARENT_FIELDS}
+
+
+def asset_key(payload: Dict) -> str:
+    return create_key("asset", *asset_signature(payload), normalized_payload(payload))
+
+
+def batch_key(batch_payload: List[Dict]) -> str:
+    return create_key("batch", *([*asset_signature(element), normalized_payload(element)] for element in batch_payload))
+
+
+def task_identity(task: Dict) -> str:
+    return create_key("task", *(task.get(field) for field in TASK_IDENTITY_FIELDS))
+
+
+def is_ambiguous(error: requests.exceptions.RequestException) -> bool:
+    """True when the server may have applied the request although it did not answer 2xx."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return False
+    if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return True
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code >= 500
+
+
+class CreateJournal:
+    """
+    Append-only JSON-lines journal of logical creates, one {'key', 'status', 'result'}
+    line per state change; the last line of a key wins when the file is read back.
+    Lines are flushed as they are written, so a crash loses at most the create in flight.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # A line torn by a crash
+                    self._entries[entry["key"]] = entry
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Returns the pending or done entry of key, None if it was never sent (or was discarded)."""
+        entry = self._entries.get(key)
+        return entry if entry is not None and entry["status"] != DISCARDED else None
+
+    def _append(self, entry: Dict) -> None:
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+            self._entries[entry["key"]] = entry
+
+    def begin(self, key: str, existing: Iterable[str] = ()) -> None:
+        """Marks key as sent; existing are the ids matching it beforehand, which reconciliation must skip."""
+        self._append({"key": key, "status": PENDING, "at": time.time(), "existing": sorted(existing)})
+
+    def complete(self, key: str, result: Any) -> None:
+        self._append({"key": key, "status": DONE, "at": time.time(), "result": result})
+
+    def discard(self, key: str) -> None:
+        self._append({"key": key, "status": DISCARDED, "at": time.time()})
+
+
+class IdempotentWriter:
+    """
+    Wraps the create calls of an IcareApiClient with a CreateJournal:
+
+        writer = IdempotentWriter(client, CreateJournal("journal/creates.jsonl"), hierarchy=sync.index)
+        mp = writer.create_asset(mp_payload)       # safe to call again, in this run or the next
+
+    Keys are a hash of the whole payload (with the parent reduced to its id), so
+    only an identical create is answered from the journal. Identical creates
+    running at the same time are merged. An ambiguous failure is reconciled by
+    looking up the parent's children (an asset with the same type and name, or a
+    task with the same TASK_IDENTITY_FIELDS) and the create is sent again at most
+    `retries` times if nothing was found; a definite failure (4xx) is raised at once.
+
+    Before a create is sent, the assets (or tasks) it would match are looked up
+    and journaled, so that reconciliation only accepts one created afterwards.
+    These lookups use the hierarchy index, or else the writer's own index, which
+    lists each parent's subtree at most once per run. A journaled result whose
+    asset was deleted since is dropped and created again.
+    """
+
+    def __init__(self, client, journal: CreateJournal, hierarchy: Optional[HierarchyIndex] = None,
+                 retries: int = 2):
+        self.client = client
+        self.journal = journal
+        self.hierarchy = hierarchy
+        self.retries = retries
+        self.replayed = 0
+        self.reconciled = 0
+        self._in_flight = SingleFlight()
+        self._listed = HierarchyIndex([], keep_raw=False)
+        self._listed_roots: Set[str] = set()
+        self._lock = threading.RLock()
+
+    # --- Public creates ---
+
+    def create_asset(self, payload: Dict) -> Dict:
+        elements = [(None, asset_signature(payload))]
+        return self._create(asset_key(payload), lambda: self._remember(self.client.create_asset(payload), elements),
+                            lambda exclude: self._find_assets(elements, exclude).get(None),
+                            lambda: self._existing_asset_ids(elements),
+                            lambda result: self._assets_exist([result]))
+
+    def create_asset_batch(self, batch_payload: List[Dict]) -> List[Dict]:
+        """Creates a batch once; a reconciled batch returns the found assets with their 'upload_id'."""
+        elements = [(element.get("upload_id"), asset_signature(element)) for element in batch_payload]
+        key = batch_key(batch_payload)
+
+        def find(exclude: Set[str]) -> Optional[List[Dict]]:
+            found = self._find_assets(elements, exclude)
+            if not found:
+                return None
+            if len(found) < len(elements):
+                raise AmbiguousCreateError(f"Only {len(found)}/{len(elements)} assets of batch {key[:12]} "
+                                           f"exist on the server: check it before sending it again.")
+            return [dict(found[upload_id], upload_id=upload_id) for upload_id, _ in elements]
+
+        return self._create(key, lambda: self._remember(self.client.create_asset_batch(batch_payload), elements),
+                            find, lambda: self._existing_asset_ids(elements),
+                            lambda result: self._assets_exist([item for item in batch_items(result) if item.get("_id")]))
+
+    def create_task(self, task_payload: Dict) -> Dict:
+        """
+        Creates a task once. Tasks are matched on TASK_IDENTITY_FIELDS in the
+        asset's task list (/apiv4/tasks/{asset}, the 'task list' every task body
+        links to as its parent), since the server adds and normalizes fields.
+        """
+        asset_id, identity = task_payload["asset"], task_identity(task_payload)
+
+        def matching_tasks(required: bool) -> List[Dict]:
+            return [task for task in self._list_tasks(asset_id, required) if task_identity(task) == identity]
+
+        def find(exclude: Set[str]) -> Optional[Dict]:
+            return next((task for task in matching_tasks(True) if task.get("_id") not in exclude), None)
+
+        return self._create(create_key("task", task_payload), lambda: self.client.create_task(task_payload), find,
+                            lambda: {task["_id"] for task in matching_tasks(False) if task.get("_id")},
+                            lambda result: self._task_exists(asset_id, result))
+
+    # --- Journal protocol ---
+
+    def _create(self, key: str, send: Callable[[], Any], find: Callable[[Set[str]], Any],
+                existing: Callable[[], Set[str]], exists: Callable[[Any], bool]) -> Any:
+        """
+        Runs one logical create through the journal. find(exclude) returns what the
+        server has for it, ignoring the excluded ids; existing() returns the ids it
+        matches before being sent; exists(result) tells whether a journaled result
+        is still on the server.
+        """
+        return self._in_flight.do(key, lambda: self._create_once(key, send, find, existing, exists))
+
+    def _create_once(self, key: str, send: Callable[[], Any], find: Callable[[Set[str]], Any],
+                     existing: Callable[[], Set[str]], exists: Callable[[Any], bool]) -> Any:
+        entry = self.journal.get(key)
+        if entry is not None and entry["status"] == DONE:
+            if exists(entry["result"]):
+                self.replayed += 1
+                return entry["result"]
+            print(f"Create {key[:12]} was done but its result no longer exists, creating it again...")
+            self.journal.discard(key)
+        elif entry is not None:
+            # Left pending by a process that stopped before the answer was journaled.
+            found = self._reconcile(key, find, set(entry.get("existing", ())))
+            if found is not None:
+                return found
+
+        before = existing()
+        for attempt in range(self.retries + 1):
+            self.journal.begin(key, before)
+            try:
+                result = send()
+            except requests.exceptions.RequestException as e:
+                if not is_ambiguous(e):
+                    self.journal.discard(key)
+                    raise
+                print(f"Create {key[:12]} failed ambiguously ({e}), checking the server...")
+                found = self._reconcile(key, find, before)
+                if found is not None:
+                    return found
+                if attempt == self.retries:
+                    raise
+                time.sleep(min(2 ** attempt, 10))
+                continue
+            self.journal.complete(key, result)
+            return result
+
+    def _reconcile(self, key: str, find: Callable[[Set[str]], Any], exclude: Set[str]) -> Any:
+        """Completes key with what the server has (outside exclude), or discards it so that it is sent again."""
+        found = find(exclude)
+        if found is None:
+            self.journal.discard(key)
+            return None
+        self.reconciled += 1
+        self.journal.complete(key, found)
+        return found
+
+    # --- Assets ---
+
+    def _parent_id(self, parent: Any) -> str:
+        return parent or self.client.get_toplevels()[0]["_id"]
+
+    def _children_named(self, parent_id: str, t: int, name: str, refresh: bool = False) -> List[Dict]:
+        """
+        The direct children of parent_id with this type and name. They are read
+        from the caller's hierarchy index when it has the parent, otherwise from
+        the writer's own index, which lists a parent's subtree once per run and
+        is kept up to date with the writer's creates. refresh=True lists the
+        parent again, to see what an ambiguous create may have left.
+        """
+        if not refresh and self.hierarchy is not None and (
+                parent_id in self.hierarchy or self.hierarchy.children_of(parent_id)):
+            index = self.hierarchy
+        else:
+            index = self._listed
+            with self._lock:
+                listed = any(root == parent_id or index.is_ancestor(root, parent_id) for root in self._listed_roots)
+            if refresh or not listed:
+                assets = list(self.client.iter_assets(fields=["name", "_etag"], under=parent_id))
+                with self._lock:
+                    ids = {asset["_id"] for asset in assets}
+                    for child_id in index.children_of(parent_id):
+                        if child_id not in ids:
+                            index.remove_subtree(child_id)
+                    for asset in assets:
+                        index.add(asset)
+                    self._listed_roots.add(parent_id)
+        with self._lock:
+            return [node.to_dict() for node in map(index.get, index.children_of(parent_id))
+                    if node.t == t and node.name == name]
+
+    def _remember(self, created: Any, elements: List[Tuple[Any, Signature]]) -> Any:
+        """Adds the assets of a create answer to the writer's index, so that later lookups need no listing."""
+        items = match_items([upload_id for upload_id, _ in elements], created)
+        server_ids: Dict[Any, str] = {}
+        for item, (upload_id, (parent, t, name)) in zip(items, elements):
+            if not item or not item.get("_id"):
+                continue
+            server_ids[upload_id] = item["_id"]
+            parent_id = server_ids.get(parent) if isinstance(parent, int) else self._parent_id(parent)
+            with self._lock:
+                path = item.get("path")
+                if path is None and (parent_id in self._listed or parent_id in self._listed_roots):
+                    path = self._listed.path_of(parent_id) + [parent_id]
+                if path is not None:
+                    self._listed.add({"_id": item["_id"], "name": name, "t": t, "_etag": item.get("_etag"),
+                                      "path": path})
+        return created
+
+    def _find_assets(self, elements: Iterable[Tuple[Any, Signature]], exclude: Set[str] = frozenset()) -> Dict[Any, Dict]:
+        """
+        Resolves (upload_id, signature) pairs, parents first, to assets now on the
+        server whose id is not in exclude. Stops at the first one that does not exist.
+        """
+        server_ids: Dict[Any, str] = {}
+        found = {}
+        refreshed: Set[str] = set()
+        for upload_id, (parent, t, name) in elements:
+            if isinstance(parent, int):
+                if parent not in server_ids:
+                    break
+                parent_id = server_ids[parent]
+            else:
+                parent_id = self._parent_id(parent)
+            matches = self._children_named(parent_id, t, name, refresh=parent_id not in refreshed)
+            refreshed.add(parent_id)
+            asset = next((asset for asset in matches if asset["_id"] not in exclude), None)
+            if asset is None:
+                break
+            server_ids[upload_id] = asset["_id"]
+            found[upload_id] = asset
+        return found
+
+    def _existing_asset_ids(self, elements: Iterable[Tuple[Any, Signature]]) -> Set[str]:
+        """
+        The ids of the assets matching the elements before they are created. Only
+        elements under an existing parent can match: the others go under a new one.
+        """
+        return {asset["_id"] for _, (parent, t, name) in elements if not isinstance(parent, int)
+                for asset in self._children_named(self._parent_id(parent), t, name)}
+
+    def _asset_exists(self, asset_id: str) -> bool:
+        if self.hierarchy is not None and asset_id in self.hierarchy:
+            return True
+        try:
+            self.client.get_asset(asset_id)
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return False
+            raise
+        return True
+
+    def _assets_exist(self, assets: List[Dict]) -> bool:
+        """
+        True when the assets of a journaled result are all still in the hierarchy
+        index or on the server, False when none is. Only some of them left cannot
+        be replayed nor sent again as a whole, so it raises AmbiguousCreateError.
+        """
+        missing = [asset["_id"] for asset in assets if not self._asset_exists(asset["_id"])]
+        if missing and len(missing) < len(assets):
+            raise AmbiguousCreateError(f"{len(missing)}/{len(assets)} created assets were deleted since "
+                                       f"(e.g. {missing[0]}): check them before creating them again.")
+        return not missing
+
+    # --- Tasks ---
+
+    def _list_tasks(self, asset_id: str, required: bool) -> List[Dict]:
+        """
+        The tasks of an asset. When the list cannot be read, a lookup before the
+        create finds nothing, and a reconciliation (required) cannot tell whether
+        the task was created, so it raises AmbiguousCreateError.
+        """
+        try:
+            return self.client.get_asset_tasks(asset_id)
+        except requests.exceptions.HTTPError as e:
+            if not required:
+                print(f"Could not list the tasks of asset '{asset_id}' ({e}).")
+                return []
+            raise AmbiguousCreateError(f"Could not list the tasks of asset '{asset_id}' to check a create "
+                                       f"that failed ({e}): check them before sending it again.") from e
+
+    def _task_exists(self, asset_id: str, task: Dict) -> bool:
+        try:
+            self.client.get_tasks(asset_id, task["_id"])
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return False
+            raise
+        return True
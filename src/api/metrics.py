@@ -0,0 +1,208 @@
+import atexit
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+_ID_PATTERN = re.compile(r"[0-9a-f]{24}")
+_LOGIN_DB_PATTERN = re.compile(r"^(/apilogin/login)/[^/]+$")
+
+
+def endpoint_template(endpoint: str) -> str:
+    """Collapses ids in an endpoint so that timings aggregate per route ('/apiv4/assets/{id}')."""
+    endpoint = _ID_PATTERN.sub("{id}", endpoint)
+    return _LOGIN_DB_PATTERN.sub(r"\1/{db}", endpoint)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class EndpointStats:
+    """Counters of one (method, endpoint template). Durations are kept in a bounded reservoir sample."""
+
+    __slots__ = ("count", "errors", "retries", "bytes_in", "bytes_out", "total_time", "max_time",
+                 "statuses", "samples", "_reservoir_size")
+
+    def __init__(self, reservoir_size: int):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.statuses: Counter = Counter()
+        self.samples: List[float] = []
+        self._reservoir_size = reservoir_size
+
+    def add(self, status: int, elapsed: float, bytes_in: int, bytes_out: int, retries: int) -> None:
+        self.count += 1
+        self.retries += retries
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.statuses[status] += 1
+        if status == 0 or status >= 400:
+            self.errors += 1
+        if len(self.samples) < self._reservoir_size:
+            self.samples.append(elapsed)
+        else:
+            slot = random.randrange(self.count)
+            if slot < self._reservoir_size:
+                self.samples[slot] = elapsed
+
+
+class RequestMetrics:
+    """
+    Per-endpoint request metrics of an IcareApiClient: count, latency percentiles,
+    bytes in/out, status codes and retries. Recording is a lock and a few additions,
+    cheap enough to stay enabled in production bulk jobs.
+
+    Exports: summary_table(), write_jsonl(path), to_prometheus(), or report_at_exit().
+    """
+
+    def __init__(self, enabled: bool = True, reservoir_size: int = 2048):
+        self.enabled = enabled
+        self.reservoir_size = reservoir_size
+        self.started_at = time.time()
+        self._stats: Dict[Tuple[str, str], EndpointStats] = {}
+        self._gauges: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, endpoint: str, status: int, elapsed: float,
+               bytes_in: int = 0, bytes_out: int = 0, retries: int = 0) -> None:
+        """Records one API call; status 0 means no response was received."""
+        if not self.enabled:
+            return
+        key = (method, endpoint_template(endpoint))
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = EndpointStats(self.reservoir_size)
+            stats.add(status, elapsed, bytes_in, bytes_out, retries)
+
+    def note_retry(self, method: str, endpoint: str) -> None:
+        """Counts an application-level retry (e.g. after a 412) on an endpoint."""
+        if not self.enabled:
+            return
+        key = (method, endpoint_template(endpoint))
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = EndpointStats(self.reservoir_size)
+            stats.retries += 1
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Sets a point-in-time value, e.g. the current concurrency limit."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def gauges(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._gauges)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = {}
+            self._gauges = {}
+            self.started_at = time.time()
+
+    def snapshot(self) -> List[Dict]:
+        """Returns one summary dict per (method, endpoint), slowest total time first."""
+        with self._lock:
+            items = [(key, stats, sorted(stats.samples), dict(stats.statuses)) for key, stats in self._stats.items()]
+        rows = []
+        for (method, endpoint), stats, ordered, statuses in items:
+            rows.append({
+                "method": method, "endpoint": endpoint, "count": stats.count, "errors": stats.errors,
+                "retries": stats.retries, "total_s": round(stats.total_time, 3),
+                "p50_ms": round(_percentile(ordered, 0.50) * 1000, 1),
+                "p95_ms": round(_percentile(ordered, 0.95) * 1000, 1),
+                "p99_ms": round(_percentile(ordered, 0.99) * 1000, 1),
+                "max_ms": round(stats.max_time * 1000, 1),
+                "bytes_in": stats.bytes_in, "bytes_out": stats.bytes_out,
+                "statuses": {str(code): n for code, n in sorted(statuses.items())},
+            })
+        rows.sort(key=lambda row: row["total_s"], reverse=True)
+        return rows
+
+    def summary_table(self) -> str:
+        rows = self.snapshot()
+        if not rows:
+            return "No API requests recorded."
+        gauges = self.gauges()
+        columns = ["method", "endpoint", "count", "errors", "retries", "total_s", "p50_ms", "p95_ms", "p99_ms",
+                   "max_ms", "bytes_in", "bytes_out", "statuses"]
+        cells = [[str(row[c]) if c != "statuses" else " ".join(f"{k}:{v}" for k, v in row[c].items())
+                  for c in columns] for row in rows]
+        widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+        lines = ["  ".join(c.ljust(w) for c, w in zip(columns, widths)),
+                 "  ".join("-" * w for w in widths)]
+        lines += ["  ".join(v.ljust(w) for v, w in zip(r, widths)) for r in cells]
+        if gauges:
+            lines.append("  ".join(f"{name}={value}" for name, value in sorted(gauges.items())))
+        return "\n".join(lines)
+
+    def write_jsonl(self, path: str) -> None:
+        """Appends one JSON line per endpoint, stamped with the collection period."""
+        now = time.time()
+        with open(path, "a") as f:
+            for row in self.snapshot():
+                f.write(json.dumps(dict(row, since=self.started_at, until=now)) + "\n")
+
+    def to_prometheus(self, prefix: str = "icare") -> str:
+        """Renders the metrics in the Prometheus text exposition format."""
+        rows = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_requests_total API requests by endpoint and status.",
+            f"# TYPE {prefix}_requests_total counter",
+        ]
+        for row in rows:
+            for status, n in row["statuses"].items():
+                lines.append(f'{prefix}_requests_total{{method="{row["method"]}",endpoint="{row["endpoint"]}",'
+                             f'status="{status}"}} {n}')
+        lines += [f"# HELP {prefix}_request_duration_seconds API request latency.",
+                  f"# TYPE {prefix}_request_duration_seconds summary"]
+        for row in rows:
+            labels = f'method="{row["method"]}",endpoint="{row["endpoint"]}"'
+            for quantile, column in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                lines.append(f'{prefix}_request_duration_seconds{{{labels},quantile="{quantile}"}} '
+                             f'{round(row[column] / 1000, 6)}')
+            lines.append(f"{prefix}_request_duration_seconds_sum{{{labels}}} {row['total_s']}")
+            lines.append(f"{prefix}_request_duration_seconds_count{{{labels}}} {row['count']}")
+        for name, column, help_text in (("request_bytes_in_total", "bytes_in", "Response bytes received."),
+                                        ("request_bytes_out_total", "bytes_out", "Request bytes sent."),
+                                        ("request_retries_total", "retries", "Retried requests.")):
+            lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} counter"]
+            lines += [f'{prefix}_{name}{{method="{row["method"]}",endpoint="{row["endpoint"]}"}} {row[column]}'
+                      for row in rows]
+        for name, value in sorted(self.gauges().items()):
+            lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def report(self, fmt: str = "table", path: Optional[str] = None) -> None:
+        """Writes the metrics as 'table', 'jsonl' or 'prometheus', to path or stderr."""
+        if fmt == "jsonl":
+            if path:
+                return self.write_jsonl(path)
+            output = "\n".join(json.dumps(row) for row in self.snapshot())
+        elif fmt == "prometheus":
+            output = self.to_prometheus()
+        else:
+            output = "\n--- API request metrics ---\n" + self.summary_table()
+        if path:
+            with open(path, "w") as f:
+                f.write(output + "\n")
+        else:
+            print(output, file=sys.stderr)
+
+    def report_at_exit(self, fmt: str = "table", path: Optional[str] = None) -> None:
+        atexit.register(self.report, fmt, path)
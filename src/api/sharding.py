@@ -0,0 +1,137 @@
+"""
+Parallel upload of a flat upload file (the output of generate_flat_json) by subtree.
+
+The elements above the shard level (e.g. the factory and its zones) are created
+first. Each subtree at that level then only references created parents, so the
+subtrees are independent uploads that run concurrently, each with its own
+auto-sized BatchSubmitter.
+"""
+import concurrent.futures
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .batching import BatchReport, BatchSubmitter, resolve_refs, upload_refs
+
+# Depth of the shard roots in a generate_flat_json file (the factory is at depth 0).
+SHARD_LEVELS = {"zone": 1, "asset": 2, "component": 3}
+
+
+def upload_parent(element: Dict) -> Any:
+    """The parent of an element in the upload: an upload_id (int), a server id (str) or None."""
+    path = element.get("upload_path") or []
+    return path[-1] if path else None
+
+
+def shard_upload(elements: List[Dict], level: Union[str, int] = "asset") -> Tuple[List[Dict], List[List[Dict]]]:
+    """
+    Splits an upload into the shared ancestors and independent subtrees.
+
+    Depths count the upload parents of an element (a parent that already exists
+    on the server does not count). Elements above `level` are shared; every
+    subtree rooted at `level` becomes a shard. Shards referencing one another
+    (an MP whose transmitter_upload_id sits in another subtree) are merged.
+
+    Returns:
+        Tuple: (shared elements, shards), each keeping the order of the upload.
+    """
+    depth_of_level = SHARD_LEVELS[level] if isinstance(level, str) else level
+    by_id = {element["upload_id"]: element for element in elements if "upload_id" in element}
+    depths: Dict[Any, int] = {}
+    roots: Dict[Any, Any] = {}
+
+    def locate(element: Dict) -> Tuple[int, Any]:
+        """(depth, upload_id of the shard root above it, None while above the level)."""
+        upload_id = element.get("upload_id")
+        if upload_id in depths:
+            return depths[upload_id], roots[upload_id]
+        parent = upload_parent(element)
+        if isinstance(parent, int) and parent in by_id:
+            parent_depth, parent_root = locate(by_id[parent])
+            depth = parent_depth + 1
+        else:
+            depth, parent_root = 0, None
+        root = parent_root if parent_root is not None else (upload_id if depth == depth_of_level else None)
+        if upload_id is not None:
+            depths[upload_id], roots[upload_id] = depth, root
+        return depth, root
+
+    # Union-find over shard roots, so that cross-subtree references land in one shard.
+    merged: Dict[Any, Any] = {}
+
+    def find(root: Any) -> Any:
+        while merged.get(root, root) != root:
+            root = merged[root]
+        return root
+
+    located = [(element, locate(element)[1]) for element in elements]
+    for element, root in located:
+        if root is None:
+            continue
+        for ref in upload_refs(element):
+            other = roots.get(ref)
+            if other is not None and find(other) != find(root):
+                merged[find(other)] = find(root)
+
+    shared, shards = [], {}
+    for element, root in located:
+        if root is None:
+            shared.append(element)
+        else:
+            shards.setdefault(find(root), []).append(element)
+    return shared, list(shards.values())
+
+
+class SubtreeSharder:
+    """
+    Uploads a flat upload file shared ancestors first, then its subtrees in parallel.
+
+        report = SubtreeSharder(client, level="asset").push(load_file("output.json"))
+        report.summary()
+
+    Small subtrees are packed together up to min_shard_size elements, so that
+    each request still carries a useful batch. Every shard gets its own
+    BatchSubmitter (built with submitter_options), and a shard whose shared
+    ancestor failed is reported as skipped.
+    """
+
+    def __init__(self, client, level: Union[str, int] = "asset", max_workers: Optional[int] = None,
+                 min_shard_size: int = 50, writer=None, **submitter_options):
+        self.client = client
+        self.level = level
+        self.max_workers = max_workers or client.transport.fanout_workers
+        self.min_shard_size = min_shard_size
+        self.writer = writer
+        self.submitter_options = submitter_options
+
+    def _submitter(self) -> BatchSubmitter:
+        return BatchSubmitter(self.client, writer=self.writer, **self.submitter_options)
+
+    def _pack(self, shards: List[List[Dict]]) -> List[List[Dict]]:
+        packed: List[List[Dict]] = []
+        for shard in shards:
+            if packed and len(packed[-1]) < self.min_shard_size:
+                packed[-1] = packed[-1] + shard
+            else:
+                packed.append(shard)
+        return packed
+
+    def push(self, elements: List[Dict]) -> BatchReport:
+        """Creates the whole upload and returns one report keyed by upload_id."""
+        start = time.perf_counter()
+        shared, shards = shard_upload(elements, self.level)
+        shards = self._pack(shards)
+        print(f"Upload of {len(elements)} element(s): {len(shared)} shared ancestor(s), "
+              f"{len(shards)} shard(s) on {self.max_workers} worker(s).")
+
+        report = self._submitter().submit(shared)
+        # Each shard now only depends on created parents: point them at their server ids.
+        shards = [[resolve_refs(element, report.created) for element in shard] for shard in shards]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._submitter().submit, shard) for shard in shards]
+            for done, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+                shard_report = future.result()
+                report.merge(shard_report)
+                print(f"[{done}/{len(shards)}] shard: {len(shard_report.created)} created, "
+                      f"{len(shard_report.failed) + len(shard_report.skipped)} not created.")
+        report.seconds = time.perf_counter() - start
+        return report
@@ -0,0 +1,90 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+from .codec import JsonCodec, get_codec
+
+
+class IncompleteListingError(requests.exceptions.RequestException):
+    """Some pages of a paginated listing still failed after the retries."""
+
+    def __init__(self, endpoint: str, failed_pages: Dict[int, str], spool_path: Optional[str] = None):
+        self.endpoint = endpoint
+        self.failed_pages = failed_pages
+        self.spool_path = spool_path
+        message = f"{len(failed_pages)} page(s) of {endpoint} failed: {sorted(failed_pages)}"
+        if spool_path:
+            message += f" (completed pages kept in '{spool_path}', run again to resume)"
+        super().__init__(message)
+
+
+class PageSpool:
+    """
+    On-disk checkpoint of one paginated listing:
+
+        <spool_dir>/<key>/manifest.json   endpoint, params, page size, total, creation time
+        <spool_dir>/<key>/page-00001.json one file per completed page
+
+    The key hashes the server, database, endpoint, params and page size, so the
+    same listing started again finds the pages it already has. A page file is
+    written atomically once its page is complete, so its presence is the checkpoint.
+    """
+
+    def __init__(self, spool_dir: str, identity: Dict[str, str], codec: Optional[JsonCodec] = None, max_age_s: float = 86400):
+        self.codec = codec or get_codec()
+        self.identity = identity
+        key = hashlib.sha1(json.dumps(identity, sort_keys=True).encode()).hexdigest()[:16]
+        self.path = os.path.join(spool_dir, key)
+        self.manifest_path = os.path.join(self.path, "manifest.json")
+        self.max_age_s = max_age_s
+
+    def _page_path(self, page: int) -> str:
+        return os.path.join(self.path, f"page-{page:05d}.json")
+
+    def resume(self, total: int) -> bool:
+        """
+        Keeps the pages of a previous attempt if it was for the same listing, is
+        recent enough and the server still reports the same total; clears them otherwise.
+        """
+        if not os.path.exists(self.manifest_path):
+            self._start(total)
+            return False
+        with open(self.manifest_path, "rb") as f:
+            manifest = self.codec.loads(f.read())
+        if (manifest.get("total") != total or manifest.get("identity") != self.identity
+                or time.time() - manifest.get("created", 0) > self.max_age_s):
+            print(f"Discarding stale pagination spool '{self.path}'.")
+            self.clear()
+            self._start(total)
+            return False
+        return True
+
+    def _start(self, total: int) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        manifest = {"identity": self.identity, "total": total, "created": time.time()}
+        self._write(self.manifest_path, self.codec.dumps(manifest))
+
+    def _write(self, path: str, data: bytes) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def done_pages(self) -> List[int]:
+        return sorted(int(os.path.basename(p)[5:10]) for p in glob.glob(os.path.join(self.path, "page-*.json")))
+
+    def save(self, page: int, items: List[Dict]) -> None:
+        self._write(self._page_path(page), self.codec.dumps(items))
+
+    def load(self, page: int) -> List[Dict]:
+        with open(self._page_path(page), "rb") as f:
+            return self.codec.loads(f.read())
+
+    def clear(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,218 @@
+import os
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional
+
+from .codec import dump_file, load_file
+from .hierarchy import HierarchyIndex
+
+ASSETS_ENDPOINT = "/api/assets/v0/"
+SNAPSHOT_VERSION = 1
+
+
+def updated_seconds(asset: Dict) -> float:
+    """Returns an asset's '_updated' (HTTP date or epoch) as epoch seconds, 0 when missing."""
+    value = asset.get("_updated")
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return value / 1000 if value > 1e11 else float(value)
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class HierarchySync:
+    """
+    Keeps a local copy of a branch of the hierarchy current during long jobs.
+
+    After one full pull, poll() only asks /api/assets/v0/ for the assets updated
+    since the stored watermark (sorted by '_updated'), so a refresh costs a couple
+    of small requests instead of a full download. The change feed does not report
+    deletions: deletions made through the same client are applied immediately
+    (mutation listener), and the others are caught by comparing the server's count
+    with the local one and, on mismatch, listing the ids of the branch.
+
+    Callbacks registered with on_change(callback) receive (event, asset) with
+    event 'added', 'updated' or 'deleted'. With snapshot_path, the index and the
+    watermark are saved after every change, so the next run only pulls a delta.
+    """
+
+    def __init__(self, client, root_id: Optional[str] = None, snapshot_path: Optional[str] = None,
+                 assets: Optional[List[Dict]] = None, overlap_s: float = 2.0, reconcile: bool = True):
+        """
+        Args:
+            client (IcareApiClient): A logged-in client.
+            root_id (Optional[str]): Top asset of the synchronized branch (defaults to the database root).
+            snapshot_path (Optional[str]): JSON file holding the index and watermark between runs.
+            assets (Optional[List[Dict]]): Assets already fetched (with 'path'), used instead of a full pull.
+            overlap_s (float): Seconds re-read before the watermark, since '_updated' has a 1s resolution.
+            reconcile (bool): Check the server's count on every poll to detect foreign deletions.
+        """
+        self.client = client
+        self.root_id = root_id
+        self.snapshot_path = snapshot_path
+        self.overlap_s = overlap_s
+        self.reconcile_on_poll = reconcile
+        self.index = HierarchyIndex([])
+        self.watermark = 0.0
+        self._callbacks: List[Callable[[str, Dict], None]] = []
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if assets is not None:
+            self._reset(assets)
+        client.add_mutation_listener(self._on_client_mutation)
+
+    # --- Setup ---
+
+    def on_change(self, callback: Callable[[str, Dict], None]) -> None:
+        self._callbacks.append(callback)
+
+    def start(self) -> "HierarchySync":
+        """Loads the snapshot and pulls the delta since it, or does a full pull when there is none."""
+        if self.root_id is None:
+            toplevels = self.client.get_toplevels()
+            self.root_id = toplevels[0]["_id"] if toplevels else None
+        if not self.index and not self.load_snapshot():
+            self.full_pull()
+        else:
+            self.poll()
+        return self
+
+    def full_pull(self) -> None:
+        print(f"Full hierarchy pull under '{self.root_id}'...")
+        self._reset(self.client.get_subtree(self.root_id))
+        self.save_snapshot()
+
+    def _reset(self, assets: List[Dict]) -> None:
+        with self._lock:
+            self.index = HierarchyIndex(assets)
+            self.watermark = max((updated_seconds(a) for a in assets), default=0.0)
+            if self.root_id is None and assets:
+                self.root_id = assets[0]["_id"]
+
+    def assets(self) -> List[Dict]:
+        with self._lock:
+            return self.index.to_dicts()
+
+    # --- Snapshot ---
+
+    def load_snapshot(self) -> bool:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        snapshot = load_file(self.snapshot_path, codec=self.client.codec)
+        if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("root_id") != self.root_id:
+            print(f"Ignoring snapshot '{self.snapshot_path}': it belongs to another branch or format.")
+            return False
+        with self._lock:
+            self.index = HierarchyIndex(snapshot["assets"])
+            self.watermark = snapshot["watermark"]
+        print(f"Loaded {len(self.index)} assets from snapshot '{self.snapshot_path}'.")
+        return True
+
+    def save_snapshot(self) -> None:
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            snapshot = {"version": SNAPSHOT_VERSION, "root_id": self.root_id,
+                        "watermark": self.watermark, "assets": self.index.to_dicts()}
+        tmp_path = f"{self.snapshot_path}.tmp"
+        dump_file(snapshot, tmp_path, codec=self.client.codec)
+        os.replace(tmp_path, self.snapshot_path)
+
+    # --- Sync ---
+
+    def poll(self) -> Dict[str, int]:
+        """
+        Applies the changes since the watermark to the index.
+
+        Returns:
+            Dict: Number of assets {'added', 'updated', 'deleted'} by this poll.
+        """
+        params = {"extra": "path", "sort": "_updated", "direction": 1,
+                  "updatedfrom": int(max(self.watermark - self.overlap_s, 0) * 1000)}
+        if self.root_id:
+            params["parent"] = self.root_id
+        changed = self.client._fetch_all_paginated_data(ASSETS_ENDPOINT, params)
+
+        events = []
+        with self._lock:
+            for asset in changed:
+                known = self.index.get(asset["_id"])
+                if known is not None and known.get("_etag") == asset.get("_etag"):
+                    continue  # Re-read because of the overlap window.
+                self.index.add(asset)
+                events.append(("added" if known is None else "updated", asset))
+                self.watermark = max(self.watermark, updated_seconds(asset))
+        if self.reconcile_on_poll:
+            events += self._reconcile_if_needed()
+
+        self._emit(events)
+        counts = {"added": 0, "updated": 0, "deleted": 0}
+        for event, _ in events:
+            counts[event] += 1
+        if events:
+            self.save_snapshot()
+        return counts
+
+    def _reconcile_if_needed(self) -> List:
+        first_page = self.client._request("GET", ASSETS_ENDPOINT,
+                                          params={"parent": self.root_id, "p": 1, "count": 1, "fields": "_id"})
+        server_count = ((first_page or {}).get("_meta") or {}).get("total")
+        with self._lock:
+            local_count = len(self.index) - (1 if self.root_id in self.index else 0)
+        if server_count is None or server_count == local_count:
+            return []
+        return self.reconcile()
+
+    def reconcile(self) -> List:
+        """Lists the ids of the branch and drops the local assets the server no longer has."""
+        listed = self.client._fetch_all_paginated_data(ASSETS_ENDPOINT, {"parent": self.root_id, "fields": "_id"})
+        server_ids = {asset["_id"] for asset in listed}
+        server_ids.add(self.root_id)
+        events = []
+        with self._lock:
+            for asset_id in [i for i in self.index if i not in server_ids]:
+                events += [("deleted", asset) for asset in self.index.remove_subtree(asset_id)]
+        return events
+
+    def _on_client_mutation(self, kind: str, asset_id: str, asset: Optional[Dict]) -> None:
+        # Creations and updates are picked up by the next poll, with their full body and path.
+        if kind != "deleted":
+            return
+        with self._lock:
+            events = [("deleted", removed) for removed in self.index.remove_subtree(asset_id)]
+        self._emit(events)
+
+    def _emit(self, events: List) -> None:
+        for event, asset in events:
+            for callback in self._callbacks:
+                try:
+                    callback(event, asset)
+                except Exception as e:
+                    print(f"Hierarchy sync callback error on {event} '{asset.get('_id')}': {e}")
+
+    # --- Background polling ---
+
+    def run_in_background(self, interval_s: float = 30.0) -> None:
+        """Polls every interval_s seconds in a daemon thread until stop()."""
+        def loop():
+            while not self._stop.wait(interval_s):
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"Hierarchy sync poll failed, retrying in {interval_s}s: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="hierarchy-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.client.remove_mutation_listener(self._on_client_mutation)
+        self.save_snapshot()
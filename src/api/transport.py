@@ -0,0 +1,196 @@
+import contextlib
+import socket
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.connection import HTTPConnection
+
+
+@dataclass
+class TransportConfig:
+    """
+    HTTP transport settings of an IcareApiClient.
+
+    The connection pool is sized to the number of concurrent workers so that
+    parallel fan-out never waits on a free connection, and every request gets
+    a (connect, read) timeout so that a dead connection cannot hang a job.
+    """
+    max_workers: int = 10
+    pool_maxsize: Optional[int] = None      # Defaults to max_workers
+    connect_timeout: float = 10.0
+    read_timeout: float = 120.0
+    tcp_keepalive: bool = True
+    keepalive_idle: int = 60                # Seconds before the first keep-alive probe
+    keepalive_interval: int = 15            # Seconds between probes
+    keepalive_count: int = 4                # Failed probes before the connection is dropped
+    http2: bool = False                     # Requires the optional 'httpx[http2]' backend
+    gzip_requests: bool = False             # Compress JSON request bodies (Content-Encoding: gzip)
+    gzip_min_size: int = 1024               # Smaller bodies are sent as is
+    coalesce_gets: bool = True              # Identical concurrent GETs share one request
+    adaptive_concurrency: bool = True       # AIMD in-flight limit, starting at max_workers
+    min_concurrency: int = 2
+    max_concurrency: int = 64               # Upper bound of the adaptive limit (and fan-out threads)
+    bulk_share: float = 0.5                 # Most of the limit listings and bulk reads may hold
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+    @property
+    def fanout_workers(self) -> int:
+        """Threads of a fan-out: the adaptive limit, not the thread count, caps what is in flight."""
+        return max(self.max_concurrency, self.max_workers) if self.adaptive_concurrency else self.max_workers
+
+    @property
+    def pool_size(self) -> int:
+        return self.pool_maxsize or self.max_workers
+
+    def socket_options(self) -> list:
+        options = list(HTTPConnection.default_socket_options)
+        if not self.tcp_keepalive:
+            return options
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        # The fine-grained keep-alive knobs are not available on every platform.
+        for name, value in (("TCP_KEEPIDLE", self.keepalive_idle),
+                            ("TCP_KEEPINTVL", self.keepalive_interval),
+                            ("TCP_KEEPCNT", self.keepalive_count)):
+            if hasattr(socket, name):
+                options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+        return options
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter with a sized connection pool and TCP keep-alive socket options."""
+
+    def __init__(self, config: TransportConfig):
+        self._socket_options = config.socket_options()
+        super().__init__(pool_connections=config.pool_size, pool_maxsize=config.pool_size)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self._socket_options
+        return super().init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, *args, **kwargs):
+        kwargs["socket_options"] = self._socket_options
+        return super().proxy_manager_for(*args, **kwargs)
+
+
+class HttpxSession:
+    """
+    Minimal requests.Session stand-in backed by an HTTP/2 capable httpx.Client.
+    Responses are converted to requests.Response objects so the rest of the
+    client (raise_for_status, HTTPError handling, .json()) is unchanged.
+    """
+
+    def __init__(self, config: TransportConfig):
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError("HTTP/2 transport requires httpx: pip install 'httpx[http2]'") from e
+        self._httpx = httpx
+        self.headers = CaseInsensitiveDict()
+        self._client = httpx.Client(
+            http2=True,
+            timeout=httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+            limits=httpx.Limits(max_connections=config.pool_size, max_keepalive_connections=config.pool_size),
+        )
+
+    def request(self, method: str, url: str, params: Any = None, data: Any = None, json: Any = None,
+                headers: Optional[dict] = None, files: Any = None, timeout: Any = None, **kwargs) -> requests.Response:
+        merged_headers = dict(self.headers)
+        merged_headers.update(headers or {})
+        if isinstance(timeout, tuple):
+            timeout = self._httpx.Timeout(timeout[1], connect=timeout[0])
+        try:
+            response = self._client.request(
+                method, url, params=params, content=data if isinstance(data, (bytes, str)) else None,
+                data=data if isinstance(data, dict) else None, json=json, files=files,
+                headers=merged_headers, timeout=timeout if timeout is not None else self._httpx.USE_CLIENT_DEFAULT,
+            )
+        except self._httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e)) from e
+        except self._httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        return self._to_requests_response(response)
+
+    @staticmethod
+    def _to_requests_response(response) -> requests.Response:
+        converted = requests.Response()
+        converted.status_code = response.status_code
+        converted.reason = response.reason_phrase
+        converted.headers = CaseInsensitiveDict(response.headers)
+        converted.url = str(response.url)
+        converted.encoding = response.encoding
+        converted._content = response.content
+        return converted
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def build_session(config: TransportConfig):
+    """Creates the HTTP session (requests, or httpx when HTTP/2 is enabled) for a client."""
+    if config.http2:
+        return HttpxSession(config)
+    session = requests.Session()
+    adapter = KeepAliveAdapter(config)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class SessionPool:
+    """
+    Hands out one HTTP session per concurrent worker.
+
+    A requests.Session is not documented as thread-safe, so a worker checks one
+    out for the duration of a request and gives it back afterwards. Idle
+    sessions (and their keep-alive connections) are reused by the next request,
+    whichever thread or executor it comes from, so the pool grows to the peak
+    concurrency and no further. The default headers are set once per session
+    and never changed afterwards; per-request state such as the Authorization
+    header is passed with each request. The HTTP/2 backend is thread-safe and
+    multiplexes one connection, so all workers share a single session there.
+    """
+
+    def __init__(self, config: TransportConfig, headers: Optional[Dict[str, str]] = None):
+        self.config = config
+        self.headers = dict(headers or {})
+        self._idle: List[Any] = []
+        self._all: List[Any] = []
+        self._lock = threading.Lock()
+        self._shared = self._new_session() if config.http2 else None
+
+    def _new_session(self):
+        session = build_session(self.config)
+        session.headers.update(self.headers)
+        self._all.append(session)
+        return session
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    @contextlib.contextmanager
+    def session(self) -> Iterator[Any]:
+        """Checks out a session for one request: `with pool.session() as session: ...`"""
+        if self._shared is not None:
+            yield self._shared
+            return
+        with self._lock:
+            session = self._idle.pop() if self._idle else self._new_session()
+        try:
+            yield session
+        finally:
+            with self._lock:
+                self._idle.append(session)
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._all:
+                session.close()
+            self._idle.clear()
+            self._all.clear()
@@ -1,7 +1,10 @@
 # File: push_asset_data.py
-import json
 from api.client import initializer, Server
 from requests.exceptions import HTTPError
+from utils.progress import ProgressReporter
+from utils.profiling import run_entry_point
+
+reporter = ProgressReporter()
 
 # --- Configuration ---
 # Define the complete desired state of the asset here.
@@ -47,15 +50,13 @@ def _create_new_asset(client, asset_data):
         "optionals": asset_data["optionals"]
     }
 
-    print("\n[+] Preparing CREATE payload:")
-    print(json.dumps(creation_payload, indent=4))
+    reporter.payload("\n[+] Preparing CREATE payload:", creation_payload)
     
     print("\n[+] Sending CREATE request...")
     new_asset = client.create_asset(creation_payload)
     
     print("\n--- New Asset Created Successfully! ---")
-    print("Server responded with new asset data:")
-    print(json.dumps(new_asset, indent=4))
+    reporter.payload("Server responded with new asset data:", new_asset)
 
 
 def main():
@@ -64,7 +65,7 @@ def main():
     """
     print("--- Starting Asset Update-or-Create Process ---")
     
-    client = test_function_initializer(customer_db="csupport", server_region=Server.EU)
+    client = initializer(customer_db="csupport", server_region=Server.EU)
     if not client:
         print("\nClient initialization failed. Exiting.")
         return
@@ -89,8 +90,7 @@ def main():
             "optionals": ASSET_DATA["optionals"]
         }
 
-        print("\n[2] Preparing UPDATE payload:")
-        print(json.dumps(update_payload, indent=4))
+        reporter.payload("\n[2] Preparing UPDATE payload:", update_payload)
 
         print("\n[3] Sending UPDATE request...")
         client.update_asset(ASSET_ID_TO_UPDATE_OR_CREATE, current_etag, update_payload)
@@ -101,7 +101,7 @@ def main():
         try:
             verified_asset = client.get_asset(ASSET_ID_TO_UPDATE_OR_CREATE)
             print("\n--- Asset Update Verified! ---")
-            print(json.dumps(verified_asset, indent=4))
+            reporter.payload("Verified asset data:", verified_asset)
         except HTTPError as e_verify:
             if e_verify.response.status_code == 403:
                 # If verification fails with 403, it means the update made the asset inaccessible.
@@ -132,4 +132,4 @@ def main():
         print(f"Error: {e}")
 
 if __name__ == "__main__":
-    main()
+    run_entry_point(main)
@@ -0,0 +1,36 @@
+# File: diagnoses_nightly.py
+# Nightly export of the diagnoses of every machine of a database into the
+# local columnar store (parquet, or CSV when pyarrow is not installed).
+# Only the diagnoses created since the previous run are downloaded.
+from api.client import initializer, Server
+from api.diagnoses import DiagnosesExtractor
+from utils.progress import ProgressReporter
+from utils.profiling import run_entry_point
+
+reporter = ProgressReporter()
+
+# --- Configuration ---
+CUSTOMER_DB = "csupport"
+STORE_DIR = "diagnoses_store"
+ASSET_TYPE = 33554432  # Diagnoses are attached to machines ("Asset")
+
+
+def main():
+    """Pulls the new diagnoses of every machine of CUSTOMER_DB into STORE_DIR."""
+    client = initializer(customer_db=CUSTOMER_DB, server_region=Server.EU)
+    if not client:
+        return
+
+    asset_ids = [asset['_id'] for asset in client.iter_assets(types=[ASSET_TYPE], fields=[])]
+    reporter.info(f"{len(asset_ids)} machine(s) found in '{CUSTOMER_DB}'.")
+
+    extractor = DiagnosesExtractor(client, store_dir=STORE_DIR)
+    result = extractor.extract(asset_ids)
+    for (asset_id, window_start), error in result["failed"].items():
+        reporter.error(f"Diagnoses of {asset_id} from {window_start:%Y-%m-%d} will be retried next run.", error)
+    if result["file"]:
+        reporter.info(f"{result['rows']} new diagnoses stored in {result['file']}")
+
+
+if __name__ == "__main__":
+    run_entry_point(main)
@@ -0,0 +1,77 @@
+# File: fleet_audit.py
+# Fleet-wide audits: runs one read-only check over every customer database the
+# account can access, on several servers at once, and writes one CSV per audit.
+import csv
+import sys
+
+from api.client import Server
+from api.fleet import FleetContext, FleetRunner
+from utils.progress import ProgressReporter
+from utils.profiling import run_entry_point
+
+reporter = ProgressReporter()
+
+# --- Configuration ---
+SERVERS = [Server.EU, Server.US]
+MAX_DATABASES = 6        # Databases audited at the same time
+PER_DB_WORKERS = 4       # Concurrent requests allowed on a single database (client fan-outs included)
+
+GATEWAY_TYPE, TRANSMITTER_TYPE = 33554433, 33554435
+
+
+def firmware_versions(ctx: FleetContext) -> list:
+    """One row per gateway and transmitter with its application firmware."""
+    devices = ctx.client.iter_assets(types=[GATEWAY_TYPE, TRANSMITTER_TYPE], fields=["name", "optionals"])
+    return [
+        {
+            "_id": asset["_id"],
+            "name": asset.get("name"),
+            "type": "Gateway" if asset.get("t") == GATEWAY_TYPE else "Transmitter",
+            "appfirmware": (asset.get("optionals") or {}).get("appfirmware"),
+        }
+        for asset in devices
+    ]
+
+
+def network_health(ctx: FleetContext) -> list:
+    """The raw network status of the database, one row per device."""
+    return ctx.client.get_network_status() or []
+
+
+AUDITS = {"firmware": firmware_versions, "network": network_health}
+
+
+def write_csv(rows: list, path: str) -> None:
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    """Usage: python fleet_audit.py [firmware|network ...] (defaults to every audit)."""
+    audits = sys.argv[1:] or list(AUDITS)
+    unknown = [name for name in audits if name not in AUDITS]
+    if unknown:
+        reporter.error(f"Unknown audit(s) {unknown}, choose from {list(AUDITS)}.")
+        return
+
+    targets = FleetRunner.discover_targets(SERVERS)
+    if not targets:
+        reporter.error("No database to audit.")
+        return
+    runner = FleetRunner(targets, max_databases=MAX_DATABASES, per_db_workers=PER_DB_WORKERS)
+
+    for name in audits:
+        reporter.info(f"\n--- Audit '{name}' on {len(targets)} database(s) ---")
+        report = runner.run(AUDITS[name])
+        report.summary()
+        rows = report.rows()
+        output_path = f"fleet_{name}.csv"
+        write_csv(rows, output_path)
+        reporter.info(f"{len(rows)} row(s) written to {output_path}")
+
+
+if __name__ == "__main__":
+    run_entry_point(main)
@@ -1,4 +1,3 @@
-import json
 import datetime
 import os
 import sys
@@ -11,35 +10,45 @@ sys.path.insert(0, project_root)
 from src.api.client import initializer, Server
 import src.data.asset_library as asset_library
 import src.data.task_payload_library as task
+from src.utils.progress import ProgressReporter
+from src.utils.profiling import run_entry_point
 
-# --- Initialize the client ---
-client = initializer(customer_db="csupport", server_region=Server.EU)
+reporter = ProgressReporter()
 
-if client:
-    # The ID of the asset you want to assign the task to
-    asset_id = "688b7266431d247b51a25418" # Using the asset ID from the example
+def main():
+    """Creates a DNA task on a fixed measure point."""
+    # --- Initialize the client ---
+    client = initializer(customer_db="csupport", server_region=Server.EU)
 
-    # 1. Get the preselection data
-    preselection = asset_library.default_preselection
+    if client:
+        # The ID of the asset you want to assign the task to
+        asset_id = "688b7266431d247b51a25418" # Using the asset ID from the example
 
-    # 2. Get the current time as a Unix timestamp in milliseconds
-    dtstart_ms = int(datetime.datetime.now(datetime.timezone.utc).timestamp() * 1000)
+        # 1. Get the preselection data
+        preselection = asset_library.default_preselection
 
-    payload = task.dna_2000hz_3200
+        # 2. Get the current time as a Unix timestamp in milliseconds
+        dtstart_ms = int(datetime.datetime.now(datetime.timezone.utc).timestamp() * 1000)
 
-    payload["asset"] = asset_id
-    payload["rule"]["dtstart"] = dtstart_ms
+        payload = task.dna_2000hz_3200
 
-    print("\nCreating new task with the correct payload...")
-    print(json.dumps(payload, indent=2))
-    
-    try:
-        # 4. Call the simple create_task function
-        created_task = client.create_task(payload)
-        
-        print("\n--- SUCCESS! ---")
-        print("Successfully created task:")
-        print(json.dumps(created_task, indent=2))
+        payload["asset"] = asset_id
+        payload["rule"]["dtstart"] = dtstart_ms
 
-    except Exception as e:
-        print(f"\nAn error occurred: {e}")
\ No newline at end of file
+        print("\nCreating new task with the correct payload...")
+        reporter.payload("Task payload:", payload)
+
+        try:
+            # 4. Call the simple create_task function
+            created_task = client.create_task(payload)
+
+            print("\n--- SUCCESS! ---")
+            print(f"Successfully created task {created_task.get('_id')}.")
+            reporter.payload("Created task:", created_task)
+
+        except Exception as e:
+            print(f"\nAn error occurred: {e}")
+
+
+if __name__ == '__main__':
+    run_entry_point(main)
@@ -0,0 +1,40 @@
+# File: upload_site.py
+# Onboards a site from an upload file generated by generate_flat_json
+# (output.json): the factory and zones are created first, then every asset
+# subtree is uploaded in parallel. Usage: python upload_site.py [output.json]
+import sys
+
+from api.client import initializer, Server
+from api.codec import dump_file, load_file
+from api.sharding import SubtreeSharder
+from utils.progress import ProgressReporter
+from utils.profiling import run_entry_point
+
+reporter = ProgressReporter()
+
+# --- Configuration ---
+CUSTOMER_DB = "csupport"
+UPLOAD_FILE = "output.json"
+SHARD_LEVEL = "asset"        # "zone", "asset" or "component"
+REPORT_FILE = "upload_report.json"
+
+
+def main():
+    """Uploads UPLOAD_FILE (or the file given on the command line) to CUSTOMER_DB."""
+    upload_file = sys.argv[1] if len(sys.argv) > 1 else UPLOAD_FILE
+    client = initializer(customer_db=CUSTOMER_DB, server_region=Server.EU)
+    if not client:
+        return
+
+    elements = load_file(upload_file)
+    reporter.info(f"{len(elements)} element(s) read from {upload_file}.")
+    report = SubtreeSharder(client, level=SHARD_LEVEL).push(elements)
+    report.summary()
+
+    dump_file({section: {str(upload_id): value for upload_id, value in getattr(report, section).items()}
+               for section in ("created", "failed", "skipped")}, REPORT_FILE, indent=True)
+    reporter.info(f"Server ids by upload_id written to {REPORT_FILE}")
+
+
+if __name__ == "__main__":
+    run_entry_point(main)
@@ -0,0 +1,194 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_PROFILE_DIR = "profiles"
+
+# Where time goes, checked from the innermost frame outwards: the first match wins.
+# Order matters: JSON decoding inside requests counts as JSON, not as HTTP.
+CATEGORY_RULES: List[Tuple[str, Tuple[str, ...]]] = [
+    ("json", ("/json/", "orjson", "api/codec.py")),
+    ("pandas/numpy", ("/pandas/", "/numpy/", "api/analytics.py")),
+    ("deepcopy", ("/copy.py",)),
+    ("http wait", ("/socket.py", "/ssl.py", "/selectors.py", "/http/client.py", "/urllib3/", "/requests/",
+                   "/httpx/", "/httpcore/", "_socket", "_ssl", "select.", "getaddrinfo")),
+    ("thread wait", ("/threading.py", "/queue.py", "/concurrent/futures/", "_thread.lock", "acquire")),
+]
+CPU_CATEGORY = "local cpu"
+
+
+def classify(locations: List[str]) -> str:
+    """Returns the category of a stack, given its frame locations innermost first."""
+    for location in locations:
+        for category, markers in CATEGORY_RULES:
+            if any(marker in location for marker in markers):
+                return category
+    return CPU_CATEGORY
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stack of every thread at a fixed interval.
+    Produces folded stacks ('thread;outer;...;inner count') that flamegraph.pl,
+    speedscope or inferno can render directly.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.categories: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            labels, locations = [], []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                locations.append(frame.f_code.co_filename.replace("\\", "/"))
+                frame = frame.f_back
+            thread_name = names.get(thread_id, str(thread_id))
+            category = classify(locations)
+            # Idle pool workers waiting for a job are not part of the run's cost.
+            if category == "thread wait" and thread_name != "MainThread":
+                continue
+            self.categories[category] += 1
+            self.stacks[";".join([thread_name] + labels[::-1])] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def write_folded(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def attribution(self) -> Dict[str, float]:
+        """Seconds per category (sample count x interval, summed over threads)."""
+        return {category: count * self.interval for category, count in self.categories.items()}
+
+
+def cprofile_attribution(stats: pstats.Stats) -> Dict[str, float]:
+    """Splits the own time (tottime) of every profiled function into categories."""
+    totals: Dict[str, float] = Counter()
+    for (filename, _, function_name), (_, _, tottime, _, _) in stats.stats.items():
+        location = f"{filename.replace(chr(92), '/')} {function_name}"
+        totals[classify([location])] += tottime
+    return dict(totals)
+
+
+def cprofile_folded(stats: pstats.Stats) -> List[str]:
+    """
+    Approximates folded stacks from cProfile's caller graph (caller;callee own-time in ms).
+    Exact stacks require the sampling mode; this is enough for a first flamegraph.
+    """
+    lines = []
+    for (filename, line, name), (_, _, tottime, _, callers) in stats.stats.items():
+        callee = f"{name} ({os.path.basename(filename)}:{line})"
+        if not callers:
+            lines.append(f"{callee} {max(int(tottime * 1000), 1)}")
+        for (c_file, c_line, c_name), caller_stats in callers.items():
+            own_time = caller_stats[2]
+            if own_time > 0:
+                lines.append(f"{c_name} ({os.path.basename(c_file)}:{c_line});{callee} {max(int(own_time * 1000), 1)}")
+    return lines
+
+
+def _print_attribution(title: str, attribution: Dict[str, float], wall_time: float) -> None:
+    total = sum(attribution.values()) or 1.0
+    print(f"\n--- {title} (wall time {wall_time:.2f}s) ---", file=sys.stderr)
+    for category, seconds in sorted(attribution.items(), key=lambda item: item[1], reverse=True):
+        print(f"  {category:<14} {seconds:8.2f}s  {100 * seconds / total:5.1f}%", file=sys.stderr)
+
+
+def _parse_profile_args(argv: List[str]) -> Tuple[Optional[str], Optional[str], List[str]]:
+    """Extracts --profile[=cprofile|sample] and --profile-out=PREFIX, returns (mode, prefix, remaining args)."""
+    mode, prefix, remaining = None, None, []
+    for arg in argv:
+        if arg == "--profile":
+            mode = "cprofile"
+        elif arg.startswith("--profile="):
+            mode = arg.split("=", 1)[1]
+        elif arg.startswith("--profile-out="):
+            prefix = arg.split("=", 1)[1]
+        else:
+            remaining.append(arg)
+    if mode not in (None, "cprofile", "sample"):
+        raise SystemExit(f"Unknown profile mode '{mode}': use --profile, --profile=cprofile or --profile=sample")
+    return mode, prefix, remaining
+
+
+def run_entry_point(main: Callable[[], object], argv: Optional[List[str]] = None) -> object:
+    """
+    Runs a bot's main(), profiled when the command line contains --profile.
+
+        --profile / --profile=cprofile   deterministic profile of the main thread:
+                                         writes PREFIX.prof (pstats, snakeviz) and
+                                         PREFIX.folded (approximate flamegraph)
+        --profile=sample                 samples every thread each 5ms: writes
+                                         PREFIX.folded (exact stacks for flamegraph.pl/speedscope)
+        --profile-out=PREFIX             output path prefix (default: profiles/<script>-<time>)
+
+    Both modes print how the run split between waiting on HTTP, JSON, pandas,
+    deepcopy, waiting on worker threads and the remaining local CPU.
+    """
+    argv = sys.argv if argv is None else argv
+    mode, prefix, remaining = _parse_profile_args(argv[1:])
+    if mode is None:
+        return main()
+    sys.argv = [argv[0]] + remaining
+
+    if prefix is None:
+        script = os.path.splitext(os.path.basename(argv[0] or "run"))[0]
+        prefix = os.path.join(DEFAULT_PROFILE_DIR, f"{script}-{time.strftime('%Y%m%d-%H%M%S')}")
+    if os.path.dirname(prefix):
+        os.makedirs(os.path.dirname(prefix), exist_ok=True)
+
+    start = time.perf_counter()
+    if mode == "sample":
+        sampler = SamplingProfiler()
+        sampler.start()
+        try:
+            return main()
+        finally:
+            sampler.stop()
+            sampler.write_folded(f"{prefix}.folded")
+            _print_attribution("Time by category, all threads (sampled)", sampler.attribution(),
+                               time.perf_counter() - start)
+            print(f"Folded stacks written to {prefix}.folded", file=sys.stderr)
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(main)
+    finally:
+        wall_time = time.perf_counter() - start
+        profiler.dump_stats(f"{prefix}.prof")
+        stats = pstats.Stats(profiler, stream=sys.stderr)
+        with open(f"{prefix}.folded", "w") as f:
+            f.write("\n".join(cprofile_folded(stats)) + "\n")
+        _print_attribution("Time by category, main thread (cProfile)", cprofile_attribution(stats), wall_time)
+        stats.sort_stats("cumulative").print_stats(15)
+        print(f"Profile written to {prefix}.prof and {prefix}.folded", file=sys.stderr)
@@ -0,0 +1,150 @@
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, TextIO
+
+# Verbosity levels: QUIET only shows errors and the final summary,
+# INFO adds progress lines and events, VERBOSE adds per-item details and payloads.
+QUIET, INFO, VERBOSE = 0, 1, 2
+_LEVEL_NAMES = {"quiet": QUIET, "info": INFO, "verbose": VERBOSE}
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class Stage:
+    """Counters and rate/ETA of one step of a bulk job (e.g. 'MP replacement')."""
+
+    def __init__(self, reporter: "ProgressReporter", name: str, total: Optional[int]):
+        self.reporter = reporter
+        self.name = name
+        self.total = total
+        self.ok = 0
+        self.failed = 0
+        self.skipped = 0
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self._last_line_at = 0.0
+
+    @property
+    def done(self) -> int:
+        return self.ok + self.failed + self.skipped
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def rate(self) -> float:
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    def advance(self, ok: int = 0, failed: int = 0, skipped: int = 0) -> None:
+        """Counts processed items (one successful item when called without arguments)."""
+        if not (ok or failed or skipped):
+            ok = 1
+        with self.reporter.lock:
+            self.ok += ok
+            self.failed += failed
+            self.skipped += skipped
+            now = time.perf_counter()
+            finished = self.total is not None and self.done >= self.total
+            if finished or now - self._last_line_at >= self.reporter.min_interval:
+                self._last_line_at = now
+                self.reporter._write(INFO, self.progress_line())
+
+    def progress_line(self) -> str:
+        parts = [f"[{self.name}] {self.done}"]
+        if self.total:
+            parts[0] += f"/{self.total} ({100 * self.done // self.total}%)"
+        parts.append(f"{self.rate:.1f}/s")
+        if self.total and self.rate > 0 and self.done < self.total:
+            parts.append(f"ETA {_format_duration((self.total - self.done) / self.rate)}")
+        if self.failed:
+            parts.append(f"errors={self.failed}")
+        if self.skipped:
+            parts.append(f"skipped={self.skipped}")
+        return "  ".join(parts)
+
+    def close(self) -> None:
+        if self.finished_at is None:
+            self.finished_at = time.perf_counter()
+
+    def __enter__(self) -> "Stage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"stage": self.name, "total": self.total, "ok": self.ok, "failed": self.failed,
+                "skipped": self.skipped, "seconds": round(self.elapsed, 2), "rate": round(self.rate, 2)}
+
+
+class ProgressReporter:
+    """
+    Shared progress and event reporter for the bulk bots.
+
+    Progress lines are throttled to one every min_interval seconds per stage,
+    and payloads are only serialized when the reporter is verbose, so console
+    I/O no longer throttles the work itself. The level defaults to the
+    ICARE_VERBOSITY environment variable (quiet, info or verbose).
+    """
+
+    def __init__(self, level: Optional[int] = None, stream: Optional[TextIO] = None, min_interval: float = 1.0):
+        if level is None:
+            level = _LEVEL_NAMES.get(os.environ.get("ICARE_VERBOSITY", "info").lower(), INFO)
+        self.level = level
+        self.stream = stream or sys.stdout
+        self.min_interval = min_interval
+        self.lock = threading.RLock()
+        self.stages: Dict[str, Stage] = {}
+
+    def enabled(self, level: int) -> bool:
+        return self.level >= level
+
+    def _write(self, level: int, message: str) -> None:
+        if self.level >= level:
+            with self.lock:
+                print(message, file=self.stream)
+
+    def stage(self, name: str, total: Optional[int] = None) -> Stage:
+        """Starts (or restarts) a named stage; use it as a context manager to close it."""
+        with self.lock:
+            stage = self.stages[name] = Stage(self, name, total)
+        return stage
+
+    def info(self, message: str) -> None:
+        self._write(INFO, message)
+
+    def detail(self, message: str) -> None:
+        self._write(VERBOSE, message)
+
+    def warning(self, message: str) -> None:
+        self._write(INFO, f"  ⚠️  {message}")
+
+    def error(self, message: str, exc: Optional[BaseException] = None) -> None:
+        """Errors are shown at every level."""
+        self._write(QUIET, f"  ❌ {message}" + (f"\n    Details: {exc}" if exc is not None else ""))
+
+    def payload(self, label: str, obj: Any, level: int = VERBOSE) -> None:
+        """Prints a JSON payload, serializing it only if the level is enabled."""
+        if self.level >= level:
+            self._write(level, f"{label}\n{json.dumps(obj, indent=2, ensure_ascii=False, default=str)}")
+
+    def summary(self) -> str:
+        """Prints and returns the per-stage counters (shown at every level)."""
+        with self.lock:
+            stages = [stage.as_dict() for stage in self.stages.values()]
+        lines = ["\n--- Summary ---"]
+        for s in stages:
+            line = f"  {s['stage']}: {s['ok']} ok, {s['failed']} failed"
+            if s["skipped"]:
+                line += f", {s['skipped']} skipped"
+            lines.append(line + f" in {_format_duration(s['seconds'])} ({s['rate']}/s)")
+        text = "\n".join(lines)
+        self._write(QUIET, text)
+        return text
@@ -0,0 +1,169 @@
+"""
+Offline load test of IcareApiClient against the local mock iCare server.
+
+Measures throughput and request latency for the three workloads that dominate
+our bots: full hierarchy pulls, bulk asset creation and the MP replacement
+pipeline (create MP -> create task -> delete old MP), under concurrency.
+Failed items (e.g. with --error-rate) are counted per scenario, not raised.
+
+    python tests/benchmarks/bench_client.py --machines 2000 --latency 0.02 --workers 16
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.client import IcareApiClient
+from api.transport import TransportConfig
+from mock_icare.server import MockIcareServer, T_MP, T_TRANSMITTER
+
+
+class LatencyRecorder:
+    """Wraps the client's send method and records the wall time of every HTTP call."""
+
+    def __init__(self, client: IcareApiClient):
+        self.samples: List[float] = []
+        self._lock = threading.Lock()
+        self._send = client._send
+        client._send = self._timed_request
+
+    def _timed_request(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._send(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.samples.append(time.perf_counter() - start)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.samples = []
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def run_items(function: Callable, items: Iterable, workers: int) -> Tuple[int, int]:
+    """Runs function on every item concurrently; returns (items, items that failed with a request error)."""
+    def attempt(item) -> bool:
+        try:
+            function(item)
+            return True
+        except requests.exceptions.RequestException:
+            return False
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = list(executor.map(attempt, items))
+    return len(outcomes), outcomes.count(False)
+
+
+def run_scenario(name: str, recorder: LatencyRecorder, work: Callable[[], Tuple[int, int]]) -> Dict:
+    recorder.reset()
+    start = time.perf_counter()
+    items, errors = work()
+    elapsed = time.perf_counter() - start
+    samples = recorder.samples
+    return {
+        "scenario": name, "items": items, "errors": errors,
+        "success_pct": round(100 * (items - errors) / items, 1) if items else 0.0,
+        "seconds": round(elapsed, 3),
+        "items_per_s": round((items - errors) / elapsed, 1) if elapsed else 0.0,
+        "requests": len(samples), "req_per_s": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 1),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 1) if samples else 0.0,
+    }
+
+
+def bench_hierarchy_pull(client: IcareApiClient, repeats: int) -> Tuple[int, int]:
+    """Items are the pulls; a pull that fails even after its page retries counts as an error."""
+    return run_items(lambda _: client.get_full_hierarchy(), range(repeats), workers=1)
+
+
+def bench_bulk_creates(client: IcareApiClient, server: MockIcareServer, count: int, workers: int) -> Tuple[int, int]:
+    parent_id = server.assets_of_type(T_TRANSMITTER)[0]["path"][-1]
+    parent_path = server.state.assets[parent_id]["path"] + [parent_id]
+
+    def create(i: int) -> Dict:
+        return client.create_asset({"name": f"Bench MP {i}", "t": T_MP, "path": parent_path,
+                                    "optionals": {"speed": 1500}})
+
+    return run_items(create, range(count), workers)
+
+
+def bench_mp_replacement(client: IcareApiClient, server: MockIcareServer, count: int,
+                         workers: int) -> Tuple[int, int]:
+    old_mps = server.assets_of_type(T_MP)[:count]
+
+    def replace(old_mp: Dict) -> None:
+        current = client.get_asset(old_mp["_id"])
+        created = client.create_asset({"name": current["name"], "t": T_MP, "path": current["path"],
+                                       "optionals": dict(current["optionals"])})
+        client.create_task({"asset": created["_id"], "presid": "0" * 24, "presname": "bench",
+                            "rule": {"dtstart": 0, "freq": "3", "interval": 1}, "params": []})
+        client.delete_asset(current["_id"], current["_etag"])
+
+    return run_items(replace, old_mps, workers)
+
+
+def print_table(rows: List[Dict]) -> None:
+    columns = list(rows[0].keys())
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    print("  ".join("-" * widths[c] for c in columns))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(widths[c]) for c in columns))
+
+
+def main(argv=None) -> List[Dict]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--machines", type=int, default=500, help="Machines in the mock database (~9 assets each)")
+    parser.add_argument("--latency", type=float, default=0.01, help="Server latency per request, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--workers", type=int, default=10, help="Concurrent workers for the fan-out scenarios")
+    parser.add_argument("--repeats", type=int, default=3, help="Hierarchy pulls to run")
+    parser.add_argument("--creates", type=int, default=200, help="Assets to create")
+    parser.add_argument("--replacements", type=int, default=100, help="MPs to replace")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    with MockIcareServer(n_machines=args.machines, latency=args.latency, error_rate=args.error_rate) as server:
+        client = IcareApiClient("user", "pass", base_url=server.url,
+                                transport=TransportConfig(max_workers=args.workers))
+        client.login("csupport")
+        recorder = LatencyRecorder(client)
+        print(f"Mock database: {len(server.state.assets)} assets, latency {args.latency}s, "
+              f"error rate {args.error_rate}, {args.workers} workers\n")
+        rows = [
+            run_scenario("hierarchy_pull", recorder, lambda: bench_hierarchy_pull(client, args.repeats)),
+            run_scenario("bulk_create", recorder, lambda: bench_bulk_creates(client, server, args.creates, args.workers)),
+            run_scenario("mp_replacement", recorder,
+                         lambda: bench_mp_replacement(client, server, args.replacements, args.workers)),
+        ]
+
+    print_table(rows)
+    print("\nPer-endpoint breakdown (client metrics):")
+    print(client.metrics.summary_table())
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(rows, f, indent=2)
+    return rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,589 @@
+"""
+In-process stand-in for the iCare web API, for offline tests and benchmarks.
+
+It implements the endpoints used by IcareApiClient (login, assets v0/apiv4,
+pagination '_meta', ETags, tasks, network, trends, thresholds, diagnoses,
+preselections and image upload) over a generated customer database, with
+configurable latency, error rate and dataset size.
+
+    with MockIcareServer(n_machines=200, latency=0.02) as server:
+        client = IcareApiClient("user", "pass", base_url=server.url)
+        client.login("csupport")
+"""
+import email.utils
+import itertools
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+T_FOLDER = 16777216
+T_MP = 16777218
+T_ASSET = 33554432
+T_GATEWAY = 33554433
+T_TRANSMITTER = 33554435
+T_CHANNEL = 33554436
+T_COMPONENT = 33554437
+
+OPTIONAL_FIELDS_EXCLUDED = {"upload_id", "upload_path", "transmitter_upload_id", "name", "t", "path", "parent",
+                            "perm", "perm_inh", "optionals", "_id", "_etag", "_created", "_updated", "_links"}
+
+
+def _http_date(timestamp: float) -> str:
+    return email.utils.formatdate(timestamp, usegmt=True)
+
+
+class MockIcareState:
+    """The mock database: assets, tasks, tokens and request statistics."""
+
+    def __init__(self, n_machines: int, users: Dict[str, str], dbs: List[str]):
+        self.lock = threading.RLock()
+        self.users = users
+        self.dbs = dbs
+        self.user_tokens: Dict[str, str] = {}
+        self.db_tokens: Dict[str, str] = {}
+        self.assets: Dict[str, Dict] = {}
+        self.children: Dict[str, List[str]] = {}
+        self.tasks: Dict[str, Dict[str, Dict]] = {}
+        self.request_counts: Dict[str, int] = {}
+        self.in_flight: Dict[str, int] = {}        # Requests being served, per database ('' before login)
+        self.max_in_flight: Dict[str, int] = {}
+        self._ids = itertools.count(1)
+        self._clock = itertools.count(1)
+        self.root_id = self._generate(n_machines)
+
+    # --- Data model ---
+
+    def new_id(self) -> str:
+        return f"{next(self._ids):024x}"
+
+    def _touch(self, asset: Dict) -> None:
+        # A strictly increasing fake clock keeps '_updated' ordering deterministic.
+        asset["_etag"] = secrets.token_hex(10)
+        asset["_updated_ts"] = 1_700_000_000 + next(self._clock)
+        asset["_updated"] = _http_date(asset["_updated_ts"])
+
+    def insert(self, name: str, t: int, path: List[str], optionals: Optional[Dict] = None) -> Dict:
+        asset_id = self.new_id()
+        asset = {"_id": asset_id, "name": name, "t": t, "path": list(path), "perm": [], "perm_inh": [],
+                 "optionals": optionals or {}}
+        self._touch(asset)
+        asset["_created"] = asset["_updated"]
+        self.assets[asset_id] = asset
+        self.children.setdefault(asset_id, [])
+        if path:
+            self.children.setdefault(path[-1], []).append(asset_id)
+        return asset
+
+    def remove(self, asset_id: str) -> None:
+        asset = self.assets.pop(asset_id)
+        self.children.pop(asset_id, None)
+        if asset["path"]:
+            self.children[asset["path"][-1]].remove(asset_id)
+
+    def _generate(self, n_machines: int) -> str:
+        root = self.insert("Root", T_FOLDER, [])
+        factory = self.insert("Factory", T_FOLDER, [root["_id"]])
+        zones = [self.insert(f"Zone {z}", T_FOLDER, factory["path"] + [factory["_id"]]) for z in range(1, 5)]
+        hardware = self.insert("Hardware", T_FOLDER, factory["path"] + [factory["_id"]])
+        self.insert("GW-0001", T_GATEWAY, hardware["path"] + [hardware["_id"]], {"appfirmware": "00010404"})
+        for m in range(n_machines):
+            zone = zones[m % len(zones)]
+            machine = self.insert(f"Machine {m}", T_ASSET, zone["path"] + [zone["_id"]])
+            component = self.insert(f"Motor {m}", T_COMPONENT, machine["path"] + [machine["_id"]], {"speed": 1500})
+            component_path = component["path"] + [component["_id"]]
+            transmitter = self.insert(f"TX {m}", T_TRANSMITTER, component_path,
+                                      {"mac": f"{m:012X}", "serialnumber": f"SN-{m}", "appfirmware": "1700001b"})
+            for channel in (1, 2, 3, 4):
+                self.insert(f"Channel {channel}", T_CHANNEL, transmitter["path"] + [transmitter["_id"]],
+                            {"channel": channel, "sensortype": 7})
+            for orientation in ("V", "H", "A"):
+                self.insert(f"Motor {m} {orientation}", T_MP, component_path,
+                            {"speed": 1500, "transmitter": transmitter["_id"]})
+        return root["_id"]
+
+    def public(self, asset: Dict, with_path: bool = True, fields: Optional[List[str]] = None) -> Dict:
+        body = {k: v for k, v in asset.items() if k != "_updated_ts" and (with_path or k != "path")}
+        body["_links"] = {"self": {"href": f"/apiv4/assets/{asset['_id']}", "title": "asset"}}
+        if fields:
+            body = {k: v for k, v in body.items() if k in fields or k in ("_id", "_etag")}
+        return body
+
+    def descendants(self, asset_id: str) -> List[str]:
+        result, stack = [], list(self.children.get(asset_id, []))
+        while stack:
+            child = stack.pop()
+            result.append(child)
+            stack.extend(self.children.get(child, []))
+        return result
+
+    def create_from_payload(self, payload: Dict, upload_ids: Dict[int, str]) -> Dict:
+        """Creates an asset from a single-create or batch (upload_id/upload_path) payload."""
+        if "upload_path" in payload:
+            # Entries are upload ids of this batch (int) or ids of existing assets (str).
+            # Only the last one matters: the full path is resolved from the parent.
+            path_refs = payload["upload_path"]
+            if path_refs:
+                ref = path_refs[-1]
+                parent = upload_ids[ref] if isinstance(ref, int) else ref
+            else:
+                parent = self.root_id
+            path = self.assets[parent]["path"] + [parent]
+        elif "path" in payload:
+            path = list(payload["path"])
+        elif "parent" in payload:
+            path = self.assets[payload["parent"]]["path"] + [payload["parent"]]
+        else:
+            path = [self.root_id]
+        if path and path[-1] not in self.assets:
+            raise KeyError(path[-1])
+        optionals = dict(payload.get("optionals") or {})
+        optionals.update({k: v for k, v in payload.items() if k not in OPTIONAL_FIELDS_EXCLUDED})
+        if "transmitter_upload_id" in payload:
+            optionals["transmitter"] = upload_ids[payload["transmitter_upload_id"]]
+        if not payload.get("name") or "t" not in payload:
+            raise ValueError("'name' and 't' are required")
+        asset = self.insert(payload["name"], int(payload["t"]), path, optionals)
+        if "upload_id" in payload:
+            upload_ids[payload["upload_id"]] = asset["_id"]
+        return asset
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "MockIcare/1.0"
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately: without this, delayed ACKs add ~40ms per request.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- Plumbing ---
+
+    @property
+    def mock(self) -> "MockIcareServer":
+        return self.server.mock
+
+    def _send(self, status: int, body: Union[Dict, List, None] = None, headers: Optional[Dict] = None) -> None:
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+        with self.mock.state.lock:
+            self.mock.bytes_out += len(payload)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        with self.mock.state.lock:
+            self.mock.bytes_in += len(raw)
+        if self.headers.get("Content-Encoding") == "gzip":
+            import gzip
+            raw = gzip.decompress(raw)
+        if self.headers.get("Content-Type", "").startswith("multipart/"):
+            return raw
+        return json.loads(raw) if raw else None
+
+    def _dispatch(self, method: str) -> None:
+        parsed = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        mock = self.mock
+        route = re.sub(r"[0-9a-f]{24}", "{id}", parsed.path)
+        token = (self.headers.get("Authorization") or "").replace("Bearer ", "")
+        with mock.state.lock:
+            key = f"{method} {route}"
+            mock.state.request_counts[key] = mock.state.request_counts.get(key, 0) + 1
+            db = mock.state.db_tokens.get(token, "")
+            mock.state.in_flight[db] = mock.state.in_flight.get(db, 0) + 1
+            mock.state.max_in_flight[db] = max(mock.state.max_in_flight.get(db, 0), mock.state.in_flight[db])
+        try:
+            self._serve(method, parsed, params)
+        finally:
+            with mock.state.lock:
+                mock.state.in_flight[db] -= 1
+
+    def _serve(self, method: str, parsed, params: Dict) -> None:
+        mock = self.mock
+        mock.simulate_latency()
+        if not parsed.path.startswith("/apilogin") and mock.should_fail():
+            self._body()
+            return self._send(503, {"_error": "injected failure"})
+        try:
+            for pattern, handler_method in ROUTES:
+                match = re.fullmatch(pattern[1], parsed.path)
+                if pattern[0] == method and match:
+                    return getattr(self, handler_method)(params, *match.groups())
+            self._send(404, {"_error": f"no route for {method} {parsed.path}"})
+        except KeyError as e:
+            self._send(404, {"_error": f"not found: {e}"})
+        except (ValueError, TypeError) as e:
+            self._send(422, {"_error": str(e)})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _authorized(self) -> bool:
+        token = (self.headers.get("Authorization") or "").replace("Bearer ", "")
+        with self.mock.state.lock:
+            if token in self.mock.state.db_tokens:
+                return True
+        self._send(401, {"_error": "invalid or expired token"})
+        return False
+
+    def _paginate(self, items: List, params: Dict) -> None:
+        page, count = int(params.get("p", 1)), int(params.get("count", 25))
+        start = (page - 1) * count
+        self._send(200, {"_embedded": items[start:start + count],
+                         "_meta": {"page": page, "max_results": count, "total": len(items)}})
+
+    # --- Login ---
+
+    def login(self, params):
+        body = self._body() or {}
+        state = self.mock.state
+        if state.users.get(body.get("username")) != body.get("password"):
+            return self._send(401, {"_error": "bad credentials"})
+        token = secrets.token_hex(16)
+        with state.lock:
+            state.user_tokens[token] = body["username"]
+        self._send(200, {"token": token, "dbs": [{"db": db} for db in state.dbs]})
+
+    def select_db(self, params, db):
+        token = (self.headers.get("Authorization") or "").replace("Bearer ", "")
+        state = self.mock.state
+        if token not in state.user_tokens:
+            return self._send(401, {"_error": "not logged in"})
+        if db not in state.dbs:
+            return self._send(403, {"_error": "database not allowed"})
+        db_token = secrets.token_hex(16)
+        with state.lock:
+            state.db_tokens[db_token] = db
+        self._send(200, {"token": db_token})
+
+    # --- Assets ---
+
+    def toplevels(self, params):
+        if self._authorized():
+            state = self.mock.state
+            self._send(200, [state.public(state.assets[state.root_id])])
+
+    def list_assets(self, params):
+        if not self._authorized():
+            return
+        state = self.mock.state
+        with state.lock:
+            if "parent" in params:
+                ids = state.descendants(params["parent"])
+            else:
+                ids = list(state.assets)
+            assets = [state.assets[i] for i in ids]
+            if self.mock.supports_filters:
+                if params.get("t"):
+                    types = {int(t) for t in params["t"].split(",")}
+                    assets = [a for a in assets if a["t"] in types]
+                if params.get("updatedfrom"):
+                    since = float(params["updatedfrom"]) / 1000
+                    assets = [a for a in assets if a["_updated_ts"] > since]
+            if params.get("sort") == "_updated":
+                assets.sort(key=lambda a: a["_updated_ts"], reverse=str(params.get("direction")) == "-1")
+            fields = params["fields"].split(",") if self.mock.supports_filters and params.get("fields") else None
+            items = [state.public(a, with_path=params.get("extra") == "path" or bool(fields), fields=fields)
+                     for a in assets]
+        self._paginate(items, params)
+
+    def get_asset(self, params, asset_id):
+        if not self._authorized():
+            return
+        state = self.mock.state
+        with state.lock:
+            asset = state.assets[asset_id]
+            if self.headers.get("If-None-Match") == asset["_etag"]:
+                return self._send(304, None, {"ETag": asset["_etag"]})
+            body = state.public(asset)
+        self._send(200, body, {"ETag": body["_etag"]})
+
+    def _check_etag(self, asset: Dict) -> bool:
+        if self.headers.get("If-Match") != asset["_etag"]:
+            self._body()
+            self._send(412, {"_error": "precondition failed"})
+            return False
+        return True
+
+    def create_assets(self, params):
+        if not self._authorized():
+            return
+        payload = self._body()
+        state = self.mock.state
+        with state.lock:
+            if isinstance(payload, list):
+                # A batch is all-or-nothing: one invalid element rolls back the whole request.
+                upload_ids: Dict[int, str] = {}
+                created = []
+                try:
+                    for element in payload:
+                        asset = state.create_from_payload(element, upload_ids)
+                        body = state.public(asset)
+                        if "upload_id" in element:
+                            body["upload_id"] = element["upload_id"]
+                        created.append(body)
+                except Exception:
+                    for body in reversed(created):
+                        state.remove(body["_id"])
+                    raise
+                return self._send(201, created)
+            body = state.public(state.create_from_payload(payload, {}))
+        self._send(201, body)
+
+    def patch_asset(self, params, asset_id):
+        if not self._authorized():
+            return
+        state = self.mock.state
+        with state.lock:
+            asset = state.assets[asset_id]
+            if not self._check_etag(asset):
+                return
+            payload = self._body() or {}
+            for key, value in payload.items():
+                if key == "optionals":
+                    asset["optionals"].update(value)
+                elif key not in ("_id", "_etag", "path"):
+                    asset[key] = value
+            state._touch(asset)
+            body = state.public(asset)
+        self._send(200, body)
+
+    def put_asset(self, params, asset_id):
+        if not self._authorized():
+            return
+        state = self.mock.state
+        with state.lock:
+            asset = state.assets[asset_id]
+            if not self._check_etag(asset):
+                return
+            payload = self._body() or {}
+            for key in ("name", "t", "optionals", "perm", "perm_inh"):
+                if key in payload:
+                    asset[key] = payload[key]
+            state._touch(asset)
+            body = state.public(asset)
+        self._send(200, body)
+
+    def delete_asset(self, params, asset_id):
+        if not self._authorized():
+            return
+        state = self.mock.state
+        with state.lock:
+            asset = state.assets[asset_id]
+            if not self._check_etag(asset):
+                return
+            if state.children.get(asset_id):
+                return self._send(409, {"_error": "asset still has children"})
+            state.remove(asset_id)
+            self.mock.deleted_ids.append(asset_id)
+        self._send(204)
+
+    def thresholds(self, params, asset_id):
+        if self._authorized():
+            if asset_id not in self.mock.state.assets:
+                raise KeyError(asset_id)
+            self._send(200, {"_id": f"{asset_id}", "asset": asset_id,
+                             "velocity": {"alert": 4.5, "danger": 7.1}, "acceleration": {"alert": 3.0, "danger": 6.0}})
+
+    def latest_results(self, params, asset_id):
+        if self._authorized():
+            if asset_id not in self.mock.state.assets:
+                raise KeyError(asset_id)
+            now = time.time()
+            self._send(200, [{"_id": f"{asset_id}", "asset": asset_id, "acqend": _http_date(now),
+                              "statistics": [{"global_type": "velocity", "value": 1.2, "status": 0},
+                                             {"global_type": "temperature", "value": 41.5, "status": 0}]}])
+
+    def trends(self, params, asset_id):
+        if not self._authorized():
+            return
+        start = int(params.get("creationfrom", 0)) // 1000
+        end = int(params.get("creationto", time.time() * 1000)) // 1000
+        step = max((end - start) // 24, 1)
+        self._send(200, [{"_id": f"{asset_id[:16]}{i:08x}", "asset": asset_id, "acqend": _http_date(ts),
+                          "statistics": [{"global_type": "velocity", "value": 1.0 + (i % 5) / 10, "status": 0}]}
+                         for i, ts in enumerate(range(start, end, step))])
+
+    def diagnoses(self, params, asset_id):
+        if not self._authorized():
+            return
+        start = int(params.get("creationfrom", 0))
+        end = int(params.get("creationto", time.time() * 1000))
+        # One diagnosis per simulated day, at a fixed time, so windows can be checked for overlaps.
+        day_ms = 86_400_000
+        first = (start // day_ms + (1 if start % day_ms else 0)) * day_ms
+        items = [{"_id": f"{asset_id[-12:]}{ts // 1000:012x}", "asset": asset_id, "_created_ms": ts,
+                  "_created": _http_date(ts / 1000), "severity": (ts // day_ms) % 4, "comment": "auto"}
+                 for ts in range(first, end, day_ms)]
+        self._paginate(items, params)
+
+    # --- Tasks and misc ---
+
+    def create_task(self, params):
+        if not self._authorized():
+            return
+        payload = self._body() or {}
+        state = self.mock.state
+        with state.lock:
+            if payload.get("asset") not in state.assets:
+                return self._send(422, {"_error": "unknown asset"})
+            task = dict(payload, _id=state.new_id(), _etag=secrets.token_hex(10))
+            state.tasks.setdefault(payload["asset"], {})[task["_id"]] = task
+        self._send(201, task)
+
+    def list_tasks(self, params, asset_id):
+        if self._authorized():
+            self._paginate(list(self.mock.state.tasks.get(asset_id, {}).values()), params)
+
+    def get_task(self, params, asset_id, task_id):
+        if self._authorized():
+            self._send(200, self.mock.state.tasks[asset_id][task_id])
+
+    def preselections(self, params):
+        if self._authorized():
+            items = [{"_id": f"{i:024x}", "name": f"Preselection {i}", "tach": i % 2 == 0,
+                      "parameters": [1, 6666, 1, 3000]} for i in range(1, 251)]
+            if "tach" in params:
+                items = [p for p in items if str(p["tach"]) == params["tach"]]
+            self._paginate(items, params)
+
+    def network(self, params):
+        if self._authorized():
+            state = self.mock.state
+            macs = [a["optionals"].get("mac") for a in state.assets.values() if a["t"] == T_TRANSMITTER]
+            self._send(200, [{"GW0001": {"type": "C", "last_com": _http_date(time.time()), "batt": None,
+                                         "children": {mac: {"type": "E", "last_com": _http_date(time.time()),
+                                                            "batt": 3.6, "children": {}} for mac in macs}}}])
+
+    def upload_image(self, params):
+        if self._authorized():
+            self._body()
+            self._send(201, {"filename": f"{secrets.token_hex(8)}.png"})
+
+    def create_fault(self, params):
+        if self._authorized():
+            self._send(201, dict(self._body() or {}, _id=self.mock.state.new_id()))
+
+
+ROUTES: List[Tuple[Tuple[str, str], str]] = [
+    (("POST", r"/apilogin/login"), "login"),
+    (("GET", r"/apilogin/login/([^/]+)"), "select_db"),
+    (("GET", r"/apiv4/assets/toplevels"), "toplevels"),
+    (("GET", r"/api/assets/v0/?"), "list_assets"),
+    (("POST", r"/apiv4/assets/?"), "create_assets"),
+    (("GET", r"/apiv4/assets/([0-9a-f]{24})"), "get_asset"),
+    (("PATCH", r"/apiv4/assets/([0-9a-f]{24})"), "patch_asset"),
+    (("PUT", r"/apiv4/assets/([0-9a-f]{24})"), "put_asset"),
+    (("DELETE", r"/apiv4/assets/([0-9a-f]{24})"), "delete_asset"),
+    (("GET", r"/apiv4/assets/([0-9a-f]{24})/thresholds"), "thresholds"),
+    (("GET", r"/apiv4/assets/([0-9a-f]{24})/results/latests"), "latest_results"),
+    (("GET", r"/apiv4/assets/([0-9a-f]{24})/trends"), "trends"),
+    (("GET", r"/apiv4/diagnoses/([0-9a-f]{24})"), "diagnoses"),
+    (("POST", r"/apiv4/tasks/?"), "create_task"),
+    (("GET", r"/apiv4/tasks/([0-9a-f]{24})/?"), "list_tasks"),
+    (("GET", r"/apiv4/tasks/([0-9a-f]{24})/task/([0-9a-f]{24})"), "get_task"),
+    (("GET", r"/apiv4/preselections/?"), "preselections"),
+    (("GET", r"/apiv4/network/?"), "network"),
+    (("POST", r"/apiv4/image/?"), "upload_image"),
+    (("POST", r"/apiv4/faults/?"), "create_fault"),
+]
+
+
+class MockIcareServer:
+    """
+    Threaded local HTTP server serving a generated iCare database.
+
+    Args:
+        n_machines: Number of machines; each adds a component, a transmitter,
+            4 channels and 3 MPs (9 assets), on top of a few folders.
+        latency: Seconds added to every request, or a (min, max) range.
+        error_rate: Fraction of non-login requests answered with a 503.
+        supports_filters: Whether /api/assets/v0/ honours 't', 'fields' and
+            'updatedfrom' (set False to emulate a server that ignores them).
+    """
+
+    def __init__(self, n_machines: int = 50, latency: Union[float, Tuple[float, float]] = 0.0,
+                 error_rate: float = 0.0, users: Optional[Dict[str, str]] = None,
+                 dbs: Optional[List[str]] = None, supports_filters: bool = True, seed: int = 0):
+        self.state = MockIcareState(n_machines, users or {"user": "pass"}, dbs or ["csupport", "gsk"])
+        self.latency = latency
+        self.error_rate = error_rate
+        self.supports_filters = supports_filters
+        self.deleted_ids: List[str] = []
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._random = random.Random(seed)
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def root_id(self) -> str:
+        return self.state.root_id
+
+    def simulate_latency(self) -> None:
+        delay = self._random.uniform(*self.latency) if isinstance(self.latency, tuple) else self.latency
+        if delay:
+            time.sleep(delay)
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    def expire_tokens(self) -> None:
+        """Invalidates every issued token, as a server-side expiry would."""
+        with self.state.lock:
+            self.state.user_tokens.clear()
+            self.state.db_tokens.clear()
+
+    def assets_of_type(self, t: int) -> List[Dict]:
+        with self.state.lock:
+            return [a for a in self.state.assets.values() if a["t"] == t]
+
+    def start(self) -> "MockIcareServer":
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> "MockIcareServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -9,6 +9,7 @@ sys.path.insert(0, project_root)
 # --- End Fix ---
 
 from src.api.client import IcareApiClient, Server, initializer
+from src.api.hierarchy import HierarchyIndex
 
 # (Helper functions get_factory_hierarchy_by_name and create_id_map remain unchanged)
 def get_factory_hierarchy_by_name(client: IcareApiClient, factory_name: str) -> List[Dict]:
@@ -20,7 +21,9 @@ def get_factory_hierarchy_by_name(client: IcareApiClient, factory_name: str) ->
         return []
     factory_id = factory_node['_id']
     print(f"Found factory '{factory_name}' with ID: {factory_id}. Filtering children...")
-    factory_hierarchy = [asset for asset in full_hierarchy if asset['_id'] == factory_id or factory_id in asset.get('path', [])]
+    # Ancestor checks on the index are O(1) interval tests instead of a scan of every path list.
+    index = HierarchyIndex(full_hierarchy, keep_raw=False)
+    factory_hierarchy = [asset for asset in full_hierarchy if asset['_id'] == factory_id or index.is_ancestor(factory_id, asset['_id'])]
     print(f"Found {len(factory_hierarchy) - 1} children for factory '{factory_name}'.")
     return factory_hierarchy
 
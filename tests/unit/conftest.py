@@ -0,0 +1,31 @@
+"""Fixtures shared by the unit tests: a mock iCare server and a client logged in to it."""
+import functools
+
+import pytest
+
+import api.client
+from api.client import IcareApiClient
+from mock_icare.server import MockIcareServer
+
+
+@pytest.fixture
+def server():
+    with MockIcareServer(n_machines=30) as mock:
+        yield mock
+
+
+@pytest.fixture
+def client(server):
+    api_client = IcareApiClient("user", "pass", base_url=server.url)
+    api_client.login("csupport")
+    return api_client
+
+
+@pytest.fixture
+def config_file(server, tmp_path, monkeypatch):
+    """A credentials file for initializer(), whose clients talk to the mock server (empty client registry)."""
+    monkeypatch.setattr(api.client, "IcareApiClient", functools.partial(IcareApiClient, base_url=server.url))
+    monkeypatch.setattr(api.client, "_CLIENT_REGISTRY", {})
+    path = tmp_path / "config.ini"
+    path.write_text("[DEFAULT]\nUSERNAME = user\nPASSWORD = pass\n")
+    return str(path)
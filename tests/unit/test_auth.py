@@ -0,0 +1,85 @@
+"""Token cache persistence and expiry, re-login on expired tokens, and reuse of cached tokens and clients."""
+import base64
+import concurrent.futures
+import json
+import os
+import stat
+import time
+
+import api.client
+from api.auth import TokenCache, token_expiry
+from api.client import IcareApiClient
+from mock_icare.server import T_MP
+
+
+def jwt(exp: float) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+def test_token_expiry_reads_the_jwt_exp_claim():
+    assert token_expiry(jwt(1_900_000_000), default_ttl=10) == 1_900_000_000
+    before = time.time()
+    assert before + 10 <= token_expiry("opaque-token", default_ttl=10) <= time.time() + 10
+
+
+def test_tokens_persist_across_instances_in_an_owner_only_file(tmp_path):
+    path = str(tmp_path / "cache" / "tokens.json")
+    TokenCache(path).put("url|user|csupport", "opaque-token", ["csupport", "gsk"])
+
+    entry = TokenCache(path).get("url|user|csupport")
+    assert entry["token"] == "opaque-token" and entry["dbs"] == ["csupport", "gsk"]
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert [name for name in os.listdir(tmp_path / "cache")] == ["tokens.json"]
+
+    TokenCache(path).invalidate("url|user|csupport")
+    assert TokenCache(path).get("url|user|csupport") is None
+
+
+def test_tokens_expire_a_safety_margin_early(tmp_path):
+    cache = TokenCache(str(tmp_path / "tokens.json"), safety_margin=60)
+    cache.put("soon", jwt(time.time() + 30), [])
+    cache.put("later", jwt(time.time() + 600), [])
+    assert cache.get("soon") is None and cache.get("later") is not None
+
+    cache.put("expired", jwt(time.time() - 1), [])
+    cache.put("other", "opaque-token", [])
+    with open(cache.path) as f:
+        assert "expired" not in json.load(f)  # Dropped by the next write
+
+
+def test_cached_token_skips_the_login(server, tmp_path):
+    cache = TokenCache(str(tmp_path / "tokens.json"))
+    IcareApiClient("user", "pass", base_url=server.url, token_cache=cache).login("csupport")
+    reused = IcareApiClient("user", "pass", base_url=server.url, token_cache=cache)
+    assert reused.login("csupport") == ["csupport", "gsk"]
+    assert server.state.request_counts["POST /apilogin/login"] == 1
+    assert reused.get_toplevels()[0]["_id"] == server.root_id
+
+    server.expire_tokens()  # A revoked cached token is replaced by a fresh login on the 401
+    assert reused.get_asset(server.root_id)["_id"] == server.root_id
+    assert server.state.request_counts["POST /apilogin/login"] == 2
+    assert cache.get(reused._token_cache_key("csupport"))["token"] == reused._auth.token
+
+
+def test_initializer_reuses_the_registered_client(server, config_file):
+    first = api.client.initializer("csupport", config_file=config_file)
+    assert api.client.initializer("csupport", config_file=config_file) is first
+    assert api.client.initializer("gsk", config_file=config_file).customer_db == "gsk"
+    assert os.path.exists(os.path.join(os.path.dirname(config_file), ".token_cache.json"))
+
+    fresh = api.client.initializer("csupport", config_file=config_file, reuse=False)
+    assert fresh is not first and fresh.customer_db == "csupport"
+    assert api.client.initializer("csupport", config_file=config_file) is first
+    assert api.client.initializer("not-a-db", config_file=config_file) is None
+
+
+def test_concurrent_workers_share_one_relogin(server, client):
+    mp_ids = [asset["_id"] for asset in server.assets_of_type(T_MP)]
+    server.expire_tokens()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=50) as executor:
+        assets = list(executor.map(client.get_asset, mp_ids))
+
+    assert [asset["_id"] for asset in assets] == mp_ids
+    assert server.state.request_counts["POST /apilogin/login"] == 2
+    assert len(client.sessions) <= 50
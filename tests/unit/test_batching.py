@@ -0,0 +1,138 @@
+"""BatchSubmitter: throttled chunks are sent again whole, rejected ones are bisected."""
+import email.utils
+import time
+
+import pytest
+import requests
+
+import api.batching
+from api.batching import BatchSubmitter, match_items, retry_after
+from mock_icare.server import T_ASSET, T_CHANNEL, T_TRANSMITTER
+
+
+def http_error(status: int, headers=None) -> requests.exceptions.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = b'{"_error": "slow down"}'
+    return requests.exceptions.HTTPError(f"{status} error", response=response)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(api.batching.time, "sleep", slept.append)
+    return slept
+
+
+def transmitters(server, count: int) -> list:
+    machine = server.assets_of_type(T_ASSET)[0]
+    parent = [machine["_id"]]
+    elements = []
+    for n in range(count):
+        tx, ch = 100 + 2 * n, 101 + 2 * n
+        elements.append({"upload_id": tx, "name": f"TX {n}", "t": T_TRANSMITTER, "upload_path": parent})
+        elements.append({"upload_id": ch, "name": f"CH {n}", "t": T_CHANNEL, "upload_path": parent + [tx]})
+    return elements
+
+
+def throttle(client, monkeypatch, answers: list) -> list:
+    """Makes create_asset_batch raise the given errors first (None lets a call through); returns the sent chunks."""
+    create_asset_batch = client.create_asset_batch
+    sent = []
+
+    def throttled(chunk):
+        sent.append([element["upload_id"] for element in chunk])
+        if answers:
+            error = answers.pop(0)
+            if error is not None:
+                raise error
+        return create_asset_batch(chunk)
+
+    monkeypatch.setattr(client, "create_asset_batch", throttled)
+    return sent
+
+
+def test_bad_elements_are_isolated_and_their_dependents_skipped(server, client):
+    elements = transmitters(server, 20)
+    elements[14]["name"] = ""  # TX 7: rejected by the server, so CH 7 cannot be created
+
+    submitter = BatchSubmitter(client, initial_size=8)
+    report = submitter.submit(elements[1:] + elements[:1])  # children listed before their parent
+
+    assert set(report.failed) == {114} and report.skipped == {115: "depends on upload_id 114"}
+    assert len(report.created) == 38 and submitter.size > 8  # fast answers grow the chunks
+    for upload_id, asset_id in report.created.items():
+        asset = server.state.assets[asset_id]
+        if asset["t"] == T_CHANNEL:
+            assert asset["path"][-1] == report.created[upload_id - 1]
+
+
+def test_throttled_chunk_is_sent_again_whole_after_retry_after(server, client, monkeypatch, sleeps):
+    elements = transmitters(server, 4)
+    sent = throttle(client, monkeypatch, [http_error(429, {"Retry-After": "3"})])
+    report = BatchSubmitter(client, initial_size=8).submit(elements)
+
+    assert report.failed == {} and report.skipped == {} and len(report.created) == 8
+    assert sleeps == [3.0]
+    assert sent[0] == [e["upload_id"] for e in elements] and sent[1] == sent[0][:4]  # size halved, same order
+
+
+def test_throttled_half_of_a_bisected_chunk_goes_back_with_the_rest(server, client, monkeypatch, sleeps):
+    elements = transmitters(server, 4)
+    elements[6]["name"] = ""  # TX 3 is rejected: the chunk is bisected
+    sent = throttle(client, monkeypatch, [None, None, http_error(429)])
+    report = BatchSubmitter(client, initial_size=8).submit(elements)
+
+    assert set(report.failed) == {106} and report.skipped == {107: "depends on upload_id 106"}
+    assert len(report.created) == 6 and sleeps == [1]
+    # The throttled second half goes back to the queue and is sent again in chunks of the halved size.
+    assert sent[2:] == [[104, 105, 106, 107], [104, 105], [106, 107], [106]]
+    assert all(server.state.assets[report.created[tx + 1]]["path"][-1] == report.created[tx]
+               for tx in (100, 102, 104))
+
+
+def test_dict_answer_is_unwrapped_and_matched_by_position(server, client, monkeypatch):
+    elements = transmitters(server, 3)
+    create_asset_batch = client.create_asset_batch
+
+    def eve_answer(chunk):
+        created = create_asset_batch(chunk)
+        return {"_status": "OK", "_items": [{"_id": item["_id"], "_etag": item["_etag"], "_status": "OK"}
+                                            for item in created]}
+
+    monkeypatch.setattr(client, "create_asset_batch", eve_answer)
+    report = BatchSubmitter(client, initial_size=2).submit(elements)
+
+    assert report.failed == {} and report.skipped == {} and len(report.created) == 6
+    assert all(server.state.assets[report.created[tx]]["name"] == f"TX {n}" and
+               server.state.assets[report.created[tx + 1]]["path"][-1] == report.created[tx]
+               for n, tx in enumerate((100, 102, 104)))
+
+
+def test_match_items_handles_lists_dicts_and_rejected_items():
+    assert match_items([1, 2], [{"_id": "b", "upload_id": 2}, {"_id": "a", "upload_id": 1}]) == [
+        {"_id": "a", "upload_id": 1}, {"_id": "b", "upload_id": 2}]
+    assert match_items([1, 2], {"_items": [{"_id": "a"}, {"_status": "ERR"}]}) == [{"_id": "a"}, {"_status": "ERR"}]
+    assert match_items([1], {"_id": "a"}) == [{"_id": "a"}] and match_items([1, 2], None) == [None, None]
+
+
+def test_persistent_throttling_is_reported_as_failed(server, client, monkeypatch, sleeps):
+    elements = transmitters(server, 1)
+    throttle(client, monkeypatch, [http_error(429) for _ in range(10)])
+    report = BatchSubmitter(client, initial_size=2, max_throttles=3).submit(elements)
+
+    assert report.created == {} and set(report.failed) == {100} and set(report.skipped) == {101}
+    assert report.failed[100].startswith("429") and sleeps == [1, 2, 4]
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    response = requests.Response()
+    assert retry_after(response, 5) == 5
+    response.headers["Retry-After"] = "2"
+    assert retry_after(response, 5) == 2
+    response.headers["Retry-After"] = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 28 <= retry_after(response, 5) <= 30
+    response.headers["Retry-After"] = "soon"
+    assert retry_after(response, 5) == 5
+    assert retry_after(None, 5) == 5
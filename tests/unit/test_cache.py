@@ -0,0 +1,42 @@
+"""TTLCache: expiry, the max_age cap, LRU eviction and the purge of expired entries on put."""
+from api.cache import MISSING, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_expired_entries_are_purged_when_a_new_one_is_stored():
+    clock = FakeClock()
+    cache = TTLCache(ttl=60, clock=clock)
+    for key in range(100):
+        cache.put(key, key)
+    clock.now = 30
+    cache.put("fresh", 1)
+    assert len(cache) == 101
+    clock.now = 61
+    cache.put("new", 2)
+    assert len(cache) == 2 and cache.get("fresh") == 1 and cache.get(0) is MISSING
+
+
+def test_max_age_is_capped_at_the_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl=60, clock=clock)
+    cache.put("a", 1)
+    clock.now = 45
+    assert cache.get("a", max_age=30) is MISSING and cache.get("a", max_age=3600) == 1
+    clock.now = 61
+    assert cache.get("a", max_age=3600) is MISSING
+
+
+def test_maxsize_evicts_the_least_recently_used():
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is MISSING and cache.get("a") == 1 and cache.get("c") == 3
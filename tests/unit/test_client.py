@@ -0,0 +1,90 @@
+"""IcareApiClient: paginated listings, subtree deletes, the read caches and GET coalescing."""
+import concurrent.futures
+
+import pytest
+
+from api.client import IcareApiClient
+from mock_icare.server import MockIcareServer, T_CHANNEL, T_MP, T_TRANSMITTER
+
+
+def test_full_hierarchy_is_paginated(server, client):
+    hierarchy = client._fetch_all_paginated_data("/api/assets/v0/", params={"parent": server.root_id, "extra": "path"},
+                                                 page_size=50)
+    assert len(hierarchy) == len(server.state.assets) - 1
+    assert len({asset["_id"] for asset in hierarchy}) == len(hierarchy)
+
+
+def test_iter_assets_always_projects_to_the_wanted_fields(monkeypatch):
+    api_client = IcareApiClient("user", "pass", base_url="http://127.0.0.1:9")
+    listed = [{"_id": "a" * 24, "t": 1, "path": [], "_etag": "e1"},                   # as many keys, other ones
+              {"_id": "b" * 24, "t": 1, "path": [], "name": "B", "_etag": "e2"}]
+    monkeypatch.setattr(api_client, "_fetch_all_paginated_data", lambda endpoint, params=None: listed)
+
+    assets = list(api_client.iter_assets(types=[1], fields=["name"], under="r" * 24))
+    assert assets == [{"_id": "a" * 24, "t": 1, "path": []},
+                      {"_id": "b" * 24, "t": 1, "path": [], "name": "B"}]
+    assert list(api_client.iter_assets(under="r" * 24)) == listed
+
+
+@pytest.mark.parametrize("supports_filters", [True, False])
+def test_iter_assets_filters_and_projects(supports_filters):
+    with MockIcareServer(n_machines=10, supports_filters=supports_filters) as mock:
+        api_client = IcareApiClient("user", "pass", base_url=mock.url)
+        api_client.login("csupport")
+        transmitters = list(api_client.iter_assets(types=[T_TRANSMITTER], fields=["name"]))
+
+    assert sorted(asset["_id"] for asset in transmitters) == sorted(a["_id"] for a in mock.assets_of_type(T_TRANSMITTER))
+    assert all(set(asset) == {"_id", "t", "path", "name"} for asset in transmitters)
+
+
+def test_delete_subtree_removes_children_first(server, client):
+    transmitter = server.assets_of_type(T_TRANSMITTER)[0]
+    channels = [a["_id"] for a in server.assets_of_type(T_CHANNEL) if a["path"][-1] == transmitter["_id"]]
+
+    summary = client.delete_subtree(transmitter["_id"])
+
+    assert summary["failed"] == {}
+    assert set(server.deleted_ids) == set(channels) | {transmitter["_id"]}
+    assert server.deleted_ids[-1] == transmitter["_id"]
+
+
+def test_thresholds_bulk_reuses_memo_until_the_asset_changes(server, client):
+    mp_ids = [asset["_id"] for asset in server.assets_of_type(T_MP)[:20]]
+    assert set(client.get_thresholds_bulk(mp_ids)) == set(mp_ids)
+    before = sum(server.state.request_counts.values())
+    client.get_thresholds_bulk(mp_ids)
+    assert sum(server.state.request_counts.values()) == before
+
+    mp = client.get_asset(mp_ids[0])
+    client.update_asset(mp["_id"], mp["_etag"], {"name": "renamed"})
+    client.get_thresholds_bulk(mp_ids)
+    assert client.memo.misses == len(mp_ids) + 1
+
+
+def test_get_asset_revalidates_and_is_invalidated_by_writes(server, client):
+    mp_id = server.assets_of_type(T_MP)[0]["_id"]
+    first = client.get_asset(mp_id)
+    first["name"] = "changed locally"
+    assert client.get_asset(mp_id)["name"] != "changed locally"
+    statuses = {row["endpoint"]: row["statuses"] for row in client.metrics.snapshot() if row["method"] == "GET"}
+    assert statuses["/apiv4/assets/{id}"] == {"200": 1, "304": 1}
+
+    requests_before = sum(server.state.request_counts.values())
+    client.get_asset(mp_id, max_age=60)
+    assert sum(server.state.request_counts.values()) == requests_before
+
+    client.update_asset(mp_id, first["_etag"], {"name": "renamed"})
+    assert client.get_asset(mp_id, max_age=60)["name"] == "renamed"
+
+
+def test_identical_concurrent_gets_share_one_request():
+    with MockIcareServer(n_machines=5, latency=0.2) as slow_server:
+        api_client = IcareApiClient("user", "pass", base_url=slow_server.url)
+        api_client.login("csupport")
+        mp_id = slow_server.assets_of_type(T_MP)[0]["_id"]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            assets = list(executor.map(lambda _: api_client.get_asset(mp_id), range(8)))
+
+    assert all(asset == assets[0] for asset in assets) and len({id(asset) for asset in assets}) == 8
+    gets = [row for row in api_client.metrics.snapshot() if row["endpoint"] == "/apiv4/assets/{id}"]
+    assert gets[0]["count"] == 1 and api_client._in_flight.coalesced == 7
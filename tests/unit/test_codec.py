@@ -0,0 +1,74 @@
+"""JSON codecs: orjson and the stdlib fallback must read and write the same JSON."""
+import datetime
+import sys
+
+import pytest
+
+import api.codec
+from api.codec import JsonCodec, dump_file, get_codec, load_file
+
+SAMPLE = {
+    "name": "Moteur broyeur n°2 — 冷却ポンプ",
+    "t": 16777216,
+    "optionals": {"speed": 1500, "ratio": 0.5, "enabled": True, "note": None},
+    "path": ["000000000000000000000001", "000000000000000000000002"],
+    "empty": {"list": [], "dict": {}},
+}
+COMPACT = ('{"name":"Moteur broyeur n°2 — 冷却ポンプ","t":16777216,'
+           '"optionals":{"speed":1500,"ratio":0.5,"enabled":true,"note":null},'
+           '"path":["000000000000000000000001","000000000000000000000002"],'
+           '"empty":{"list":[],"dict":{}}}').encode("utf-8")
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def codec(request, monkeypatch):
+    """The default codec, with orjson installed and with orjson forced off."""
+    monkeypatch.setattr(api.codec, "_DEFAULT_CODEC", None)
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setitem(sys.modules, "orjson", None)  # import orjson now raises ImportError
+    selected = get_codec()
+    assert selected.name == ("orjson" if request.param == "orjson" else "json")
+    return selected
+
+
+def test_dumps_returns_the_same_utf8_bytes(codec):
+    data = codec.dumps(SAMPLE)
+    assert isinstance(data, bytes) and data == COMPACT
+    assert codec.dumps(SAMPLE, indent=True) == JsonCodec().dumps(SAMPLE, indent=True)
+    assert codec.dumps(SAMPLE, indent=True).decode("utf-8").startswith('{\n  "name": "Moteur')
+
+
+def test_loads_accepts_bytes_and_str(codec):
+    assert codec.loads(COMPACT) == SAMPLE
+    assert codec.loads(COMPACT.decode("utf-8")) == SAMPLE
+    assert codec.loads('"\\u00e9"') == "é"
+
+
+def test_datetimes_are_written_as_iso_8601(codec):
+    paris = datetime.timezone(datetime.timedelta(hours=1))
+    value = {"naive": datetime.datetime(2026, 1, 2, 3, 4, 5, 678901),
+             "aware": datetime.datetime(2026, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+             "offset": datetime.datetime(2026, 1, 2, 3, 4, 5, tzinfo=paris),
+             "day": datetime.date(2026, 1, 2)}
+    assert codec.loads(codec.dumps(value)) == {"naive": "2026-01-02T03:04:05.678901",
+                                               "aware": "2026-01-02T03:04:05+00:00",
+                                               "offset": "2026-01-02T03:04:05+01:00",
+                                               "day": "2026-01-02"}
+
+
+def test_int_keys_and_unserializable_values(codec):
+    assert codec.loads(codec.dumps({1: "a", 2: "b"})) == {"1": "a", "2": "b"}
+    with pytest.raises(TypeError):
+        codec.dumps({"set": {1, 2}})
+
+
+def test_files_round_trip(codec, tmp_path):
+    path = str(tmp_path / "output.json")
+    dump_file(SAMPLE, path)
+    with open(path, "rb") as f:
+        assert f.read() == COMPACT
+    assert load_file(path) == SAMPLE
+    dump_file(SAMPLE, path, indent=True, codec=JsonCodec())
+    assert load_file(path, codec=codec) == SAMPLE
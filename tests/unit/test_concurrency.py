@@ -0,0 +1,50 @@
+"""AdaptiveLimiter: AIMD limit changes and lane priorities."""
+import threading
+import time
+
+from api.concurrency import AdaptiveLimiter
+
+
+def test_adaptive_limit_grows_while_healthy_and_backs_off_on_overload(client):
+    assert client.metrics.gauges()["concurrency_limit"] == client.transport.max_workers
+    limits = []
+    limiter = AdaptiveLimiter(initial=4, max_limit=8, on_change=limits.append)
+    for _ in range(60):
+        epochs = [limiter.acquire() for _ in range(limiter.limit)]
+        for epoch in epochs:
+            limiter.release(epoch, "GET /api/assets/v0/", 0.05)
+    assert limiter.limit == 8 and limits == [4, 5, 6, 7, 8]
+
+    epochs = [limiter.acquire() for _ in range(3)]
+    for epoch in epochs:
+        limiter.release(epoch, "GET /api/assets/v0/", 0.05, overloaded=True)
+    assert limiter.limit == 5 and limiter.decreases == 1  # one cut per window, not one per error
+
+    limiter.release(limiter.acquire(), "GET /api/assets/v0/", 1.0)
+    assert limiter.limit == 3 and limiter.in_flight == 0
+
+
+def test_waiting_writes_get_free_slots_before_reads_and_bulk_is_capped():
+    limiter = AdaptiveLimiter(initial=4, min_limit=4, max_limit=4)
+    bulk_epochs = [limiter.acquire("bulk") for _ in range(2)]
+    assert limiter._can_start(limiter.lanes["bulk"]) is False  # bulk holds at most half of the limit
+    other_epochs = [limiter.acquire("read"), limiter.acquire("write")]
+    order = []
+
+    def acquire(lane):
+        limiter.acquire(lane)
+        order.append(lane)
+
+    threads = []
+    for lane in ("read", "write"):
+        threads.append(threading.Thread(target=acquire, args=(lane,)))
+        threads[-1].start()
+        while not limiter.waiting[lane]:
+            time.sleep(0.001)
+    limiter.release(bulk_epochs[0], "GET /api/assets/v0/", 0.01, lane="bulk")
+    threads[1].join(timeout=5)
+    assert order == ["write"] and limiter.waiting["read"] == 1
+
+    limiter.release(other_epochs[0], "GET /apiv4/assets/{id}", 0.01, lane="read")
+    threads[0].join(timeout=5)
+    assert order == ["write", "read"]
@@ -0,0 +1,31 @@
+"""DiagnosesExtractor: runs with naive and aware end datetimes share one UTC watermark."""
+import datetime
+
+from api.diagnoses import DiagnosesExtractor, as_utc
+from mock_icare.server import T_ASSET
+
+
+def test_extract_twice_with_a_naive_end(server, client, tmp_path):
+    asset_ids = [asset["_id"] for asset in server.assets_of_type(T_ASSET)[:3]]
+    end = datetime.datetime(2026, 1, 1, 12, 0)
+    extractor = DiagnosesExtractor(client, store_dir=str(tmp_path), window=datetime.timedelta(days=7),
+                                   initial_lookback=datetime.timedelta(days=10))
+    first = extractor.extract(asset_ids, end=end)
+    assert first["rows"] == 3 * 10 and not first["failed"]
+
+    resumed = DiagnosesExtractor(client, store_dir=str(tmp_path))
+    second = resumed.extract(asset_ids, end=end + datetime.timedelta(days=2))
+    assert second["rows"] == 3 * 2 and second["queries"] == 3 and not second["failed"]
+    assert len(resumed.load()) == 3 * 12
+
+    aware_end = as_utc(end + datetime.timedelta(days=2))
+    third = DiagnosesExtractor(client, store_dir=str(tmp_path)).extract(asset_ids, end=aware_end)
+    assert third["rows"] == 0 and not third["failed"]
+
+
+def test_as_utc_keeps_the_instant():
+    naive = datetime.datetime(2026, 3, 1, 8, 30)
+    aware = as_utc(naive)
+    assert aware.tzinfo == datetime.timezone.utc and aware.timestamp() == naive.timestamp()
+    paris = datetime.datetime(2026, 3, 1, 8, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=1)))
+    assert as_utc(paris) == datetime.datetime(2026, 3, 1, 7, 30, tzinfo=datetime.timezone.utc)
@@ -0,0 +1,58 @@
+"""FleetRunner: per-database results, and per_db_workers capping every request in flight on a database."""
+import pytest
+
+import api.client
+from api.fleet import FleetRunner, FleetTarget
+from api.client import IcareApiClient
+from mock_icare.server import MockIcareServer, T_CHANNEL, T_MP, T_TRANSMITTER
+
+
+@pytest.fixture
+def server():
+    with MockIcareServer(n_machines=20, latency=0.02) as mock:
+        yield mock
+
+
+def test_per_db_workers_caps_the_client_fan_out(server, config_file):
+    mp_ids = [mp["_id"] for mp in server.assets_of_type(T_MP)]
+    chunks = [mp_ids[i::3] for i in range(3)]
+    runner = FleetRunner([FleetTarget("csupport")], per_db_workers=3, config_file=config_file)
+
+    def audit(ctx):
+        assert ctx.client.transport.fanout_workers == 3
+        # Three ctx.map workers, each fanning out over its own MPs: 9 requests at once without the cap.
+        thresholds = ctx.map(lambda chunk: ctx.client.get_thresholds_bulk(chunk), chunks)
+        assets = ctx.map(ctx.client.get_asset, mp_ids[:12])
+        return {"thresholds": sum(map(len, thresholds)), "assets": len(assets)}
+
+    report = runner.run(audit)
+    assert not report.failed and report.rows()[0]["thresholds"] == len(mp_ids)
+    assert 2 <= server.state.max_in_flight["csupport"] <= 3
+
+
+def test_initializer_reuses_a_client_only_with_the_same_transport(server, config_file):
+    runner = FleetRunner([FleetTarget("csupport")], per_db_workers={"csupport": 2}, config_file=config_file)
+    target = runner.targets[0]
+    first = api.client.initializer("csupport", config_file=config_file, transport=runner.transport_for(target))
+    assert api.client.initializer("csupport", config_file=config_file) is first
+    assert api.client.initializer("csupport", config_file=config_file,
+                                  transport=runner.transport_for(target)) is first
+    wider = api.client.initializer("csupport", config_file=config_file,
+                                   transport=FleetRunner([target], per_db_workers=8).transport_for(target))
+    assert wider is not first and wider.transport.max_concurrency == 8
+
+
+def test_fleet_runner_aggregates_per_database(server):
+    def client_for(target):
+        api_client = IcareApiClient("user", "pass", base_url=server.url)
+        api_client.login(target.db)
+        return api_client
+
+    targets = [FleetTarget(db) for db in IcareApiClient("user", "pass", base_url=server.url).list_databases()]
+    runner = FleetRunner(targets + [FleetTarget("not-a-db")], client_factory=client_for, per_db_workers=2)
+    report = runner.run(lambda ctx: ctx.map(lambda t: {"t": t, "count": len(server.assets_of_type(t))},
+                                            [T_TRANSMITTER, T_CHANNEL]))
+
+    assert sorted(r.target.db for r in report.succeeded) == ["csupport", "gsk"]
+    assert [r.target.db for r in report.failed] == ["not-a-db"]
+    assert len(report.rows()) == 4 and {row["db"] for row in report.rows()} == {"csupport", "gsk"}
@@ -0,0 +1,162 @@
+"""HierarchyIndex structure (moves, removals, placeholders) and the upload-matching helpers."""
+import unicodedata
+
+import pytest
+
+from api.hierarchy import HierarchyIndex, materialize_upload_paths, name_path_signatures
+
+
+def asset(asset_id, name, path, t=1, **fields):
+    return dict({"_id": asset_id, "name": name, "t": t, "_etag": f"etag-{asset_id}", "path": list(path)}, **fields)
+
+
+def tree():
+    """root > a > (a1, a2 > a21), root > b."""
+    return [asset("root", "Root", []), asset("a", "A", ["root"]), asset("b", "B", ["root"]),
+            asset("a1", "A1", ["root", "a"]), asset("a2", "A2", ["root", "a"]),
+            asset("a21", "A21", ["root", "a", "a2"])]
+
+
+def test_paths_and_children_are_rebuilt_from_parents():
+    index = HierarchyIndex(tree())
+    assert len(index) == 6 and set(index) == {"root", "a", "b", "a1", "a2", "a21"}
+    assert index.path_of("a21") == ["root", "a", "a2"] and index.parent_of("a21") == "a2"
+    assert sorted(index.children_of("a")) == ["a1", "a2"] and index.children_of("unknown") == []
+    assert sorted(index.descendants("a")) == ["a1", "a2", "a21"]
+    assert [sorted(level) for level in index.leaf_first_levels("a")] == [["a21"], ["a1", "a2"], ["a"]]
+
+
+def test_move_carries_the_subtree_along():
+    index = HierarchyIndex(tree())
+    index.add(asset("a2", "A2", ["root", "b"]))
+    assert index.children_of("a") == ["a1"] and index.children_of("b") == ["a2"]
+    assert index.path_of("a21") == ["root", "b", "a2"] and index.get("a21")["path"] == ["root", "b", "a2"]
+    assert sorted(index.descendants("b")) == ["a2", "a21"] and len(index) == 6
+
+
+def test_removed_asset_stays_as_a_placeholder_for_its_descendants():
+    index = HierarchyIndex(tree())
+    removed = index.remove("a2")
+    assert removed["_id"] == "a2" and removed["path"] == ["root", "a"]
+    assert "a2" not in index and index.get("a2") is None and len(index) == 5
+    assert index.path_of("a21") == ["root", "a", "a2"] and index.children_of("a") == ["a1"]
+    assert index.remove("a2") is None
+
+    subtree = index.remove_subtree("a")
+    assert [node["_id"] for node in subtree][-1] == "a" and {n["_id"] for n in subtree} == {"a", "a1", "a21"}
+    assert set(index) == {"root", "b"}
+
+
+def test_ancestors_outside_a_subtree_get_placeholder_slots():
+    subtree = [node for node in tree() if node["_id"] in ("a2", "a21")]
+    index = HierarchyIndex(subtree)
+    assert len(index) == 2 and "a" not in index and index.get("root") is None
+    assert index.path_of("a2") == ["root", "a"] and index.get("a21").path == ["root", "a", "a2"]
+    assert index.children_of("a") == ["a2"] and index.descendants("root") == ["a2", "a21"]
+    assert index.get("a2").parent_id == "a"
+
+    index.add(asset("a", "A", ["root"]))  # the placeholder becomes a real asset, its children are kept
+    assert len(index) == 3 and index.children_of("a") == ["a2"] and index.get("a")["name"] == "A"
+
+
+def assert_ancestors_match_paths(index):
+    ids = list(index._slot_of)  # placeholders included
+    for asset_id in index:
+        path = index.path_of(asset_id)
+        assert [other for other in ids if index.is_ancestor(other, asset_id)] == [i for i in ids if i in path]
+
+
+def test_is_ancestor_agrees_with_path_of_after_every_change():
+    index = HierarchyIndex(tree())
+    assert index.is_ancestor("root", "a21") and index.is_ancestor("a", "a21")
+    assert not index.is_ancestor("a21", "a21") and not index.is_ancestor("b", "a21")
+    assert not index.is_ancestor("unknown", "a") and not index.is_ancestor("a", "unknown")
+    assert_ancestors_match_paths(index)
+
+    index.add(asset("a2", "A2", ["root", "b"]))  # move
+    assert index.is_ancestor("b", "a21") and not index.is_ancestor("a", "a21")
+    assert_ancestors_match_paths(index)
+    index.add(asset("c", "C", ["root", "b", "a2"]))
+    index.remove("a1")
+    assert_ancestors_match_paths(index)
+
+    placeholders = HierarchyIndex([node for node in tree() if node["_id"] in ("a2", "a21")])
+    assert placeholders.is_ancestor("root", "a21") and placeholders.is_ancestor("a", "a2")
+    assert_ancestors_match_paths(placeholders)
+
+
+def test_subtree_lists_the_root_and_everything_below_it():
+    index = HierarchyIndex(tree())
+    assert [node.id for node in index.subtree("a")] == ["a", "a1", "a2", "a21"]
+    assert [node.id for node in index.subtree("a2")] == ["a2", "a21"] and index.subtree("unknown") == []
+    index.add(asset("a2", "A2", ["root", "b"]))
+    assert [node.id for node in index.subtree("b")] == ["b", "a2", "a21"]
+
+
+def test_materialize_upload_paths_builds_each_path_from_the_parent():
+    elements = [{"upload_id": 3, "upload_parent": 2}, {"upload_id": 1, "upload_parent": None},
+                {"upload_id": 2, "upload_parent": 1}, {"upload_id": 4, "upload_parent": 1}]
+    result = materialize_upload_paths(elements)
+    assert result is elements and all("upload_parent" not in element for element in elements)
+    assert {e["upload_id"]: e["upload_path"] for e in elements} == {1: [], 2: [1], 3: [1, 2], 4: [1]}
+
+
+def old_signatures(assets, id_field, path_field):
+    """The per-path signatures create_id_map computed before name_path_signatures."""
+    by_id = {asset[id_field]: asset for asset in assets}
+    signatures = {}
+    for asset_id, asset in by_id.items():
+        name = unicodedata.normalize("NFC", asset.get("name", ""))
+        path_names = [unicodedata.normalize("NFC", by_id.get(parent, {}).get("name", ""))
+                      for parent in asset.get(path_field, [])]
+        signatures[asset_id] = (name, tuple(filter(None, path_names)))
+    return signatures
+
+
+def test_name_path_signatures_match_the_old_create_id_map(server, client):
+    normalize = lambda name: unicodedata.normalize("NFC", name)
+    hierarchy = client.get_full_hierarchy()
+    assert name_path_signatures(hierarchy, normalize=normalize) == old_signatures(hierarchy, "_id", "path")
+
+    zone = next(node for node in hierarchy if node["name"] == "Zone 1")
+    branch = client.get_subtree(zone["_id"])  # its ancestors are not part of the assets
+    assert name_path_signatures(branch, normalize=normalize) == old_signatures(branch, "_id", "path")
+
+    upload = [{"upload_id": 1, "name": "Usine", "upload_path": []},
+              {"upload_id": 2, "name": "Zoné", "upload_path": [1]},
+              {"upload_id": 3, "name": "", "upload_path": [1, 2]},
+              {"upload_id": 4, "name": "Motéur", "upload_path": [1, 2, 3]}]
+    assert (name_path_signatures(upload, "upload_id", "upload_path", normalize)
+            == old_signatures(upload, "upload_id", "upload_path"))
+
+
+def test_asset_node_reads_like_the_raw_dict():
+    raw = asset("a2", "A2", ["root", "a"], t=16777216, optionals={"speed": 1500}, perm=[])
+    index = HierarchyIndex(tree()[:4] + [raw])
+    node = index.get("a2")
+    assert node["name"] == "A2" and node["t"] == 16777216 and node["_etag"] == "etag-a2"
+    assert node["optionals"] == {"speed": 1500} and node.get("missing", "default") == "default"
+    assert node.to_dict() == raw and node.raw == raw and node.path == ["root", "a"]
+    with pytest.raises(KeyError):
+        node["missing"]
+
+
+def test_keep_raw_false_keeps_only_the_compact_fields():
+    index = HierarchyIndex([asset("root", "Root", []), asset("mp", "MP", ["root"], optionals={"speed": 1500})],
+                           keep_raw=False)
+    node = index.get("mp")
+    assert node.raw is None and node.get("optionals") is None and node.get("optionals", {}) == {}
+    assert node.to_dict() == {"_id": "mp", "name": "MP", "t": 1, "_etag": "etag-mp", "path": ["root"]}
+
+
+def test_partial_body_only_replaces_the_fields_it_carries():
+    index = HierarchyIndex(tree()[:4] + [asset("a2", "A2", ["root", "a"], t=7, optionals={"speed": 1500}, perm=[])])
+    index.add({"_id": "a2", "_etag": "etag-new", "optionals": {"speed": 3000}})
+    node = index.get("a2")
+    assert node.parent_id == "a" and node.name == "A2" and node.t == 7 and node.etag == "etag-new"
+    assert node.raw == asset("a2", "A2", ["root", "a"], t=7, _etag="etag-new", optionals={"speed": 3000}, perm=[])
+
+    compact = HierarchyIndex(tree(), keep_raw=False)
+    compact.add({"_id": "a2", "name": "A2 renamed"})
+    assert compact.get("a2").to_dict() == {"_id": "a2", "name": "A2 renamed", "t": 1, "_etag": "etag-a2",
+                                          "path": ["root", "a"]}
@@ -0,0 +1,150 @@
+"""IdempotentWriter: reconciliation must never adopt an asset that existed before the create."""
+import pytest
+import requests
+
+import api.idempotency
+from api.idempotency import CreateJournal, IdempotentWriter
+from mock_icare.server import T_ASSET, T_CHANNEL, T_MP, T_TRANSMITTER
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(api.idempotency.time, "sleep", lambda seconds: None)
+
+
+def old_mp(server):
+    return next(a for a in server.state.assets.values() if a["t"] == T_MP)
+
+
+def replacement_payload(mp):
+    return {"name": mp["name"], "t": T_MP, "path": list(mp["path"]), "optionals": {"speed": 3000}}
+
+
+def test_replacement_is_not_reconciled_to_the_old_mp(server, client, tmp_path, monkeypatch):
+    mp = old_mp(server)
+    create_asset = client.create_asset
+    attempts = []
+
+    def refused_once(payload):
+        attempts.append(payload)
+        if len(attempts) == 1:
+            raise requests.exceptions.ConnectionError("connection reset before the POST was sent")
+        return create_asset(payload)
+
+    monkeypatch.setattr(client, "create_asset", refused_once)
+    journal = CreateJournal(str(tmp_path / "creates.jsonl"))
+    writer = IdempotentWriter(client, journal)
+    created = writer.create_asset(replacement_payload(mp))
+
+    assert created["_id"] != mp["_id"] and len(attempts) == 2 and writer.reconciled == 0
+    assert server.state.assets[created["_id"]]["optionals"] == {"speed": 3000}
+
+
+def test_lost_answer_of_a_replacement_is_reconciled_to_the_new_mp(server, client, tmp_path, monkeypatch):
+    mp = old_mp(server)
+    create_asset = client.create_asset
+    lost = []
+
+    def answer_lost(payload):
+        created = create_asset(payload)
+        lost.append(created["_id"])
+        raise requests.exceptions.ReadTimeout("answer lost")
+
+    monkeypatch.setattr(client, "create_asset", answer_lost)
+    writer = IdempotentWriter(client, CreateJournal(str(tmp_path / "creates.jsonl")))
+    assert writer.create_asset(replacement_payload(mp))["_id"] == lost[0] != mp["_id"]
+    assert writer.reconciled == 1 and len(lost) == 1
+
+
+def test_pending_entry_keeps_excluding_the_ids_seen_before_the_crash(server, client, tmp_path):
+    mp = old_mp(server)
+    path = str(tmp_path / "creates.jsonl")
+    payload = replacement_payload(mp)
+    writer = IdempotentWriter(client, CreateJournal(path))
+    key = api.idempotency.asset_key(payload)
+    # The process died after journaling the create and before the POST went out.
+    writer.journal.begin(key, writer._existing_asset_ids([(None, api.idempotency.asset_signature(payload))]))
+
+    restarted = IdempotentWriter(client, CreateJournal(path))
+    created = restarted.create_asset(payload)
+    assert created["_id"] != mp["_id"] and restarted.reconciled == 0
+
+
+def test_done_create_whose_asset_was_deleted_is_created_again(server, client, tmp_path):
+    mp = old_mp(server)
+    path = str(tmp_path / "creates.jsonl")
+    payload = {"name": "MP replayed", "t": T_MP, "path": list(mp["path"])}
+    first = IdempotentWriter(client, CreateJournal(path)).create_asset(payload)
+    assert IdempotentWriter(client, CreateJournal(path)).create_asset(payload)["_id"] == first["_id"]
+
+    client.delete_asset(first["_id"], server.state.assets[first["_id"]]["_etag"])
+    posts = server.state.request_counts["POST /apiv4/assets/"]
+    replay = IdempotentWriter(client, CreateJournal(path))
+    again = replay.create_asset(payload)
+
+    assert again["_id"] != first["_id"] and again["_id"] in server.state.assets
+    assert replay.replayed == 0 and server.state.request_counts["POST /apiv4/assets/"] == posts + 1
+    assert IdempotentWriter(client, CreateJournal(path)).create_asset(payload)["_id"] == again["_id"]
+
+
+def test_partly_deleted_batch_is_not_replayed_nor_sent_again(server, client, tmp_path):
+    mp = old_mp(server)
+    path = str(tmp_path / "creates.jsonl")
+    batch = [{"upload_id": 1, "name": "Batch MP 1", "t": T_MP, "upload_path": list(mp["path"])},
+             {"upload_id": 2, "name": "Batch MP 2", "t": T_MP, "upload_path": list(mp["path"])}]
+    created = IdempotentWriter(client, CreateJournal(path)).create_asset_batch(batch)
+    client.delete_asset(created[0]["_id"], server.state.assets[created[0]["_id"]]["_etag"])
+
+    with pytest.raises(api.idempotency.AmbiguousCreateError):
+        IdempotentWriter(client, CreateJournal(path)).create_asset_batch(batch)
+
+
+def test_create_with_other_settings_is_not_replayed(server, client, tmp_path):
+    mp = old_mp(server)
+    writer = IdempotentWriter(client, CreateJournal(str(tmp_path / "creates.jsonl")))
+    first = writer.create_asset(replacement_payload(mp))
+    second = writer.create_asset(dict(replacement_payload(mp), optionals={"speed": 1500}))
+    assert second["_id"] != first["_id"] and writer.replayed == 0
+    assert server.state.assets[second["_id"]]["optionals"] == {"speed": 1500}
+    assert writer.create_asset(replacement_payload(mp))["_id"] == first["_id"] and writer.replayed == 1
+
+
+def test_parents_are_listed_once_per_run(server, client, tmp_path):
+    mp = old_mp(server)
+    writer = IdempotentWriter(client, CreateJournal(str(tmp_path / "creates.jsonl")))
+    before = server.state.request_counts.get("GET /api/assets/v0/", 0)
+    created = [writer.create_asset({"name": f"MP {n}", "t": T_MP, "path": list(mp["path"])}) for n in range(5)]
+    child = writer.create_asset({"name": "Below", "t": T_MP, "path": list(mp["path"]) + [created[0]["_id"]]})
+    assert server.state.request_counts["GET /api/assets/v0/"] == before + 1
+    assert child["path"][-1] == created[0]["_id"]
+
+
+def test_task_is_reconciled_on_its_identity_fields(server, client, tmp_path, monkeypatch):
+    mp = old_mp(server)
+    payload = {"asset": mp["_id"], "presid": "6576e3adb3c379dcb3bf985b", "params": ["acquire", 1, 6666],
+               "rule": {"dtstart": 1752123078000, "freq": "3", "interval": 1}, "tach": False}
+    create_task = client.create_task
+    lost = []
+
+    def answer_lost(task_payload):
+        created = create_task(task_payload)
+        server.state.tasks[mp["_id"]][created["_id"]]["rule"]["freq"] = 3  # normalized by the server
+        lost.append(created["_id"])
+        raise requests.exceptions.ReadTimeout("answer lost")
+
+    monkeypatch.setattr(client, "create_task", answer_lost)
+    writer = IdempotentWriter(client, CreateJournal(str(tmp_path / "creates.jsonl")))
+    assert writer.create_task(payload)["_id"] == lost[0] and writer.reconciled == 1 and len(lost) == 1
+
+
+def test_done_batch_is_replayed_without_a_post(server, client, tmp_path):
+    machine = server.assets_of_type(T_ASSET)[0]
+    path = str(tmp_path / "creates.jsonl")
+    batch = [{"upload_id": 1, "name": "TX retried", "t": T_TRANSMITTER, "upload_path": [machine["_id"]]},
+             {"upload_id": 2, "name": "CH retried", "t": T_CHANNEL, "upload_path": [machine["_id"], 1]}]
+    created = IdempotentWriter(client, CreateJournal(path)).create_asset_batch(batch)
+
+    posts = server.state.request_counts["POST /apiv4/assets/"]
+    replay = IdempotentWriter(client, CreateJournal(path))
+    assert [asset["_id"] for asset in replay.create_asset_batch(batch)] == [asset["_id"] for asset in created]
+    assert server.state.request_counts["POST /apiv4/assets/"] == posts and replay.replayed == 1
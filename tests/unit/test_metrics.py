@@ -0,0 +1,115 @@
+"""RequestMetrics: aggregation, the table/jsonl/Prometheus exports and the ICARE_METRICS switch."""
+import json
+
+import api.client
+from api.metrics import RequestMetrics, endpoint_template
+
+ASSET = "/apiv4/assets/0000000000000000000000ab"
+
+
+def sample_metrics() -> RequestMetrics:
+    metrics = RequestMetrics()
+    for elapsed in (0.010, 0.020, 0.030, 0.040):
+        metrics.record("GET", ASSET, status=200, elapsed=elapsed, bytes_in=100)
+    metrics.record("GET", "/apiv4/assets/0000000000000000000000cd", status=404, elapsed=0.005)
+    metrics.record("POST", "/apiv4/assets/", status=0, elapsed=1.0, bytes_out=50, retries=1)
+    metrics.note_retry("DELETE", ASSET)
+    metrics.set_gauge("concurrency_limit", 12)
+    return metrics
+
+
+def test_endpoint_template_collapses_ids_and_databases():
+    assert endpoint_template(ASSET + "/thresholds") == "/apiv4/assets/{id}/thresholds"
+    assert endpoint_template("/apilogin/login/csupport") == "/apilogin/login/{db}"
+    assert endpoint_template("/apilogin/login") == "/apilogin/login"
+
+
+def test_snapshot_aggregates_per_endpoint():
+    rows = {(row["method"], row["endpoint"]): row for row in sample_metrics().snapshot()}
+    get = rows[("GET", "/apiv4/assets/{id}")]
+    assert get["count"] == 5 and get["errors"] == 1 and get["statuses"] == {"200": 4, "404": 1}
+    assert get["bytes_in"] == 400 and get["p50_ms"] == 20.0 and get["max_ms"] == 40.0
+    post = rows[("POST", "/apiv4/assets/")]
+    assert post["errors"] == 1 and post["retries"] == 1 and post["statuses"] == {"0": 1}
+    assert rows[("DELETE", "/apiv4/assets/{id}")]["retries"] == 1
+    assert list(rows)[0] == ("POST", "/apiv4/assets/")  # slowest total time first
+
+
+def test_disabled_metrics_and_bounded_reservoir():
+    disabled = RequestMetrics(enabled=False)
+    disabled.record("GET", ASSET, status=200, elapsed=0.1)
+    assert disabled.snapshot() == [] and disabled.summary_table() == "No API requests recorded."
+
+    bounded = RequestMetrics(reservoir_size=10)
+    for n in range(100):
+        bounded.record("GET", ASSET, status=200, elapsed=n / 1000)
+    assert len(bounded._stats[("GET", "/apiv4/assets/{id}")].samples) == 10
+    assert bounded.snapshot()[0]["count"] == 100
+
+
+def test_summary_table():
+    lines = sample_metrics().summary_table().splitlines()
+    assert lines[0].split() == ["method", "endpoint", "count", "errors", "retries", "total_s", "p50_ms",
+                                "p95_ms", "p99_ms", "max_ms", "bytes_in", "bytes_out", "statuses"]
+    assert any(line.startswith("GET") and "200:4 404:1" in line for line in lines)
+    assert lines[-1] == "concurrency_limit=12"
+
+
+def test_reset_clears_counters_and_gauges():
+    metrics = sample_metrics()
+    metrics.reset()
+    assert metrics.snapshot() == [] and metrics.gauges() == {}
+
+
+def test_jsonl_export_appends_stamped_lines(tmp_path):
+    path = str(tmp_path / "metrics.jsonl")
+    metrics = sample_metrics()
+    metrics.write_jsonl(path)
+    metrics.write_jsonl(path)
+    with open(path) as f:
+        rows = [json.loads(line) for line in f]
+    assert len(rows) == 6 and all(row["since"] <= row["until"] for row in rows)
+    assert {row["endpoint"] for row in rows} == {"/apiv4/assets/{id}", "/apiv4/assets/"}
+
+
+def test_prometheus_export():
+    text = sample_metrics().to_prometheus(prefix="bot")
+    lines = text.splitlines()
+    assert "# TYPE bot_requests_total counter" in lines
+    assert 'bot_requests_total{method="GET",endpoint="/apiv4/assets/{id}",status="404"} 1' in lines
+    assert 'bot_request_duration_seconds{method="GET",endpoint="/apiv4/assets/{id}",quantile="0.5"} 0.02' in lines
+    assert 'bot_request_duration_seconds_count{method="GET",endpoint="/apiv4/assets/{id}"} 5' in lines
+    assert 'bot_request_retries_total{method="POST",endpoint="/apiv4/assets/"} 1' in lines
+    assert lines[-2:] == ["# TYPE bot_concurrency_limit gauge", "bot_concurrency_limit 12"]
+    assert text.endswith("\n")
+
+
+def test_report_formats(tmp_path, capsys):
+    metrics = sample_metrics()
+    metrics.report("table")
+    assert "--- API request metrics ---" in capsys.readouterr().err
+    metrics.report("jsonl")
+    assert len(capsys.readouterr().err.strip().splitlines()) == 3
+    path = tmp_path / "metrics.prom"
+    metrics.report("prometheus", str(path))
+    assert path.read_text().startswith("# HELP icare_requests_total")
+
+
+def test_icare_metrics_env_reports_at_exit(server, config_file, tmp_path, monkeypatch):
+    registered = []
+    monkeypatch.setattr(RequestMetrics, "report_at_exit",
+                        lambda metrics, fmt, path: registered.append((metrics, fmt, path)))
+    monkeypatch.delenv("ICARE_METRICS", raising=False)
+    api.client.initializer("csupport", config_file=config_file, reuse=False)
+    assert registered == []
+
+    path = str(tmp_path / "metrics.prom")
+    monkeypatch.setenv("ICARE_METRICS", "prometheus")
+    monkeypatch.setenv("ICARE_METRICS_FILE", path)
+    client = api.client.initializer("gsk", config_file=config_file, reuse=False)
+    client.get_toplevels()
+    (metrics, fmt, target), = registered
+    assert metrics is client.metrics and (fmt, target) == ("prometheus", path)
+    metrics.report(fmt, target)
+    with open(path) as f:
+        assert 'endpoint="/apiv4/assets/toplevels",status="200"} 1' in f.read()
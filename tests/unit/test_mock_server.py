@@ -0,0 +1,39 @@
+"""The local mock iCare server itself: login, ETag checks and the all-or-nothing batch creates."""
+import pytest
+import requests
+
+from api.client import IcareApiClient
+from mock_icare.server import T_CHANNEL, T_TRANSMITTER
+
+
+def test_login_rejects_unknown_database(server):
+    api_client = IcareApiClient("user", "pass", base_url=server.url)
+    with pytest.raises(ValueError):
+        api_client.login("not-a-db")
+
+
+def test_stale_etag_is_rejected(server, client):
+    transmitter = server.assets_of_type(T_TRANSMITTER)[0]
+    with pytest.raises(requests.exceptions.HTTPError) as excinfo:
+        client.update_asset(transmitter["_id"], "stale", {"name": "renamed"})
+    assert excinfo.value.response.status_code == 412
+
+
+def test_asset_with_children_cannot_be_deleted(server, client):
+    transmitter = server.assets_of_type(T_TRANSMITTER)[0]
+    with pytest.raises(requests.exceptions.HTTPError) as excinfo:
+        client.delete_asset(transmitter["_id"], transmitter["_etag"])
+    assert excinfo.value.response.status_code == 409 and transmitter["_id"] in server.state.assets
+
+
+def test_batch_with_an_invalid_element_creates_nothing(server, client):
+    transmitter = server.assets_of_type(T_TRANSMITTER)[0]
+    count = len(server.state.assets)
+    batch = [{"upload_id": 1, "name": "Channel 5", "t": T_CHANNEL, "upload_path": [transmitter["_id"]]},
+             {"upload_id": 2, "name": "", "t": T_CHANNEL, "upload_path": [transmitter["_id"]]}]
+    with pytest.raises(requests.exceptions.HTTPError) as excinfo:
+        client.create_asset_batch(batch)
+    assert excinfo.value.response.status_code == 422 and len(server.state.assets) == count
+
+    created = client.create_asset_batch(batch[:1])
+    assert [asset["upload_id"] for asset in created] == [1] and len(server.state.assets) == count + 1
@@ -0,0 +1,51 @@
+"""Profiling helpers: --profile argument parsing, time attribution and the entry-point wrapper."""
+import sys
+
+import pytest
+
+from utils.profiling import CPU_CATEGORY, _parse_profile_args, classify, run_entry_point
+
+
+@pytest.mark.parametrize("argv, expected", [
+    ([], (None, None, [])),
+    (["output.json", "--dry-run"], (None, None, ["output.json", "--dry-run"])),
+    (["--profile"], ("cprofile", None, [])),
+    (["--profile=sample", "output.json"], ("sample", None, ["output.json"])),
+    (["a", "--profile-out=profiles/run", "--profile=cprofile", "b"], ("cprofile", "profiles/run", ["a", "b"])),
+])
+def test_parse_profile_args(argv, expected):
+    assert _parse_profile_args(argv) == expected
+
+
+def test_unknown_profile_mode_exits():
+    with pytest.raises(SystemExit, match="Unknown profile mode 'fast'"):
+        _parse_profile_args(["--profile=fast"])
+
+
+@pytest.mark.parametrize("locations, category", [
+    (["/usr/lib/python3.12/json/decoder.py", "/usr/lib/python3.12/site-packages/requests/models.py"], "json"),
+    (["/site-packages/orjson/__init__.py"], "json"),
+    (["/usr/lib/python3.12/socket.py", "/site-packages/urllib3/connection.py"], "http wait"),
+    (["/site-packages/urllib3/response.py", "/src/api/client.py"], "http wait"),
+    (["/site-packages/pandas/core/frame.py"], "pandas/numpy"),
+    (["/usr/lib/python3.12/copy.py", "/src/bot/task_pusher.py"], "deepcopy"),
+    (["/usr/lib/python3.12/threading.py", "/usr/lib/python3.12/concurrent/futures/thread.py"], "thread wait"),
+    (["/src/api/hierarchy.py", "/src/bot/fleet_audit.py"], CPU_CATEGORY),
+    ([], CPU_CATEGORY),
+])
+def test_classify_uses_the_innermost_matching_frame(locations, category):
+    assert classify(locations) == category
+
+
+def test_run_entry_point_without_profile_just_runs_main(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["bot.py", "input.json"])
+    assert run_entry_point(lambda: sys.argv[1:]) == ["input.json"]
+
+
+def test_run_entry_point_writes_the_profile_and_strips_its_arguments(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", sys.argv[:])
+    prefix = str(tmp_path / "out" / "run")
+    result = run_entry_point(lambda: sys.argv[1:], ["bot.py", "--profile", f"--profile-out={prefix}", "input.json"])
+    assert result == ["input.json"]
+    assert (tmp_path / "out" / "run.prof").exists() and (tmp_path / "out" / "run.folded").exists()
+    assert "Time by category, main thread (cProfile)" in capsys.readouterr().err
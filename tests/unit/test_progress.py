@@ -0,0 +1,83 @@
+"""ProgressReporter: stage counters, throttled progress lines and verbosity levels."""
+import io
+
+from utils.progress import INFO, QUIET, VERBOSE, ProgressReporter
+
+
+def reporter(level: int = INFO, min_interval: float = 3600) -> ProgressReporter:
+    return ProgressReporter(level=level, stream=io.StringIO(), min_interval=min_interval)
+
+
+def lines(progress: ProgressReporter) -> list:
+    return progress.stream.getvalue().splitlines()
+
+
+def test_stage_counts_ok_failed_and_skipped():
+    progress = reporter()
+    with progress.stage("Upload", total=10) as stage:
+        for _ in range(6):
+            stage.advance()
+        stage.advance(failed=2)
+        stage.advance(skipped=1, ok=1)
+    assert (stage.ok, stage.failed, stage.skipped, stage.done) == (7, 2, 1, 10)
+    assert stage.finished_at is not None and stage.as_dict()["total"] == 10
+    assert lines(progress)[-1].startswith("[Upload] 10/10 (100%)") and "errors=2  skipped=1" in lines(progress)[-1]
+
+
+def test_progress_lines_are_throttled_but_the_last_one_is_always_written():
+    progress = reporter(min_interval=3600)
+    stage = progress.stage("Replace", total=50)
+    for _ in range(50):
+        stage.advance()
+    assert len(lines(progress)) == 2  # the first one, then the completion
+
+    unthrottled = reporter(min_interval=0)
+    stage = unthrottled.stage("Replace", total=5)
+    for _ in range(5):
+        stage.advance()
+    assert [line.split()[1] for line in lines(unthrottled)] == ["1/5", "2/5", "3/5", "4/5", "5/5"]
+
+
+def test_progress_line_without_total_and_with_eta():
+    progress = reporter()
+    open_ended = progress.stage("Scan")
+    open_ended.advance(ok=3)
+    assert open_ended.progress_line().startswith("[Scan] 3  ")
+    halfway = progress.stage("Sized", total=4)
+    halfway.advance(ok=2)
+    assert "ETA 0:00:00" in halfway.progress_line() and "(50%)" in halfway.progress_line()
+
+
+def test_levels_filter_messages_and_payloads():
+    class Unserializable:
+        def __str__(self):
+            raise AssertionError("payload serialized although the level is disabled")
+
+    quiet = reporter(level=QUIET)
+    quiet.info("hidden")
+    quiet.warning("hidden")
+    quiet.stage("Step", total=1).advance()
+    quiet.payload("Payload", {"value": Unserializable()})
+    quiet.error("shown", ValueError("boom"))
+    assert lines(quiet) == ["  ❌ shown", "    Details: boom"]
+
+    verbose = reporter(level=VERBOSE)
+    verbose.detail("details")
+    verbose.payload("Payload", {"name": "é"})
+    assert lines(verbose) == ["details", "Payload", "{", '  "name": "é"', "}"]
+
+
+def test_level_defaults_to_the_environment(monkeypatch):
+    monkeypatch.setenv("ICARE_VERBOSITY", "verbose")
+    assert ProgressReporter().level == VERBOSE
+    monkeypatch.setenv("ICARE_VERBOSITY", "unknown")
+    assert ProgressReporter().level == INFO
+
+
+def test_summary_lists_every_stage():
+    progress = reporter(level=QUIET)
+    progress.stage("Create", total=2).advance(ok=2)
+    progress.stage("Delete").advance(failed=1, skipped=2)
+    text = progress.summary()
+    assert "Create: 2 ok, 0 failed in 0:00:00" in text and "Delete: 0 ok, 1 failed, 2 skipped" in text
+    assert lines(progress)[-2:] == text.splitlines()[-2:]
@@ -0,0 +1,43 @@
+"""Upload sharding: shared ancestors first, then one shard per subtree pushed in parallel."""
+from api.sharding import SubtreeSharder, shard_upload
+from mock_icare.server import T_ASSET, T_CHANNEL, T_MP, T_TRANSMITTER
+
+
+def site_upload(zones: int, assets_per_zone: int) -> list:
+    """A generate_flat_json-like upload: factory > zones > assets > transmitter (+ channel) and MP."""
+    ids = iter(range(1, 10000))
+    factory = {"upload_id": next(ids), "t": 16777216, "name": "Factory", "upload_path": []}
+    elements = [factory]
+    for z in range(zones):
+        zone = {"upload_id": next(ids), "t": 16777216, "name": f"Zone {z}", "upload_path": [factory["upload_id"]]}
+        elements.append(zone)
+        for a in range(assets_per_zone):
+            path = zone["upload_path"] + [zone["upload_id"]]
+            asset = {"upload_id": next(ids), "t": T_ASSET, "name": f"Asset {z}.{a}", "upload_path": path}
+            path = path + [asset["upload_id"]]
+            transmitter = {"upload_id": next(ids), "t": T_TRANSMITTER, "name": f"TX {z}.{a}", "upload_path": path}
+            channel = {"upload_id": next(ids), "t": T_CHANNEL, "name": f"CH {z}.{a}",
+                       "upload_path": path + [transmitter["upload_id"]]}
+            mp = {"upload_id": next(ids), "t": T_MP, "name": f"MP {z}.{a}", "upload_path": path,
+                  "transmitter_upload_id": transmitter["upload_id"]}
+            elements += [asset, mp, transmitter, channel]
+    return elements
+
+
+def test_upload_is_sharded_by_subtree_and_pushed_in_parallel(server, client):
+    elements = site_upload(zones=3, assets_per_zone=5)
+    elements[-1]["transmitter_upload_id"] = elements[3]["upload_id"]  # MP monitored by another asset's transmitter
+    shared, shards = shard_upload(elements, "asset")
+    assert [e["name"] for e in shared] == ["Factory", "Zone 0", "Zone 1", "Zone 2"]
+    assert len(shards) == 14 and sum(map(len, shards)) == len(elements) - 4
+
+    report = SubtreeSharder(client, level="asset", min_shard_size=8).push(elements)
+
+    assert report.failed == {} and report.skipped == {} and len(report.created) == len(elements)
+    assets = server.state.assets
+    for element in elements:
+        created = assets[report.created[element["upload_id"]]]
+        parent = element["upload_path"][-1] if element["upload_path"] else None
+        assert created["path"][-1] == (report.created[parent] if parent else server.root_id)
+        if "transmitter_upload_id" in element:
+            assert created["optionals"]["transmitter"] == report.created[element["transmitter_upload_id"]]
@@ -0,0 +1,55 @@
+"""Paginated listings: failed pages, page 1 included, are retried and resumed from the PageSpool."""
+import os
+
+import pytest
+import requests
+
+import api.client
+from api.client import IcareApiClient
+from api.spool import IncompleteListingError
+
+
+def test_failed_pages_are_resumed_from_the_spool(server, tmp_path, monkeypatch):
+    api_client = IcareApiClient("user", "pass", base_url=server.url, spool_dir=str(tmp_path))
+    api_client.login("csupport")
+    monkeypatch.setattr(api_client, "PAGE_RETRIES", 0)
+    request = api_client._request
+    failing = {3}
+
+    def flaky_request(method, endpoint, **kwargs):
+        if kwargs.get("params", {}).get("p") in failing:
+            raise requests.exceptions.ConnectionError("connection reset")
+        return request(method, endpoint, **kwargs)
+
+    monkeypatch.setattr(api_client, "_request", flaky_request)
+    params = {"parent": server.root_id, "extra": "path"}
+    with pytest.raises(IncompleteListingError) as excinfo:
+        api_client._fetch_all_paginated_data("/api/assets/v0/", dict(params), page_size=50)
+    assert list(excinfo.value.failed_pages) == [3]
+    assert os.path.exists(os.path.join(excinfo.value.spool_path, "page-00001.json"))
+
+    failing.clear()
+    listed_before = server.state.request_counts["GET /api/assets/v0/"]
+    hierarchy = api_client._fetch_all_paginated_data("/api/assets/v0/", dict(params), page_size=50)
+    assert server.state.request_counts["GET /api/assets/v0/"] - listed_before == 2  # page 1 and page 3
+    assert len({asset["_id"] for asset in hierarchy}) == len(hierarchy) == len(server.state.assets) - 1
+    assert not any(tmp_path.iterdir())
+
+
+def test_first_page_is_retried_like_the_others(server, client, monkeypatch):
+    monkeypatch.setattr(api.client.time, "sleep", lambda seconds: None)
+    request = client._request
+    failures = [requests.exceptions.ConnectionError("connection reset"), requests.exceptions.ReadTimeout("slow")]
+
+    def flaky_request(method, endpoint, **kwargs):
+        if kwargs.get("params", {}).get("p") == 1 and failures:
+            raise failures.pop(0)
+        return request(method, endpoint, **kwargs)
+
+    monkeypatch.setattr(client, "_request", flaky_request)
+    hierarchy = client._fetch_all_paginated_data("/api/assets/v0/", {"parent": server.root_id}, page_size=50)
+    assert len(hierarchy) == len(server.state.assets) - 1 and not failures
+
+    with pytest.raises(requests.exceptions.HTTPError) as excinfo:  # a refused listing is not retried
+        client._fetch_all_paginated_data("/apiv4/tasks/" + "f" * 24 + "/unknown")
+    assert excinfo.value.response.status_code == 404
@@ -0,0 +1,43 @@
+"""Startup budget of the light client: one-shot bots must not pay for pandas/numpy."""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+# Seconds allowed for 'import api.client' in a fresh interpreter (median of several runs).
+IMPORT_BUDGET_S = float(os.environ.get("ICARE_IMPORT_BUDGET_S", "0.5"))
+
+MEASURE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import api.client
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "heavy": [m for m in ("pandas", "numpy") if m in sys.modules]}))
+"""
+
+
+def _measure_import() -> dict:
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    output = subprocess.run([sys.executable, "-c", MEASURE_SCRIPT], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_client_import_does_not_load_analytics_dependencies():
+    assert _measure_import()["heavy"] == []
+
+
+def test_client_import_within_budget():
+    timings = [_measure_import()["elapsed"] for _ in range(5)]
+    median = statistics.median(timings)
+    assert median < IMPORT_BUDGET_S, f"import api.client took {median:.3f}s (budget {IMPORT_BUDGET_S}s)"
+
+
+def test_analytics_helpers_still_exported_by_client():
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    subprocess.run([sys.executable, "-c", "from api.client import process_hierarchy_to_dataframe, "
+                    "process_network_status_to_dataframe, process_trends_to_dataframe"],
+                   env=env, check=True)
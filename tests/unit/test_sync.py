@@ -0,0 +1,20 @@
+"""HierarchySync: polls apply the changes made by this client and by others."""
+from api.client import IcareApiClient
+from api.sync import HierarchySync
+from mock_icare.server import T_CHANNEL, T_TRANSMITTER
+
+
+def test_hierarchy_sync_applies_deltas(server, client):
+    sync = HierarchySync(client, root_id=server.root_id).start()
+    transmitter = server.assets_of_type(T_TRANSMITTER)[0]
+    client.delete_subtree(transmitter["_id"])
+    channel = client.get_asset(server.assets_of_type(T_CHANNEL)[0]["_id"])
+    client.update_asset(channel["_id"], channel["_etag"], {"name": "renamed"})
+    other = IcareApiClient("user", "pass", base_url=server.url)
+    other.login("csupport")
+    foreign = other.get_asset(server.assets_of_type(T_CHANNEL)[1]["_id"])
+    other.delete_asset(foreign["_id"], foreign["_etag"])
+
+    assert sync.poll() == {"added": 0, "updated": 1, "deleted": 1}
+    expected = {asset["_id"]: asset["_etag"] for asset in client.get_subtree(server.root_id)}
+    assert {node.id: node.etag for node in sync.index.nodes()} == expected
@@ -0,0 +1,82 @@
+"""HTTP transport: gzip request bodies, timeouts, the session pool and the optional httpx backend."""
+import concurrent.futures
+import socket
+
+import pytest
+import requests
+
+from api.client import IcareApiClient
+from api.transport import KeepAliveAdapter, SessionPool, TransportConfig
+from mock_icare.server import MockIcareServer, T_ASSET, T_MP
+
+
+def logged_in(server, **transport) -> IcareApiClient:
+    api_client = IcareApiClient("user", "pass", base_url=server.url, transport=TransportConfig(**transport))
+    api_client.login("csupport")
+    return api_client
+
+
+def test_large_bodies_are_sent_gzipped(server):
+    api_client = logged_in(server, gzip_requests=True, gzip_min_size=512)
+    machine = server.assets_of_type(T_ASSET)[0]
+    notes = "vibration " * 500
+    before = server.bytes_in
+    created = api_client.create_asset({"name": "Gzipped MP", "t": T_MP, "path": machine["path"] + [machine["_id"]],
+                                       "optionals": {"notes": notes}})
+    assert server.state.assets[created["_id"]]["optionals"]["notes"] == notes
+    assert server.bytes_in - before < len(notes) // 10
+
+    before = server.bytes_in
+    small = api_client.create_asset({"name": "Small MP", "t": T_MP, "path": machine["path"] + [machine["_id"]]})
+    assert server.state.assets[small["_id"]]["name"] == "Small MP"
+    assert server.bytes_in - before == len(api_client.codec.dumps(
+        {"name": "Small MP", "t": T_MP, "path": machine["path"] + [machine["_id"]]}))
+
+
+def test_slow_answers_raise_a_timeout():
+    with MockIcareServer(n_machines=2, latency=0.5) as slow:
+        api_client = IcareApiClient("user", "pass", base_url=slow.url,
+                                    transport=TransportConfig(read_timeout=0.1))
+        with pytest.raises(requests.exceptions.Timeout):
+            api_client.login("csupport")
+        row = api_client.metrics.snapshot()[0]
+        assert row["errors"] == 1 and row["statuses"] == {"0": 1}
+        assert len(api_client.sessions) == 1  # The session went back to the pool
+
+
+def test_session_pool_grows_to_the_peak_concurrency_only(server):
+    api_client = logged_in(server, max_workers=4)
+    mp_ids = [mp["_id"] for mp in server.assets_of_type(T_MP)[:40]]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(api_client.get_thresholds, mp_ids))
+    assert 1 <= len(api_client.sessions) <= 4
+
+    pool = SessionPool(TransportConfig(), headers={"Accept": "application/json"})
+    with pool.session() as first:
+        assert first.headers["Accept"] == "application/json"
+    with pool.session() as again:
+        assert again is first
+    pool.close()
+    assert len(pool) == 0
+
+
+def test_keep_alive_socket_options():
+    options = KeepAliveAdapter(TransportConfig()).poolmanager.connection_pool_kw["socket_options"]
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in options
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) not in TransportConfig(tcp_keepalive=False).socket_options()
+
+
+def test_httpx_backend_behaves_like_requests(server):
+    pytest.importorskip("httpx")
+    pytest.importorskip("h2")
+    api_client = logged_in(server, http2=True)
+    assert api_client.get_toplevels()[0]["_id"] == server.root_id
+    with pytest.raises(requests.exceptions.HTTPError) as error:
+        api_client.get_asset("f" * 24)
+    assert error.value.response.status_code == 404
+
+    with MockIcareServer(n_machines=2, latency=0.5) as slow:
+        slow_client = IcareApiClient("user", "pass", base_url=slow.url,
+                                     transport=TransportConfig(http2=True, read_timeout=0.1))
+        with pytest.raises(requests.exceptions.Timeout):
+            slow_client.login("csupport")
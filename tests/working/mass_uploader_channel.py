@@ -1,4 +1,3 @@
-import json
 import os
 import sys
 import datetime
@@ -13,6 +12,14 @@ sys.path.insert(0, project_root)
 # --- End Fix ---
 
 from src.api.client import IcareApiClient, Server, initializer
+from src.api.codec import load_file
+from src.api.hierarchy import name_path_signatures
+from src.api.sync import HierarchySync
+from src.utils.progress import ProgressReporter
+from src.utils.profiling import run_entry_point
+
+# Set ICARE_VERBOSITY=verbose for per-step details, quiet for errors and summary only.
+reporter = ProgressReporter()
 # Import the task payload library
 import src.data.task_payload_library as task_library
 
@@ -54,36 +61,23 @@ def selection_task_final(type: str, speed: Optional[int]) -> Optional[Any]:
     return payload_matrix.get(type, {}).get(speed_key)
 
 def get_factory_hierarchy_by_name(client: IcareApiClient, factory_name: str) -> List[Dict]:
-    print(f"\nFetching full hierarchy to find factory: '{factory_name}'...")
-    full_hierarchy = client.get_full_hierarchy()
-    factory_nodes = [asset for asset in full_hierarchy if asset.get('name') == factory_name]
+    print(f"\nLooking up factory: '{factory_name}'...")
+    # Only names are listed to find the factory; the full assets are then pulled for its branch only.
+    factory_nodes = [asset for asset in client.iter_assets(fields=['name']) if asset.get('name') == factory_name]
     if not factory_nodes:
         print(f"Factory '{factory_name}' not found.")
         return []
-    factory_node = factory_nodes[0]
-    factory_id = factory_node['_id']
-    print(f"Found factory '{factory_name}' with ID: {factory_id}. Filtering children...")
-    factory_hierarchy = [asset for asset in full_hierarchy if asset['_id'] == factory_id or factory_id in asset.get('path', [])]
-    return factory_hierarchy
+    factory_id = factory_nodes[0]['_id']
+    print(f"Found factory '{factory_name}' with ID: {factory_id}. Fetching its branch...")
+    return client.get_subtree(factory_id)
 
 def create_id_map(local_data: List[Dict], server_data: List[Dict]) -> Dict[int, str]:
     print("\nCreating ID map by comparing local file to server data...")
-    local_id_to_asset = {asset['upload_id']: asset for asset in local_data}
-    server_id_to_asset = {asset['_id']: asset for asset in server_data}
-    local_signatures = {}
-    for upload_id, asset in local_id_to_asset.items():
-        norm_name = unicodedata.normalize('NFC', asset.get('name', ''))
-        path_names = [unicodedata.normalize('NFC', local_id_to_asset.get(p_uid, {}).get('name', ''))
-                      for p_uid in asset.get('upload_path', [])]
-        signature = (norm_name, tuple(filter(None, path_names)))
-        local_signatures[signature] = upload_id
-    server_signatures = {}
-    for server_id, asset in server_id_to_asset.items():
-        norm_name = unicodedata.normalize('NFC', asset.get('name', ''))
-        path_names = [unicodedata.normalize('NFC', server_id_to_asset.get(p_sid, {}).get('name', ''))
-                      for p_sid in asset.get('path', [])]
-        signature = (norm_name, tuple(filter(None, path_names)))
-        server_signatures[signature] = server_id
+    normalize = lambda name: unicodedata.normalize('NFC', name)
+    local_signatures = {signature: upload_id for upload_id, signature in
+                        name_path_signatures(local_data, 'upload_id', 'upload_path', normalize).items()}
+    server_signatures = {signature: server_id for server_id, signature in
+                         name_path_signatures(server_data, '_id', 'path', normalize).items()}
     id_map = {up_id: server_signatures.get(sig) for sig, up_id in local_signatures.items() if server_signatures.get(sig)}
     print(f"Successfully created map for {len(id_map)} assets.")
     return id_map
@@ -94,7 +88,7 @@ def recreate_assets_with_new_firmware(client: IcareApiClient, server_data: List[
     Performs a deep recreation of assets to update firmware, using a correct
     minimal payload for transmitters.
     """
-    print("\n--- Starting Final Firmware Update Process ---")
+    reporter.info("\n--- Starting Final Firmware Update Process ---")
 
     FIRMWARE_MAP = {
         33554433: '00010405',  # Gateway
@@ -103,24 +97,27 @@ def recreate_assets_with_new_firmware(client: IcareApiClient, server_data: List[
     
     assets_to_recreate = [asset for asset in server_data if asset.get('t') in FIRMWARE_MAP]
     if not assets_to_recreate:
-        print("No Gateways or Transmitters found to update.")
+        reporter.info("No Gateways or Transmitters found to update.")
         return
 
+    channels_by_parent: Dict[str, List[Dict]] = {}
+    for asset in server_data:
+        if asset.get('t') == 33554436 and asset.get('path'):
+            channels_by_parent.setdefault(asset['path'][-1], []).append(asset)
+
+    stage = reporter.stage("Firmware recreation", total=len(assets_to_recreate))
     for asset_summary in assets_to_recreate:
         asset_id = asset_summary.get('_id')
         asset_name = asset_summary.get('name', 'N/A')
         asset_type = "Gateway" if asset_summary.get('t') == 33554433 else "Transmitter"
         
-        print(f"\nProcessing {asset_type}: '{asset_name}' (ID: {asset_id})")
+        reporter.detail(f"\nProcessing {asset_type}: '{asset_name}' (ID: {asset_id})")
 
         if asset_type == "Transmitter":
             try:
                 # Steps 1 & 2: Find, store, and delete channels
-                print("  [1-2/6] Finding, storing, and deleting old channels...")
-                child_channels = [
-                    asset for asset in server_data
-                    if asset.get('t') == 33554436 and asset.get('path') and asset['path'][-1] == asset_id
-                ]
+                reporter.detail("  [1-2/6] Finding, storing, and deleting old channels...")
+                child_channels = channels_by_parent.get(asset_id, [])
                 stored_channel_payloads = []
                 for channel_asset in child_channels:
                     payload = copy.deepcopy(channel_asset)
@@ -128,16 +125,16 @@ def recreate_assets_with_new_firmware(client: IcareApiClient, server_data: List[
                         payload.pop(key, None)
                     stored_channel_payloads.append(payload)
                     client.delete_asset(channel_asset['_id'], channel_asset['_etag'])
-                print(f"  -> Found and deleted {len(child_channels)} channel(s).")
+                reporter.detail(f"  -> Found and deleted {len(child_channels)} channel(s).")
 
                 # Step 3 & 4: Get full transmitter info and delete it
-                print("  [3-4/6] Deleting old transmitter asset...")
+                reporter.detail("  [3-4/6] Deleting old transmitter asset...")
                 old_transmitter_full = client.get_asset(asset_id)
                 client.delete_asset(asset_id, old_transmitter_full.get('_etag'))
-                print("  -> Old transmitter asset deleted.")
+                reporter.detail("  -> Old transmitter asset deleted.")
 
                 # Step 5: Build a clean and correct payload for the new transmitter
-                print("  [5/6] Building and creating new transmitter asset...")
+                reporter.detail("  [5/6] Building and creating new transmitter asset...")
                 
                 # Start with the existing optionals to preserve all settings
                 optionals_payload = old_transmitter_full.get('optionals', {}).copy()
@@ -156,23 +153,24 @@ def recreate_assets_with_new_firmware(client: IcareApiClient, server_data: List[
                 
                 created_transmitter = client.create_asset(new_transmitter_payload)
                 newly_created_transmitter_id = created_transmitter.get('_id')
-                print(f"  -> New transmitter asset created with ID: {newly_created_transmitter_id}")
+                reporter.detail(f"  -> New transmitter asset created with ID: {newly_created_transmitter_id}")
 
                 # Step 6: Recreate channels
-                print("  [6/6] Recreating child channel assets...")
+                reporter.detail("  [6/6] Recreating child channel assets...")
                 new_transmitter_path = created_transmitter.get('path', [])
                 new_channel_path = new_transmitter_path + [newly_created_transmitter_id]
                 for channel_payload in stored_channel_payloads:
                     channel_payload['path'] = new_channel_path
                     channel_payload['optionals']['sensitivity'] = 25.0
                     client.create_asset(channel_payload)
-                print("  -> All channels recreated successfully.")
-                print(f"  ✅ Deep recreation for '{asset_name}' complete.")
+                reporter.detail("  -> All channels recreated successfully.")
+                reporter.detail(f"  ✅ Deep recreation for '{asset_name}' complete.")
+                stage.advance(ok=1)
 
             except Exception as e:
-                print(f"  ❌ FATAL ERROR during deep recreation of '{asset_name}'.")
-                print(f"    Details: {e}")
-                print("    !! ATTENTION: Manual verification required.")
+                reporter.error(f"FATAL ERROR during deep recreation of '{asset_name}'. "
+                               "!! ATTENTION: Manual verification required.", e)
+                stage.advance(failed=1)
 
         else:  # Logic for Gateways
             # (Gateway logic remains the same)
@@ -185,14 +183,16 @@ def recreate_assets_with_new_firmware(client: IcareApiClient, server_data: List[
                 if 'optionals' not in new_gateway_payload:
                     new_gateway_payload['optionals'] = {}
                 new_gateway_payload['optionals']['appfirmware'] = FIRMWARE_MAP[33554433]
-                print("  [1/2] Creating new gateway asset...")
+                reporter.detail("  [1/2] Creating new gateway asset...")
                 client.create_asset(new_gateway_payload)
-                print("  [2/2] Deleting old gateway asset...")
+                reporter.detail("  [2/2] Deleting old gateway asset...")
                 client.delete_asset(asset_id, old_gateway_etag)
-                print(f"  ✅ Recreation for '{asset_name}' complete.")
+                reporter.detail(f"  ✅ Recreation for '{asset_name}' complete.")
+                stage.advance(ok=1)
             except Exception as e:
-                print(f"  ❌ ERROR during gateway recreation for '{asset_name}'.")
-                print(f"    Details: {e}")
+                reporter.error(f"ERROR during gateway recreation for '{asset_name}'.", e)
+                stage.advance(failed=1)
+    stage.close()
 
 def main():
     """
@@ -208,24 +208,30 @@ def main():
     if not client: return
 
     try:
-        with open(UPLOAD_PAYLOAD_PATH, 'r') as f:
-            local_upload_data = json.load(f)
+        local_upload_data = load_file(UPLOAD_PAYLOAD_PATH)
     except FileNotFoundError:
         print(f"Error: The file '{UPLOAD_PAYLOAD_PATH}' was not found.")
         return
 
     server_hierarchy_data = get_factory_hierarchy_by_name(client, FACTORY_NAME)
     if not server_hierarchy_data: return
+    factory_id = min(server_hierarchy_data, key=lambda asset: len(asset.get('path', [])))['_id']
+    hierarchy_sync = HierarchySync(client, root_id=factory_id, assets=server_hierarchy_data)
 
     # --- 1. FIRMWARE UPDATE via Deep Recreation ---
     recreate_assets_with_new_firmware(client, server_hierarchy_data)
 
     # --- CRITICAL REFRESH STEP ---
+    # Deletions were applied as they happened; only the assets updated since the
+    # first pull are downloaded again.
     print("\nRefreshing server data after asset recreation...")
-    server_hierarchy_data = get_factory_hierarchy_by_name(client, FACTORY_NAME)
-    if not server_hierarchy_data: 
-        print("Could not refresh server data. Halting.")
+    try:
+        changes = hierarchy_sync.poll()
+    except Exception as e:
+        print(f"Could not refresh server data. Halting. ({e})")
         return
+    server_hierarchy_data = hierarchy_sync.assets()
+    print(f"Refreshed: {changes['added']} added, {changes['updated']} updated, {changes['deleted']} deleted.")
 
     # --- 2. CREATE-AND-REPLACE MP PROCESS ---
     id_map = create_id_map(local_upload_data, server_hierarchy_data)
@@ -235,18 +241,20 @@ def main():
         if asset.get('t') == 33554435 and asset.get('path')
     }
     
-    print("\n--- Starting Create-Task-Delete Process for MPs ---")
+    reporter.info("\n--- Starting Create-Task-Delete Process for MPs ---")
     local_mps = [asset for asset in local_upload_data if asset.get('t') == 16777218]
 
     if not local_mps:
-        print("No MPs found in local file to process.")
+        reporter.info("No MPs found in local file to process.")
 
+    stage = reporter.stage("MP replacement", total=len(local_mps))
     for local_mp in local_mps:
         old_mp_server_id = id_map.get(local_mp['upload_id'])
         if not old_mp_server_id:
+            stage.advance(skipped=1)
             continue
 
-        #print(f"\nProcessing replacement for: '{local_mp['name']}' (Old ID: {old_mp_server_id})")
+        reporter.detail(f"\nProcessing replacement for: '{local_mp['name']}' (Old ID: {old_mp_server_id})")
         
         newly_created_mp_id = None
 
@@ -256,17 +264,19 @@ def main():
             old_mp_path = old_mp_asset.get('path')
 
             if not all([old_mp_etag, old_mp_path]):
-                #print("  - Could not retrieve essential data (ETag, path) for the old MP. Skipping.")
+                reporter.detail("  - Could not retrieve essential data (ETag, path) for the old MP. Skipping.")
+                stage.advance(skipped=1)
                 continue
 
             parent_component_server_id = old_mp_path[-1]
             transmitter_id_to_link = parent_to_transmitter_map.get(parent_component_server_id)
             
             if not transmitter_id_to_link:
-                print(f"  - No matching transmitter found under parent {parent_component_server_id}. Skipping.")
+                reporter.warning(f"No matching transmitter found under parent {parent_component_server_id}. Skipping.")
+                stage.advance(skipped=1)
                 continue
 
-            #print(f"  [Step 1/3] Creating new linked MP...")
+            reporter.detail("  [Step 1/3] Creating new linked MP...")
             mp_speed = local_mp.get('speed', 1500)
             
             new_mp_payload = {
@@ -277,9 +287,9 @@ def main():
             
             created_asset = client.create_asset(new_mp_payload)
             newly_created_mp_id = created_asset['_id']
-            #print(f"  -> Success. New MP created with ID: {newly_created_mp_id}")
+            reporter.detail(f"  -> Success. New MP created with ID: {newly_created_mp_id}")
 
-            #print(f"  [Step 2/3] Determining and assigning task to new MP...")
+            reporter.detail("  [Step 2/3] Determining and assigning task to new MP...")
             mp_type = 'vib'
             if local_mp.get('temp_only'): mp_type = 'temp'
             elif local_mp.get('dna'): mp_type = 'dna'
@@ -292,23 +302,27 @@ def main():
                 task_payload['rule']['dtstart'] = int(datetime.datetime.now(datetime.timezone.utc).timestamp() * 1000)
                 created_task = client.create_task(task_payload)
                 task_name = task_payload.get('presname', 'N/A')
-                #print(f"  -> Success. Task '{task_name}' created with ID: {created_task['_id']}")
+                reporter.detail(f"  -> Success. Task '{task_name}' created with ID: {created_task['_id']}")
             else:
-                print(f"  -> No applicable task found for type '{mp_type}' and speed '{mp_speed}'.")
+                reporter.warning(f"No applicable task found for type '{mp_type}' and speed '{mp_speed}'.")
 
-            #print(f"  [Step 3/3] Deleting old unlinked MP ({old_mp_server_id})...")
+            reporter.detail(f"  [Step 3/3] Deleting old unlinked MP ({old_mp_server_id})...")
             client.delete_asset(old_mp_server_id, old_mp_etag)
-            #print("  -> Success. Old MP deleted.")
-            #print("  ✅ Replacement complete.")
+            reporter.detail("  -> Success. Old MP deleted.")
+            reporter.detail("  ✅ Replacement complete.")
+            stage.advance(ok=1)
 
         except Exception as e:
-            print(f"  ❌ ERROR: An error occurred during the replacement process.")
-            print(f"    Details: {e}")
+            message = f"An error occurred during the replacement of '{local_mp['name']}'. Skipping this MP to be safe."
             if newly_created_mp_id:
-                print(f"    !! ATTENTION: A new MP ({newly_created_mp_id}) was created but the old one was not deleted. Please check manually.")
-            print("    Skipping this MP to be safe.")
+                message += (f" !! ATTENTION: A new MP ({newly_created_mp_id}) was created but the old one "
+                            "was not deleted. Please check manually.")
+            reporter.error(message, e)
+            stage.advance(failed=1)
+    stage.close()
 
-    print("\n--- Create-Task-Delete Process Finished ---")
+    reporter.info("\n--- Create-Task-Delete Process Finished ---")
+    reporter.summary()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    run_entry_point(main)
\ No newline at end of file
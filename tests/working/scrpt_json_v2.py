@@ -1,7 +1,17 @@
-import json
+import os
+import sys
 import gspread
 import copy
 
+# --- Fix for ModuleNotFoundError ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, project_root)
+# --- End Fix ---
+
+from src.api.codec import dump_file
+from src.api.hierarchy import materialize_upload_paths
+from src.utils.profiling import run_entry_point
+
 # --- Configuration ---
 SERVICE_ACCOUNT_FILE = 'config/google_credentials.json'
 # ---------------------
@@ -75,7 +85,7 @@ def get_task_name(speed, channel_num, orientation, is_dna, is_temp_only):
 
 def generate_flat_json(factory_filter: str, zone_filter: str, database_id: str):
     """
-    Génère une structure JSON plate à partir d'une base de données Google Sheet.
+    Génère une structure JSON plate (liste d'éléments) à partir d'une base de données Google Sheet.
     """
     try:
         gc = gspread.service_account(filename=SERVICE_ACCOUNT_FILE)
@@ -119,7 +129,7 @@ def generate_flat_json(factory_filter: str, zone_filter: str, database_id: str):
         "upload_id": upload_id_counter,
         "t": 16777216,
         "name": factory,
-        "upload_path": []
+        "upload_parent": None
     }
     upload_id_counter += 1
     all_elements.append(factory_element)
@@ -130,7 +140,7 @@ def generate_flat_json(factory_filter: str, zone_filter: str, database_id: str):
             "upload_id": upload_id_counter,
             "t": 16777216,
             "name": zone,
-            "upload_path": [factory_element["upload_id"]]
+            "upload_parent": factory_element["upload_id"]
         }
         upload_id_counter += 1
         all_elements.append(zone_element)
@@ -150,7 +160,7 @@ def generate_flat_json(factory_filter: str, zone_filter: str, database_id: str):
                 "upload_id": asset_upload_id,
                 "t": 33554432,
                 "name": row.get('Name') or 'Unnamed Asset',
-                "upload_path": [factory_element["upload_id"], zone_element["upload_id"]]
+                "upload_parent": zone_element["upload_id"]
             }
 
             if (periodicity := row.get('Measurement periodicity')):
@@ -204,7 +214,7 @@ def generate_flat_json(factory_filter: str, zone_filter: str, database_id: str):
             "upload_id": upload_id_counter,
             "t": 33554437,
             "name": row.get('Name') or 'Unnamed Component',
-            "upload_path": parent_asset_element["upload_path"] + [parent_asset_element["upload_id"]],
+            "upload_parent": parent_asset_element["upload_id"],
             "assetId": asset_id
         }
         
@@ -282,7 +292,7 @@ def generate_flat_json(factory_filter: str, zone_filter: str, database_id: str):
                     "serialnumber": serial_number,
                     "mac": install_row.get('Mac address'),
                     "upload_id": upload_id_counter,
-                    "upload_path": new_component["upload_path"] + [new_component["upload_id"]]                    
+                    "upload_parent": new_component["upload_id"]                    
                 }
                 upload_id_counter += 1
                 
@@ -321,7 +331,7 @@ def generate_flat_json(factory_filter: str, zone_filter: str, database_id: str):
                             "upload_id": upload_id_counter,
                             "t": 33554436,
                             "name": channel_name,
-                            "upload_path": installation_element["upload_path"] + [installation_element["upload_id"]],
+                            "upload_parent": installation_element["upload_id"],
                             "channel": channel_num,
                             "sensortype": sensor_type
                         }
@@ -338,7 +348,7 @@ def generate_flat_json(factory_filter: str, zone_filter: str, database_id: str):
                             "upload_id": upload_id_counter,
                             "t": 16777218,
                             "name": f"{sn_suffix} - {base_comp_name} {orientation}",
-                            "upload_path": new_component["upload_path"] + [new_component["upload_id"]],
+                            "upload_parent": new_component["upload_id"],
                             "transmitter_upload_id": installation_element["upload_id"],
                             "speed": speed,
                             "preselection": get_task_name(speed, channel_num, orientation, False, False)
@@ -350,7 +360,7 @@ def generate_flat_json(factory_filter: str, zone_filter: str, database_id: str):
                         "upload_id": upload_id_counter,
                         "t": 16777218,
                         "name": f"{sn_suffix} - {base_comp_name} {mapping['dna_orient']} - I-DNA",
-                        "upload_path": new_component["upload_path"] + [new_component["upload_id"]],
+                        "upload_parent": new_component["upload_id"],
                         "transmitter_upload_id": installation_element["upload_id"], # <-- FIX ADDED HERE
                         "speed": speed,
                         "preselection": get_task_name(speed, 3, mapping['dna_orient'], True, False),
@@ -363,7 +373,7 @@ def generate_flat_json(factory_filter: str, zone_filter: str, database_id: str):
                         "upload_id": upload_id_counter,
                         "t": 16777218,
                         "name": f"{sn_suffix} - {base_comp_name} - Temp. sensor",
-                        "upload_path": new_component["upload_path"] + [new_component["upload_id"]],
+                        "upload_parent": new_component["upload_id"],
                         "transmitter_upload_id": installation_element["upload_id"], # <-- FIX ADDED HERE
                         "speed": speed,
                         "preselection": get_task_name(speed, 4, "V", False, True),
@@ -375,14 +385,14 @@ def generate_flat_json(factory_filter: str, zone_filter: str, database_id: str):
     # 6. Process Gateways
     hardware_element = {
         "upload_id": upload_id_counter, "t": 16777216,
-        "name": 'Hardware', "upload_path": [factory_element["upload_id"]]
+        "name": 'Hardware', "upload_parent": factory_element["upload_id"]
     }
     upload_id_counter += 1
     all_elements.append(hardware_element)
 
     hardware_gateway_element = {
         "upload_id": upload_id_counter, "t": 16777216,
-        "name": 'Gateway', "upload_path": [factory_element["upload_id"], hardware_element["upload_id"]]
+        "name": 'Gateway', "upload_parent": hardware_element["upload_id"]
     }
     upload_id_counter += 1
     all_elements.append(hardware_gateway_element)
@@ -397,7 +407,7 @@ def generate_flat_json(factory_filter: str, zone_filter: str, database_id: str):
                 gateway_zone_element = {
                     "upload_id": zone_upload_id, "t": 16777216,
                     "name": zone,
-                    "upload_path": [factory_element["upload_id"], hardware_element["upload_id"], hardware_gateway_element["upload_id"]]
+                    "upload_parent": hardware_gateway_element["upload_id"]
                 }
                 all_elements.append(gateway_zone_element)
                 hardware_gateway_zone_upload_ids[zone] = zone_upload_id
@@ -406,29 +416,35 @@ def generate_flat_json(factory_filter: str, zone_filter: str, database_id: str):
             gateway_element = {
                 "upload_id": upload_id_counter, "t": 33554433,
                 "name": serial_number or 'Unnamed Gateway',
-                "upload_path": [factory_element["upload_id"], hardware_element["upload_id"], hardware_gateway_element["upload_id"], hardware_gateway_zone_upload_ids[zone]],
+                "upload_parent": hardware_gateway_zone_upload_ids[zone],
                 "unique_id": serial_number,
                 "firmware": "00010405"
             }
             upload_id_counter += 1
             all_elements.append(gateway_element)
 
-    return json.dumps(all_elements, indent=2)
+    # Elements only point to their parent while being generated; the full
+    # upload_path of each element is built once, from its parent's.
+    return materialize_upload_paths(all_elements)
 
 # --- Bloc d'exécution principal ---
-if __name__ == '__main__':
+def main():
     FACTORY = "GSK"
     ZONE = "Wn31"
     DATABASE_ID = "13iNE-281Ga6eolH8PwnE7uTc6hZnS5NGs0o3jM6BGvg"
 
     print("Starting JSON generation...")
     try:
-        json_output = generate_flat_json(FACTORY, ZONE, DATABASE_ID)
+        all_elements = generate_flat_json(FACTORY, ZONE, DATABASE_ID)
         
-        with open('output.json', 'w') as f:
-            f.write(json_output)
+        # Machine file: compact output, use indent=True to inspect it by hand.
+        dump_file(all_elements, 'output.json')
             
         print("\n✅ Le fichier `output.json` a été généré avec succès et est prêt à être utilisé.")
 
     except Exception as e:
-        print(f"\n❌ Une erreur est survenue : {e}")
\ No newline at end of file
+        print(f"\n❌ Une erreur est survenue : {e}")
+
+
+if __name__ == '__main__':
+    run_entry_point(main)